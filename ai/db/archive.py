@@ -0,0 +1,250 @@
+# 📄 ai/db/archive.py
+# 오래된 세션 보관(archive) + DB 압축
+# - RETENTION_DAYS보다 오래된 세션의 이벤트를 세션별 열 단위 압축 파일(.npz)로 옮기고 event 테이블에서 삭제
+#   · url/topic: 사전 인코딩 (고유 문자열 목록 + 행별 번호)
+#   · score: float16, 시각/event_id: 첫 값 + 차이(delta)
+# - 세션 요약(session_rollup)과 sessionMeta 행은 DB에 그대로 남음 (sessionMeta.archived = 1)
+# - 삭제 후 incremental vacuum으로 빈 페이지를 파일에서 돌려줌 (VACUUM_STEP 페이지씩 나눠 실행)
+# - auto_vacuum=INCREMENTAL이 아닌 예전 DB는 전체 VACUUM이 한 번 필요하므로 서버가 꺼진 상태에서 수동 실행
+#
+# 수동 실행 (앱 폴더에서):
+#   python -m ai.db.archive [--days 90] [--compact-only]
+import argparse
+import datetime
+import os
+import sqlite3
+import numpy as np
+from ai.db import rollup
+from ai.db.schema import migrate
+from ai.db.writer import DBWriter
+
+ARCHIVE_DIR = 'archive'   # 보관 파일 폴더 (data.db와 같은 위치 기준)
+RETENTION_DAYS = 90       # 시작한 지 이보다 오래된 세션을 보관
+VACUUM_STEP = 2000        # 쓰기 스레드 작업 하나에서 돌려주는 최대 페이지 수 (사이사이 다른 쓰기가 끼어듦)
+
+_SEP = '\x00'             # 사전 문자열 구분자 (url/topic에는 나오지 않음)
+_EPOCH = datetime.datetime(1970, 1, 1)
+_US = datetime.timedelta(microseconds=1)
+
+
+def _to_us(value):
+    """event_time(로컬 시각 문자열) -> 마이크로초"""
+    if not isinstance(value, datetime.datetime):
+        value = datetime.datetime.fromisoformat(value)
+    return (value - _EPOCH) // _US
+
+def _from_us(us):
+    # DB에 저장되던 것과 같은 str(datetime) 형식
+    return str(_EPOCH + datetime.timedelta(microseconds=int(us)))
+
+def _delta_encode(values):
+    """첫 값 + 이웃한 값의 차이 (차이가 모두 uint32 범위면 uint32로 저장)"""
+    values = np.asarray(values, dtype=np.int64)
+    diff = np.diff(values)
+    if len(diff) == 0 or (diff.min() >= 0 and diff.max() < 2 ** 32):
+        diff = diff.astype(np.uint32)
+    return values[:1], diff
+
+def _delta_decode(first, diff):
+    if len(first) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate([first, first[0] + np.cumsum(diff, dtype=np.int64)])
+
+def _dict_encode(values):
+    """(고유 문자열을 _SEP로 이은 UTF-8 바이트, 행별 번호) - 번호 0은 None"""
+    table = {}
+    codes = np.zeros(len(values), dtype=np.int64)
+    for i, value in enumerate(values):
+        if value is None:
+            continue
+        code = table.get(value)
+        if code is None:
+            code = table[value] = len(table) + 1
+        codes[i] = code
+    blob = np.frombuffer(_SEP.join(table).encode('utf-8'), dtype=np.uint8)
+    return blob, codes.astype(np.uint16 if len(table) < 2 ** 16 else np.uint32)
+
+def _dict_words(blob):
+    """번호 -> 문자열 목록 (0번은 None)"""
+    return [None] + bytes(blob).decode('utf-8').split(_SEP)
+
+
+class SessionArchive:
+    def __init__(self, directory=ARCHIVE_DIR):
+        self.directory = directory
+
+    def path(self, sid):
+        return os.path.join(self.directory, f'session_{int(sid)}.npz')
+
+    def write(self, sid, rows):
+        """
+        rows: (event_id, event_time, type, url, score, topic, dedup), (event_time, event_id) 순서
+        임시 파일에 쓴 뒤 교체, 파일 크기 반환
+        """
+        event_id, event_time, focused, url, score, topic, dedup = zip(*rows) if rows else ((),) * 7
+        id_first, id_diff = _delta_encode(event_id)
+        time_first, time_diff = _delta_encode([_to_us(t) for t in event_time])
+        url_blob, url_codes = _dict_encode(url)
+        topic_blob, topic_codes = _dict_encode(topic)
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = self.path(sid)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez_compressed(
+                f,
+                id_first=id_first, id_diff=id_diff,
+                time_first=time_first, time_diff=time_diff,
+                type=np.array(focused, dtype=np.uint8),
+                dedup=np.array(dedup, dtype=np.uint8),
+                score=np.array([np.nan if s is None else s for s in score], dtype=np.float16),
+                url_dict=url_blob, url=url_codes,
+                topic_dict=topic_blob, topic=topic_codes
+            )
+        os.replace(tmp, path)
+        return os.path.getsize(path)
+
+    def load(self, sid):
+        """보관된 세션의 열 배열 (url/topic은 번호 배열 + 번호별 문자열 목록)"""
+        with np.load(self.path(sid)) as z:
+            count = len(z['type'])
+            return {
+                "event_id": _delta_decode(z['id_first'], z['id_diff']),
+                "time_us": _delta_decode(z['time_first'], z['time_diff']),
+                "focused": z['type'].astype(bool),
+                # dedup 열이 생기기 전에 만든 보관 파일은 모두 0
+                "dedup": z['dedup'].astype(bool) if 'dedup' in z.files else np.zeros(count, dtype=bool),
+                "score": z['score'].astype(np.float32),
+                "url": z['url'].astype(np.int64),
+                "urls": _dict_words(z['url_dict']),
+                "topic": z['topic'].astype(np.int64),
+                "topics": _dict_words(z['topic_dict'])
+            }
+
+    def rows(self, sid, after=None, limit=None):
+        """
+        DBHandle.iter_events와 같은 형식/순서로 한 행씩 반환
+        after: 이전 페이지 마지막 행의 (event_time, event_id)
+        """
+        cols = self.load(sid)
+        urls, topics = cols["urls"], cols["topics"]
+        count = 0
+        for i in range(len(cols["event_id"])):
+            event_time, event_id = _from_us(cols["time_us"][i]), int(cols["event_id"][i])
+            if after is not None and (event_time, event_id) <= tuple(after):
+                continue
+            if limit is not None and count >= limit:
+                break
+            score = cols["score"][i]
+            yield {
+                "event_id": event_id,
+                "event_time": event_time,
+                "score": None if np.isnan(score) else round(float(score), 3),
+                "topic": topics[cols["topic"][i]],
+                "url": urls[cols["url"][i]],
+                "type": bool(cols["focused"][i]),
+                "dedup": bool(cols["dedup"][i])
+            }
+            count += 1
+
+
+def archive_session(conn, archive, sid):
+    """세션 하나를 보관 (DBWriter 스레드의 트랜잭션 안에서 실행), (이벤트 수, 파일 크기) 반환"""
+    rows = conn.execute(
+        "SELECT event_id, event_time, type, url, score, topic, dedup FROM event "
+        "WHERE session_id = ? ORDER BY event_time, event_id", (sid,)
+    ).fetchall()
+    if rows and rollup._fetch(conn, sid) is None:
+        # 요약이 없는 오래된 세션: 이벤트가 지워지기 전에 요약을 만들어 둠
+        rollup.rebuild_rows(conn, sid)
+    size = archive.write(sid, rows)
+    conn.execute("DELETE FROM event WHERE session_id = ?", (sid,))
+    conn.execute("UPDATE sessionMeta SET archived = 1 WHERE session_id = ?", (sid,))
+    return len(rows), size
+
+def archive_old_sessions(writer, archive, days=RETENTION_DAYS, exclude=None):
+    """시작한 지 days일이 지난 세션을 보관, {"sessions", "events", "bytes"} 반환"""
+    cutoff = str(datetime.datetime.now() - datetime.timedelta(days=days))
+    sids = writer.submit(lambda conn: [r[0] for r in conn.execute(
+        "SELECT session_id FROM sessionMeta WHERE archived = 0 AND start_time < ? ORDER BY session_id",
+        (cutoff,)
+    )]).result()
+    # 세션마다 작업 하나 (하나가 실패해도 나머지는 커밋됨)
+    futures = [(sid, writer.submit(lambda conn, sid=sid: archive_session(conn, archive, sid)))
+               for sid in sids if sid != exclude]
+
+    result = {"sessions": 0, "events": 0, "bytes": 0}
+    for sid, future in futures:
+        try:
+            events, size = future.result()
+        except Exception as e:
+            print(f"[Archive] 세션 {sid} 보관 실패: {e}")
+            continue
+        result["sessions"] += 1
+        result["events"] += events
+        result["bytes"] += size
+    return result
+
+def compact(writer, step=VACUUM_STEP):
+    """
+    삭제로 생긴 빈 페이지를 step 페이지씩 파일에서 돌려줌, 줄어든 페이지 수 반환
+    서버 실행 중에 호출 (전체 VACUUM은 하지 않음, auto_vacuum=INCREMENTAL이 아니면 0)
+    """
+    def run(conn):
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            return None
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        conn.execute(f"PRAGMA incremental_vacuum({int(step)})").fetchall()
+        return before - conn.execute("PRAGMA page_count").fetchone()[0], conn.execute("PRAGMA freelist_count").fetchone()[0]
+
+    freed = 0
+    while True:
+        result = writer.maintain(run).result()
+        if result is None:
+            print("[Archive] auto_vacuum이 꺼진 DB: 서버를 끄고 'python -m ai.db.archive --compact-only'를 한 번 실행하세요")
+            return 0
+        pages, free_left = result
+        freed += pages
+        if not pages or not free_left:
+            break
+    writer.maintain(lambda conn: conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchall()).result()
+    return freed
+
+def compact_full(writer):
+    """
+    전체 VACUUM (수동 실행 전용, 서버가 꺼진 상태에서)
+    auto_vacuum=INCREMENTAL로 바꾸려면 한 번은 전체 VACUUM이 필요함, 줄어든 페이지 수 반환
+    """
+    def run(conn):
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        else:
+            conn.execute("PRAGMA incremental_vacuum").fetchall()
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchall()
+        return before - conn.execute("PRAGMA page_count").fetchone()[0]
+    return writer.maintain(run).result()
+
+def main():
+    parser = argparse.ArgumentParser(description="오래된 세션 보관 및 DB 압축")
+    parser.add_argument('--db', default='data.db')
+    parser.add_argument('--dir', default=ARCHIVE_DIR)
+    parser.add_argument('--days', type=float, default=RETENTION_DAYS)
+    parser.add_argument('--compact-only', action='store_true', help="보관 없이 DB 압축만")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    conn.close()
+
+    writer = DBWriter(args.db)
+    if not args.compact_only:
+        result = archive_old_sessions(writer, SessionArchive(args.dir), args.days)
+        print(f"{result['sessions']}개 세션, 이벤트 {result['events']}개 보관 ({result['bytes'] / 1024:.1f} KB)")
+    pages = compact_full(writer)
+    writer.close()
+    print(f"DB 압축: {pages}페이지 줄어듦")
+
+if __name__ == "__main__":
+    main()
@@ -1,32 +1,11 @@
 import sqlite3
+from ai.db.schema import migrate
 
 print("init DB")
 
 conn = sqlite3.connect('data.db')
-c = conn.cursor()
 try:
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS sessionMeta(
-            session_id INTEGER PRIMARY KEY,
-            start_time TEXT,
-            duration INTEGER,
-            goal TEXT
-        )
-    ''')
-    c.execute('''
-        CREATE TABLE IF NOT EXISTS event(
-            event_id INTEGER PRIMARY KEY,
-            session_id INTEGER,
-            event_time TEXT,
-            type INTEGER,
-            url TEXT,
-            score REAL,
-            topic TEXT,
-            FOREIGN KEY (session_id)
-              REFERENCES sessionMeta (session_id)
-              ON DELETE CASCADE
-        )
-    ''')
+    migrate(conn)
 
 except sqlite3.Error as e:
     print(f"ERROR: DB/{e}")
@@ -35,4 +14,4 @@ except sqlite3.Error as e:
 finally:
     conn.close()
 
-print("init DB complete.")
\ No newline at end of file
+print("init DB complete.")
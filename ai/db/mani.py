@@ -1,4 +1,7 @@
-import sqlite3, datetime
+import datetime
+from ai.db.writer import DBWriter
+from ai.db.readers import ReadPool
+from ai.db import rollup, archive
 
 def qToDict(crs):
     desc = crs.description
@@ -9,62 +12,161 @@ def qToDict(crs):
 class DBHandle:
     def __init__(self):
         print("DB Connection")
-        self.conn = sqlite3.connect('data.db', detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
-        self.dbCursor = self.conn.cursor()
+        # 쓰기는 모두 전용 스레드에서 모아서 커밋 (WAL 모드 설정도 여기서)
+        self.writer = DBWriter('data.db')
+        # 조회는 읽기 전용 연결을 빌려서 실행 (요청 스레드끼리, 쓰기와도 서로 기다리지 않음)
+        self.readers = ReadPool('data.db')
+        # 오래된 세션의 이벤트는 보관 파일에서 읽음
+        self.archive = archive.SessionArchive(archive.ARCHIVE_DIR)
+
+    def _query(self, sql, params=()):
+        with self.readers.lease() as conn:
+            return qToDict(conn.execute(sql, params))
 
     def insertSessionMeta(self, duration, goal):
         start_time = datetime.datetime.now()
-        self.dbCursor.execute("INSERT INTO sessionMeta (start_time, duration, goal) VALUES(?,?,?)", (start_time, duration, goal))
-        self.conn.commit()
+        # 커밋될 때까지 기다렸다가 새 세션 id 반환
+        lastId = self.writer.execute("INSERT INTO sessionMeta (start_time, duration, goal) VALUES(?,?,?)", (start_time, duration, goal)).result()
         print("SessionMeta Inserted")
-        self.dbCursor.execute("SELECT session_id FROM sessionMeta ORDER BY session_id DESC LIMIT 1;")
-        lastId = self.dbCursor.fetchone()
-        return lastId[0]
+        return lastId
 
-    def maniSessionMeta(self, duration):
-        self.dbCursor.execute("UPDATE sessionMeta SET duration = ? WHERE session_id = (SELECT MAX(session_id) FROM sessionMeta);", (duration,))
+    def maniSessionMeta(self, duration, sid=None):
+        if sid is None:
+            self.writer.execute("UPDATE sessionMeta SET duration = ? WHERE session_id = (SELECT MAX(session_id) FROM sessionMeta);", (duration,))
+        else:
+            self.writer.execute("UPDATE sessionMeta SET duration = ? WHERE session_id = ?;", (duration, sid))
+        # 세션 종료: 이 세션의 이벤트까지 모두 디스크에 기록될 때까지 대기
+        self.writer.flush(durable=True)
 
     def getSessionList(self):
-        self.dbCursor.execute("SELECT * FROM sessionMeta")
-        rows = self.dbCursor.fetchall()
+        with self.readers.lease() as conn:
+            rows = conn.execute("SELECT * FROM sessionMeta").fetchall()
         for row in rows:
             print(row)
 
     def get_sessions(self):
-        self.dbCursor.execute("""
+        return self._query("""
         SELECT session_id, start_time, goal, duration
         FROM sessionMeta
         ORDER BY session_id DESC
         """)
 
-        return qToDict(self.dbCursor)
+    def get_session_goal(self, sid):
+        with self.readers.lease() as conn:
+            row = conn.execute("SELECT goal FROM sessionMeta WHERE session_id = ?", (sid,)).fetchone()
+        return row[0] if row else None
+
+    def is_archived(self, sid):
+        with self.readers.lease() as conn:
+            row = conn.execute("SELECT archived FROM sessionMeta WHERE session_id = ?", (sid,)).fetchone()
+        return bool(row and row[0])
 
     def get_sid_session(self, sid):
-        self.dbCursor.execute("""
-        SELECT event_time, score, topic, url, type
+        if self.is_archived(sid):
+            return [{k: r[k] for k in ('event_time', 'score', 'topic', 'url', 'type', 'dedup')} for r in self.archive.rows(sid)]
+        data = self._query("""
+        SELECT event_time, score, topic, url, type, dedup
         FROM event
         WHERE session_id = ?
         """, (sid,))
-        data = qToDict(self.dbCursor)
         for r in data:
             if(r['type'] == 1): r['type'] = True
             else: r['type'] = False
+            r['dedup'] = r['dedup'] == 1
         return data
 
-    def insertEvent(self, session_id, t, url, score, topic):
+    # --- 키셋 페이지네이션 (OFFSET 없이 마지막 행 기준으로 다음 페이지 조회) ---
+
+    def iter_sessions(self, before=None, limit=None):
+        """세션을 최신순으로 한 행씩 반환 (before: 이전 페이지 마지막 session_id)"""
+        sql = "SELECT session_id, start_time, goal, duration FROM sessionMeta"
+        params = []
+        if before is not None:
+            sql += " WHERE session_id < ?"
+            params.append(before)
+        sql += " ORDER BY session_id DESC"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return self._iter_rows(sql, params)
+
+    def iter_events(self, sid, after=None, limit=None):
+        """
+        세션의 이벤트를 시간순으로 한 행씩 반환 (idx_event_session_time 인덱스 사용)
+        after: 이전 페이지 마지막 행의 (event_time, event_id)
+        보관된 세션은 보관 파일에서 같은 형식으로 읽음
+        """
+        if self.is_archived(sid):
+            yield from self.archive.rows(sid, after, limit)
+            return
+        sql = "SELECT event_id, event_time, score, topic, url, type, dedup FROM event WHERE session_id = ?"
+        params = [sid]
+        if after is not None:
+            sql += " AND (event_time, event_id) > (?, ?)"
+            params.extend(after)
+        sql += " ORDER BY event_time, event_id"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        for r in self._iter_rows(sql, params):
+            r['type'] = r['type'] == 1
+            r['dedup'] = r['dedup'] == 1
+            yield r
+
+    def _iter_rows(self, sql, params, size=256):
+        # 요청마다 연결을 빌려 fetchmany로 조금씩 읽음 (전체 결과를 메모리에 올리지 않음)
+        # 응답 스트리밍이 끝나거나 중단되어 제너레이터가 닫힐 때 연결 반납
+        with self.readers.lease() as conn:
+            crs = conn.cursor()
+            try:
+                crs.execute(sql, params)
+                column_names = [col[0] for col in crs.description]
+                while True:
+                    rows = crs.fetchmany(size)
+                    if not rows:
+                        break
+                    for row in rows:
+                        yield dict(zip(column_names, row))
+            finally:
+                crs.close()
+
+    def insertEvent(self, session_id, t, url, score, topic, dedup=False):
+        """dedup: 모델 대신 거의 같은 페이지의 판정을 재사용한 이벤트"""
         now = datetime.datetime.now()
-        self.dbCursor.execute("INSERT INTO event (session_id, event_time, type, url, score, topic) VALUES(?,?,?,?,?,?)", (session_id, now, t, url, score, topic))
-        self.conn.commit()
-        print("event Inserted")
+        def write(conn):
+            # 이벤트와 세션 요약을 같은 트랜잭션에서 갱신
+            rowid = conn.execute("INSERT INTO event (session_id, event_time, type, url, score, topic, dedup) VALUES(?,?,?,?,?,?,?)", (session_id, now, t, url, score, topic, dedup)).lastrowid
+            rollup.apply_event(conn, session_id, now, t, url, score, topic)
+            return rowid
+        # 기다리지 않음 (쓰기 스레드가 다른 이벤트와 묶어서 커밋)
+        return self.writer.submit(write)
+
+    def get_session_summary(self, sid):
+        """세션 요약 (요약이 없는 이전 세션은 이벤트로 한 번 계산해 저장)"""
+        with self.readers.lease() as conn:
+            summary = rollup.get_summary(conn, sid)
+        if summary is None:
+            self.writer.submit(lambda conn: rollup.rebuild_rows(conn, sid)).result()
+            with self.readers.lease() as conn:
+                summary = rollup.get_summary(conn, sid)
+        return summary
+
+    def archive_old_sessions(self, days=archive.RETENTION_DAYS, exclude=None):
+        """days일이 지난 세션을 보관 파일로 옮기고 DB 압축 (exclude: 진행 중인 세션 id)"""
+        result = archive.archive_old_sessions(self.writer, self.archive, days, exclude)
+        if result["sessions"]:
+            result["freed_pages"] = archive.compact(self.writer)
+        return result
 
     def getEventList(self, session_id):
-        self.dbCursor.execute("SELECT * FROM event WHERE session_id = ?", (session_id,))
-        rows = self.dbCursor.fetchall()
+        with self.readers.lease() as conn:
+            rows = conn.execute("SELECT * FROM event WHERE session_id = ?", (session_id,)).fetchall()
         for row in rows:
             print(row)
 
     def closeConn(self):
-        self.conn.close()
+        self.writer.close()
+        self.readers.close()
     
     def __del__(self):
-        self.conn.close()
+        self.readers.close()
@@ -0,0 +1,97 @@
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+# ==============================================================================
+# 읽기 전용 연결 풀
+# - 쓰기는 DBWriter 스레드 하나가 담당, 조회는 여기서 빌린 연결로 실행
+# - WAL 모드에서는 읽기가 쓰기 트랜잭션을 기다리지 않으므로 대시보드 조회와 이벤트 기록이 동시에 진행됨
+# - 연결은 필요할 때 만들고 POOL_SIZE개까지만 유지, 모두 사용 중이면 반납될 때까지 대기
+# ==============================================================================
+
+POOL_SIZE = 8          # 최대 연결 수 (waitress 스레드 수 이상)
+LEASE_TIMEOUT = 10.0   # 빈 연결을 기다리는 최대 시간 (초)
+BUSY_TIMEOUT_MS = 5000 # 체크포인트 등으로 잠깐 잠겼을 때 재시도하는 시간
+
+
+class PoolTimeout(Exception):
+    """LEASE_TIMEOUT 동안 빈 연결이 없음"""
+
+
+class ReadPool:
+    def __init__(self, path='data.db', size=POOL_SIZE, timeout=LEASE_TIMEOUT):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()  # 최근에 쓴 연결부터 다시 사용
+        self._lock = threading.Lock()
+        self._opened = 0
+        self._closed = False
+
+        self.leases = 0
+        self.waits = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True,
+                               detect_types=sqlite3.PARSE_DECLTYPES, check_same_thread=False)
+        conn.execute("PRAGMA query_only = ON")
+        conn.execute(f"PRAGMA busy_timeout = {BUSY_TIMEOUT_MS}")
+        return conn
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except sqlite3.Error:
+                    self._opened -= 1
+                    raise
+        self.waits += 1
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolTimeout(f"no free read connection in {self.timeout}s") from None
+
+    def _release(self, conn):
+        if conn.in_transaction:
+            conn.rollback()
+        if self._closed:
+            conn.close()
+            return
+        self._idle.put(conn)
+
+    @contextmanager
+    def lease(self):
+        """with pool.lease() as conn: ... (블록이 끝나면 연결 반납)"""
+        if self._closed:
+            raise RuntimeError("ReadPool is closed")
+        conn = self._acquire()
+        self.leases += 1
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def close(self):
+        """쉬고 있는 연결을 닫음 (사용 중인 연결은 반납될 때 닫힘)"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        return {
+            "size": self.size,
+            "opened": self._opened,
+            "idle": self._idle.qsize(),
+            "leases": self.leases,
+            "waits": self.waits
+        }
@@ -0,0 +1,237 @@
+# 📄 ai/db/rollup.py
+# 세션별 요약(session_rollup) - 이벤트가 기록될 때마다 같은 트랜잭션에서 갱신
+# - 고정 크기 값(개수, 시간, 점수 히스토그램)은 session_rollup 한 행
+# - 세션이 길어질수록 늘어나는 분 단위/주제/도메인 집계는 session_rollup_bucket에 한 칸씩 저장
+#   -> 이벤트 1건마다 바뀐 칸만 INSERT ... ON CONFLICT DO UPDATE 로 더함 (세션 길이와 무관한 비용)
+#
+# 기존 DB 전체 다시 계산 (앱 폴더에서 실행):
+#   python -m ai.db.rollup [--session 12]
+import argparse
+import datetime
+import json
+import sqlite3
+from urllib.parse import urlparse
+from ai.db.schema import migrate
+
+SCORE_BINS = 10      # 점수 히스토그램 구간 수 ([0, 1]을 균등 분할)
+MAX_GAP = 300        # 이벤트 사이 간격이 이보다 길면 자리를 비운 것으로 보고 이 값까지만 시간으로 인정 (초)
+TOP_N = 5            # 요약 응답에 포함할 상위 주제/도메인 수
+
+_COLUMNS = ('events', 'focused', 'distracted', 'focused_s', 'distracted_s',
+            'first_time', 'last_time', 'last_type', 'score_sum', 'score_hist')
+
+# session_rollup_bucket.kind -> RollupState 속성 (minute: a=집중, b=비집중 / topic, domain: a=횟수)
+_BUCKETS = (('minute', 'minutes'), ('topic', 'topics'), ('domain', 'domains'))
+
+
+def _to_datetime(value):
+    if isinstance(value, datetime.datetime):
+        return value
+    return datetime.datetime.fromisoformat(value)
+
+
+class RollupState:
+    """
+    세션 하나의 누적 요약 (이벤트를 시간순으로 add 하면 갱신됨)
+    minutes/topics/domains는 아직 저장하지 않은 증가분 (from_row로 읽으면 비어 있고 save 때 기존 칸에 더해짐)
+    """
+    def __init__(self):
+        self.events = 0
+        self.focused = 0
+        self.distracted = 0
+        self.focused_s = 0.0
+        self.distracted_s = 0.0
+        self.first_time = None
+        self.last_time = None
+        self.last_type = None
+        self.score_sum = 0.0
+        self.score_hist = [0] * SCORE_BINS
+        self.minutes = {}   # 시작 후 몇 번째 분 -> [집중, 비집중]
+        self.topics = {}
+        self.domains = {}
+
+    @classmethod
+    def from_row(cls, row):
+        state = cls()
+        if row is None:
+            return state
+        values = dict(zip(_COLUMNS, row))
+        for key in ('events', 'focused', 'distracted', 'focused_s', 'distracted_s', 'last_type', 'score_sum'):
+            setattr(state, key, values[key])
+        state.first_time = _to_datetime(values['first_time']) if values['first_time'] else None
+        state.last_time = _to_datetime(values['last_time']) if values['last_time'] else None
+        state.score_hist = json.loads(values['score_hist'])
+        return state
+
+    def add(self, event_time, focused, url, score, topic):
+        event_time = _to_datetime(event_time)
+        focused = bool(focused)
+
+        # 직전 이벤트 이후 시간은 직전 상태로 보낸 시간
+        if self.last_time is not None:
+            gap = min(max((event_time - self.last_time).total_seconds(), 0.0), MAX_GAP)
+            if self.last_type:
+                self.focused_s += gap
+            else:
+                self.distracted_s += gap
+        if self.first_time is None:
+            self.first_time = event_time
+        self.last_time = event_time
+        self.last_type = int(focused)
+
+        self.events += 1
+        if focused:
+            self.focused += 1
+        else:
+            self.distracted += 1
+
+        score = float(score or 0)
+        self.score_sum += score
+        self.score_hist[min(max(int(score * SCORE_BINS), 0), SCORE_BINS - 1)] += 1
+
+        minute = str(int((event_time - self.first_time).total_seconds() // 60))
+        bucket = self.minutes.setdefault(minute, [0, 0])
+        bucket[0 if focused else 1] += 1
+
+        self._count(self.topics, topic)
+        self._count(self.domains, urlparse(url or '').netloc)
+
+    @staticmethod
+    def _count(counter, key):
+        if key:
+            counter[key] = counter.get(key, 0) + 1
+
+    def to_row(self):
+        return (
+            self.events, self.focused, self.distracted, self.focused_s, self.distracted_s,
+            str(self.first_time) if self.first_time else None,
+            str(self.last_time) if self.last_time else None,
+            self.last_type, self.score_sum,
+            json.dumps(self.score_hist)
+        )
+
+    def bucket_rows(self, sid):
+        """저장할 증가분 (session_id, kind, key, a, b) 목록"""
+        rows = [(sid, 'minute', minute, f, d) for minute, (f, d) in self.minutes.items()]
+        rows += [(sid, 'topic', key, n, 0) for key, n in self.topics.items()]
+        rows += [(sid, 'domain', key, n, 0) for key, n in self.domains.items()]
+        return rows
+
+    def summary(self):
+        tracked = self.focused_s + self.distracted_s
+        top = lambda counter: sorted(counter.items(), key=lambda kv: (-kv[1], kv[0]))[:TOP_N]
+        return {
+            "events": self.events,
+            "focused": self.focused,
+            "distracted": self.distracted,
+            "focused_s": round(self.focused_s, 1),
+            "distracted_s": round(self.distracted_s, 1),
+            "focus_ratio": self.focused_s / tracked if tracked else None,
+            "avg_score": self.score_sum / self.events if self.events else None,
+            "first_time": str(self.first_time) if self.first_time else None,
+            "last_time": str(self.last_time) if self.last_time else None,
+            "score_hist": self.score_hist,
+            "minutes": [[int(m)] + v for m, v in sorted(self.minutes.items(), key=lambda kv: int(kv[0]))],
+            "top_topics": [{"topic": k, "count": v} for k, v in top(self.topics)],
+            "top_domains": [{"domain": k, "count": v} for k, v in top(self.domains)]
+        }
+
+
+def _fetch(conn, sid):
+    return conn.execute(f"SELECT {', '.join(_COLUMNS)} FROM session_rollup WHERE session_id = ?", (sid,)).fetchone()
+
+def load(conn, sid):
+    """저장된 요약 전체 (분 단위/주제/도메인 집계 포함)"""
+    row = _fetch(conn, sid)
+    state = RollupState.from_row(row)
+    if row is None:
+        return state
+    attrs = dict(_BUCKETS)
+    for kind, key, a, b in conn.execute(
+            "SELECT kind, key, a, b FROM session_rollup_bucket WHERE session_id = ?", (sid,)):
+        if kind == 'minute':
+            state.minutes[key] = [a, b]
+        else:
+            getattr(state, attrs[kind])[key] = a
+    return state
+
+def save(conn, sid, state):
+    """요약 행을 덮어쓰고 분 단위/주제/도메인 증가분을 기존 칸에 더함"""
+    conn.execute(
+        f"INSERT OR REPLACE INTO session_rollup (session_id, {', '.join(_COLUMNS)}) "
+        f"VALUES (?, {', '.join('?' * len(_COLUMNS))})",
+        (sid,) + state.to_row()
+    )
+    conn.executemany(
+        "INSERT INTO session_rollup_bucket (session_id, kind, key, a, b) VALUES (?, ?, ?, ?, ?) "
+        "ON CONFLICT (session_id, kind, key) DO UPDATE SET a = a + excluded.a, b = b + excluded.b",
+        state.bucket_rows(sid)
+    )
+
+def apply_event(conn, sid, event_time, focused, url, score, topic):
+    """이벤트 1건 반영 (DBWriter 스레드에서 INSERT와 같은 트랜잭션으로 실행)"""
+    row = _fetch(conn, sid)
+    if row is None:
+        # 세션의 첫 이벤트 (또는 요약 테이블이 생기기 전에 시작된 세션): 방금 넣은 이벤트까지 포함해 계산
+        rebuild_rows(conn, sid)
+        return
+    state = RollupState.from_row(row)
+    state.add(event_time, focused, url, score, topic)
+    save(conn, sid, state)
+
+def get_summary(conn, sid):
+    """세션 요약 (요약 행과 집계 칸만 읽으므로 이벤트 수와 무관), 세션 요약이 없으면 None"""
+    if _fetch(conn, sid) is None:
+        return None
+    return load(conn, sid).summary()
+
+def rebuild_rows(conn, sid=None):
+    """event 테이블에서 요약을 다시 계산해 저장 (트랜잭션은 호출하는 쪽에서), 다시 계산한 세션 수 반환"""
+    sql = "SELECT session_id, event_time, type, url, score, topic FROM event"
+    params = ()
+    if sid is not None:
+        sql += " WHERE session_id = ?"
+        params = (sid,)
+    sql += " ORDER BY session_id, event_time, event_id"
+
+    if sid is None:
+        conn.execute("DELETE FROM session_rollup")
+        conn.execute("DELETE FROM session_rollup_bucket")
+    else:
+        conn.execute("DELETE FROM session_rollup WHERE session_id = ?", (sid,))
+        conn.execute("DELETE FROM session_rollup_bucket WHERE session_id = ?", (sid,))
+
+    count = 0
+    current, state = None, None
+    for session_id, event_time, focused, url, score, topic in conn.execute(sql, params):
+        if session_id != current:
+            if state is not None:
+                save(conn, current, state)
+                count += 1
+            current, state = session_id, RollupState()
+        state.add(event_time, focused, url, score, topic)
+    if state is not None:
+        save(conn, current, state)
+        count += 1
+    return count
+
+def rebuild(conn, sid=None):
+    """요약 다시 계산 (한 트랜잭션)"""
+    with conn:
+        conn.execute("BEGIN")
+        return rebuild_rows(conn, sid)
+
+def main():
+    parser = argparse.ArgumentParser(description="세션 요약(session_rollup) 다시 계산")
+    parser.add_argument('--db', default='data.db')
+    parser.add_argument('--session', type=int, help="이 세션만 다시 계산")
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(args.db)
+    migrate(conn)
+    count = rebuild(conn, args.session)
+    conn.close()
+    print(f"{count}개 세션 요약을 다시 계산했습니다.")
+
+if __name__ == "__main__":
+    main()
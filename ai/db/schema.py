@@ -0,0 +1,117 @@
+# ==============================================================================
+# 스키마 마이그레이션
+# - DB 파일의 PRAGMA user_version = 적용된 마지막 마이그레이션 번호
+# - 새 변경은 MIGRATIONS 끝에 추가 (이미 배포된 항목은 수정하지 않음)
+# ==============================================================================
+
+MIGRATIONS = [
+    # 1: 기본 테이블
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS sessionMeta(
+            session_id INTEGER PRIMARY KEY,
+            start_time TEXT,
+            duration INTEGER,
+            goal TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS event(
+            event_id INTEGER PRIMARY KEY,
+            session_id INTEGER,
+            event_time TEXT,
+            type INTEGER,
+            url TEXT,
+            score REAL,
+            topic TEXT,
+            FOREIGN KEY (session_id)
+              REFERENCES sessionMeta (session_id)
+              ON DELETE CASCADE
+        )
+        ''',
+    ],
+    # 2: 세션별 이벤트 조회/페이지네이션용 인덱스 (session_id, event_time, event_id 순서로 정렬)
+    [
+        'CREATE INDEX IF NOT EXISTS idx_event_session_time ON event(session_id, event_time, event_id)',
+    ],
+    # 3: 세션별 요약 (ai/db/rollup.py가 이벤트 기록 때마다 갱신)
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS session_rollup(
+            session_id INTEGER PRIMARY KEY,
+            events INTEGER,
+            focused INTEGER,
+            distracted INTEGER,
+            focused_s REAL,
+            distracted_s REAL,
+            first_time TEXT,
+            last_time TEXT,
+            last_type INTEGER,
+            score_sum REAL,
+            score_hist TEXT,
+            minutes TEXT,
+            topics TEXT,
+            domains TEXT,
+            FOREIGN KEY (session_id)
+              REFERENCES sessionMeta (session_id)
+              ON DELETE CASCADE
+        )
+        ''',
+    ],
+    # 4: 보관(archive) 표시 - 1이면 이벤트가 event 테이블이 아니라 ai/db/archive.py의 보관 파일에 있음
+    [
+        'ALTER TABLE sessionMeta ADD COLUMN archived INTEGER NOT NULL DEFAULT 0',
+    ],
+    # 5: 중복 판정 표시 - 1이면 모델을 호출하지 않고 거의 같은 페이지의 판정을 재사용한 이벤트
+    [
+        'ALTER TABLE event ADD COLUMN dedup INTEGER NOT NULL DEFAULT 0',
+    ],
+    # 6: 세션 요약의 분 단위/주제/도메인 집계를 칸 단위 테이블로 분리 (이벤트마다 바뀐 칸만 갱신)
+    #    session_rollup의 minutes/topics/domains 열은 옮긴 뒤 비워 두고 더 이상 쓰지 않음
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS session_rollup_bucket(
+            session_id INTEGER,
+            kind TEXT,
+            key TEXT,
+            a INTEGER NOT NULL DEFAULT 0,
+            b INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (session_id, kind, key),
+            FOREIGN KEY (session_id)
+              REFERENCES sessionMeta (session_id)
+              ON DELETE CASCADE
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO session_rollup_bucket (session_id, kind, key, a, b)
+        SELECT r.session_id, 'minute', j.key, json_extract(j.value, '$[0]'), json_extract(j.value, '$[1]')
+        FROM session_rollup r, json_each(r.minutes) j
+        ''',
+        '''
+        INSERT INTO session_rollup_bucket (session_id, kind, key, a, b)
+        SELECT r.session_id, 'topic', j.key, j.value, 0 FROM session_rollup r, json_each(r.topics) j
+        ''',
+        '''
+        INSERT INTO session_rollup_bucket (session_id, kind, key, a, b)
+        SELECT r.session_id, 'domain', j.key, j.value, 0 FROM session_rollup r, json_each(r.domains) j
+        ''',
+        'UPDATE session_rollup SET minutes = NULL, topics = NULL, domains = NULL',
+    ],
+]
+
+def migrate(conn):
+    """적용되지 않은 마이그레이션을 순서대로 실행 (각 단계는 하나의 트랜잭션)"""
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version == 0:
+        # 새 DB: 테이블을 만들기 전에 켜야 적용됨 (이후 보관 때 전체 VACUUM 없이 빈 페이지를 돌려줌)
+        conn.execute('PRAGMA auto_vacuum = INCREMENTAL')
+    for number, statements in enumerate(MIGRATIONS, start=1):
+        if number <= version:
+            continue
+        with conn:
+            conn.execute('BEGIN')
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f'PRAGMA user_version = {number}')
+        print(f"DB migration {number} applied")
+    return len(MIGRATIONS)
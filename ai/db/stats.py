@@ -0,0 +1,395 @@
+import datetime
+import sqlite3
+import threading
+import numpy as np
+
+# ==============================================================================
+# 세션 전체에 걸친 통계 (/api/stats)
+# - event 테이블을 열 단위 NumPy 배열로 읽어 메모리에 유지 (CHUNK_ROWS씩 나눠 읽음)
+# - 새 이벤트가 생기면 마지막으로 읽은 event_id 이후만 추가로 읽음
+# - 보관된(archived) 세션은 전체를 다시 읽을 때 보관 파일에서 함께 읽음
+# - 전체 읽기(서버 시작, invalidate 후)는 별도 스레드에서 새 배열을 만든 뒤 lock 안에서 교체
+#   (읽는 동안 조회는 기존 배열로 응답, 처음 한 번만 읽기가 끝날 때까지 대기)
+# - 지표는 정렬된 배열에 bincount 등 벡터 연산으로 계산, 같은 데이터/조건이면 결과 재사용
+# ==============================================================================
+
+CHUNK_ROWS = 50000   # 한 번에 읽는 행 수
+MAX_GAP = 300        # 이벤트 사이 간격 상한 (초, ai/db/rollup.py와 같은 기준)
+TOP_N = 10
+
+# 전체 읽기가 끝나면 새 엔진에서 옮겨 오는 상태
+_STATE = ('last_id', 'sid', 'ts', 'focused', 'score', 'domain', 'domains', '_domain_ids', '_derived', '_sessions')
+
+# event_time(로컬 시각 문자열) -> 초 단위 수 (SQLite에서 변환, 시각대는 그대로 유지)
+_EPOCH_SQL = "(julianday(event_time) - 2440587.5) * 86400.0"
+_EPOCH = datetime.datetime(1970, 1, 1)
+# url -> 호스트 부분 ('://' 뒤부터 첫 '/' 전까지, SQLite에서 잘라 파이썬 문자열 처리를 줄임)
+_REST_SQL = "CASE WHEN instr(url, '://') > 0 THEN substr(url, instr(url, '://') + 3) ELSE coalesce(url, '') END"
+_HOST_SQL = (f"CASE WHEN instr({_REST_SQL}, '/') > 0 "
+             f"THEN substr({_REST_SQL}, 1, instr({_REST_SQL}, '/') - 1) ELSE {_REST_SQL} END")
+
+def _host(url):
+    # _HOST_SQL과 같은 규칙 (보관 파일의 url용)
+    rest = url or ''
+    if '://' in rest:
+        rest = rest.split('://', 1)[1]
+    return rest.split('/', 1)[0]
+
+def _local_seconds(dt):
+    return (dt - _EPOCH).total_seconds()
+
+
+class StatsEngine:
+    def __init__(self, path='data.db', archive=None, chunk_rows=CHUNK_ROWS):
+        self.path = path
+        self.archive = archive  # ai.db.archive.SessionArchive (없으면 보관된 세션은 제외)
+        self.chunk_rows = chunk_rows
+        self._lock = threading.Lock()
+        self._db = None
+        self._data_version = None
+        self._stale = True
+        self._results = {}
+        self._sessions = {}     # session_id -> 목표
+        self._loaded = threading.Event()  # 첫 전체 읽기 완료
+        self._loader = None     # 전체 읽기 스레드
+        self._loader_lock = threading.Lock()  # refresh()가 _lock 안에서 prime()을 부를 수 있으므로 별도
+        self._generation = 0    # invalidate() 횟수 (읽는 도중 다시 무효화됐는지 확인)
+        self._reset()
+
+    def _reset(self):
+        self.last_id = 0
+        self.sid = np.zeros(0, dtype=np.int64)
+        self.ts = np.zeros(0, dtype=np.float64)
+        self.focused = np.zeros(0, dtype=bool)
+        self.score = np.zeros(0, dtype=np.float32)
+        self.domain = np.zeros(0, dtype=np.int32)
+        self.domains = []       # domain id -> 도메인
+        self._domain_ids = {}
+        self._derived = None
+
+    def _conn(self):
+        # 읽기 전용 연결 하나를 계속 사용 (PRAGMA data_version은 같은 연결에서만 비교 가능)
+        if self._db is None:
+            self._db = sqlite3.connect(f'file:{self.path}?mode=ro', uri=True, check_same_thread=False)
+            self._db.execute("PRAGMA query_only = ON")
+        return self._db
+
+    def invalidate(self):
+        """이벤트가 삭제/이동된 경우(보관 등) 백그라운드에서 전부 다시 읽음"""
+        with self._lock:
+            self._generation += 1
+        self.prime()
+
+    def prime(self):
+        """백그라운드 스레드에서 전체 읽기 시작 (이미 읽는 중이면 그 스레드가 다시 읽음)"""
+        with self._loader_lock:
+            if self._loader is not None:
+                return
+            self._loader = threading.Thread(target=self._reload, name="stats-load", daemon=True)
+            self._loader.start()
+
+    def _reload(self):
+        try:
+            while True:
+                generation = self._generation
+                # lock 없이 새 엔진에 전부 읽음 (조회는 그동안 기존 배열 사용)
+                fresh = StatsEngine(self.path, self.archive, self.chunk_rows)
+                try:
+                    fresh.refresh()
+                finally:
+                    if fresh._db is not None:
+                        fresh._db.close()
+                with self._lock, self._loader_lock:
+                    if generation != self._generation:
+                        continue  # 읽는 도중 다시 무효화됨
+                    for name in _STATE:
+                        setattr(self, name, getattr(fresh, name))
+                    # 읽는 동안 추가된 이벤트는 다음 refresh()에서 last_id 이후로 이어 읽음
+                    self._data_version = None
+                    self._stale = False
+                    self._results.clear()
+                    self._loader = None
+                self._loaded.set()
+                return
+        except Exception as e:
+            print(f"[Stats] 통계 읽기 실패: {e}")
+            with self._loader_lock:
+                self._loader = None
+            self._loaded.set()  # 기다리는 요청은 refresh()에서 직접 다시 읽음
+
+    # --- 데이터 읽기 ---
+
+    def refresh(self):
+        """
+        DB가 바뀌었으면 배열 갱신 (마지막으로 읽은 event_id 이후만 읽음). 바뀌었으면 True
+        삭제는 감지하지 않으므로 이벤트를 지우는 쪽에서 invalidate()를 호출해야 함
+        전체 읽기(_stale)는 _reload()의 새 엔진에서만 일어남
+        """
+        conn = self._conn()
+        data_version = conn.execute("PRAGMA data_version").fetchone()[0]
+        if data_version == self._data_version and not self._stale:
+            return False
+        self._data_version = data_version
+
+        max_id = conn.execute("SELECT coalesce(max(event_id), 0) FROM event").fetchone()[0]
+        if max_id < self.last_id and not self._stale:
+            # invalidate() 없이 이벤트가 지워짐: 다시 읽는 동안은 기존 배열 사용
+            self.prime()
+            return False
+        if self._stale:
+            self._reset()
+            self._load_archived(conn)
+        elif max_id == self.last_id:
+            return False  # 요약 테이블 등 다른 변경
+
+        sorted_before = len(self.sid)
+        while True:
+            rows = conn.execute(
+                f"SELECT event_id, session_id, {_EPOCH_SQL}, type, {_HOST_SQL}, score FROM event "
+                "WHERE event_id > ? ORDER BY event_id LIMIT ?",
+                (self.last_id, self.chunk_rows)
+            ).fetchall()
+            if not rows:
+                break
+            self._append(rows)
+            if len(rows) < self.chunk_rows:
+                break
+
+        if self._sort(sorted_before) or sorted_before == 0:
+            self._derived = None
+        elif self._derived is not None and len(self.sid) > sorted_before:
+            self._extend_derived(sorted_before)
+        self._sessions = dict(conn.execute("SELECT session_id, goal FROM sessionMeta").fetchall())
+        self._stale = False
+        self._results.clear()
+        return True
+
+    def _append(self, rows):
+        event_id, sid, ts, focused, host, score = zip(*rows)
+        self.last_id = event_id[-1]
+
+        ids = self._domain_ids
+        codes = [ids.get(h) for h in host]
+        codes = [c if c is not None else self._domain_id(h) for c, h in zip(codes, host)]
+
+        self.sid = np.concatenate([self.sid, np.array(sid, dtype=np.int64)])
+        # 시각이 없는 행(비정상)은 0으로 두어 정렬/시간대 계산이 깨지지 않게 함
+        self.ts = np.concatenate([self.ts, np.nan_to_num(np.array(ts, dtype=np.float64))])
+        self.focused = np.concatenate([self.focused, np.array(focused, dtype=bool)])
+        self.score = np.concatenate([self.score, np.array(score, dtype=np.float32)])
+        self.domain = np.concatenate([self.domain, np.array(codes, dtype=np.int32)])
+
+    def _load_archived(self, conn):
+        if self.archive is None:
+            return
+        for (sid,) in conn.execute("SELECT session_id FROM sessionMeta WHERE archived = 1 ORDER BY session_id").fetchall():
+            try:
+                cols = self.archive.load(sid)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"[Stats] 보관된 세션 {sid} 읽기 실패: {e}")
+                continue
+            # url 사전의 문자열마다 한 번만 도메인 번호를 구함
+            url_domain = np.array([self._domain_id(_host(u)) for u in cols["urls"]], dtype=np.int32)
+            n = len(cols["event_id"])
+            self.sid = np.concatenate([self.sid, np.full(n, sid, dtype=np.int64)])
+            self.ts = np.concatenate([self.ts, cols["time_us"] / 1e6])
+            self.focused = np.concatenate([self.focused, cols["focused"]])
+            self.score = np.concatenate([self.score, cols["score"]])
+            self.domain = np.concatenate([self.domain, url_domain[cols["url"]]])
+
+    def _domain_id(self, host):
+        """SQL에서 잘라 온 호스트 부분 -> 도메인 번호 (처음 보는 값만 여기로 옴)"""
+        domain = (host or '').split('?', 1)[0].split('#', 1)[0]
+        code = self._domain_ids.get(domain)
+        if code is None:
+            code = len(self.domains)
+            self.domains.append(domain)
+            self._domain_ids[domain] = code
+        self._domain_ids[host] = code
+        return code
+
+    def _sort(self, sorted_before):
+        """(session_id, 시각) 순서 유지. 새 행이 기존 끝 뒤에 이어지면 정렬 생략, 다시 정렬했으면 True"""
+        n = len(self.sid)
+        if n == sorted_before:
+            return False
+        lo = max(sorted_before - 1, 0)
+        sid, ts = self.sid[lo:], self.ts[lo:]
+        if np.all((sid[1:] > sid[:-1]) | ((sid[1:] == sid[:-1]) & (ts[1:] >= ts[:-1]))):
+            return False
+        order = np.lexsort((self.ts, self.sid))
+        for name in ('sid', 'ts', 'focused', 'score', 'domain'):
+            setattr(self, name, getattr(self, name)[order])
+        return True
+
+    # --- 지표 계산 ---
+
+    def _derive_rows(self, lo):
+        """lo번째 행부터의 행별 파생 값 (이벤트별 머문 시간, 시간대, 세션/연속 구간 경계)"""
+        sid, ts, focused, score = self.sid[lo:], self.ts[lo:], self.focused[lo:], self.score[lo:]
+        m = len(sid)
+        session_change = np.ones(m, dtype=bool)
+        session_change[1:] = sid[1:] != sid[:-1]
+
+        # 이벤트별 머문 시간 = 같은 세션의 다음 이벤트까지 (MAX_GAP 상한), 세션 마지막 이벤트는 0
+        dwell = np.zeros(m, dtype=np.float64)
+        if m > 1:
+            dwell[:-1] = np.diff(ts)
+            dwell[:-1][session_change[1:]] = 0.0
+        np.clip(dwell, 0.0, MAX_GAP, out=dwell)
+
+        # 연속 구간: 세션이 바뀌거나 집중 여부가 바뀌면 새 구간
+        new_run = session_change.copy()
+        new_run[1:] |= focused[1:] != focused[:-1]
+
+        score_valid = ~np.isnan(score)
+        rows = {
+            "dwell": dwell,
+            "dwell_focused": dwell * focused,
+            "dwell_lost": dwell * ~focused,
+            "hour": (ts // 3600).astype(np.int64) % 24,
+            "score_valid": score_valid,
+            "score0": np.where(score_valid, score, 0.0)
+        }
+        return rows, session_change, new_run
+
+    def _derive(self):
+        """정렬된 배열 전체의 파생 값 (캐시)"""
+        if self._derived is None:
+            rows, session_change, new_run = self._derive_rows(0)
+            self._derived = dict(rows,
+                run_id=np.cumsum(new_run) - 1,
+                run_start=np.flatnonzero(new_run),
+                sessions=self.sid[session_change],          # 정렬되어 있으므로 경계만 찾으면 됨
+                session_idx=np.cumsum(session_change) - 1)
+        return self._derived
+
+    def _extend_derived(self, start):
+        """start번째 행부터 새로 붙은 경우 파생 값도 뒤에만 이어 붙임"""
+        d = self._derived
+        lo = start - 1  # 직전 마지막 행도 다음 이벤트가 생겼으므로 머문 시간을 다시 계산
+        rows, session_change, new_run = self._derive_rows(lo)
+        for key, tail in rows.items():
+            d[key] = np.concatenate([d[key][:lo], tail])
+        # 0번째(직전 마지막 행)의 경계 정보는 이미 반영되어 있음
+        new_run, session_change = new_run[1:], session_change[1:]
+        d["run_id"] = np.concatenate([d["run_id"], d["run_id"][-1] + np.cumsum(new_run)])
+        d["run_start"] = np.concatenate([d["run_start"], start + np.flatnonzero(new_run)])
+        d["sessions"] = np.concatenate([d["sessions"], self.sid[start:][session_change]])
+        d["session_idx"] = np.concatenate([d["session_idx"], d["session_idx"][-1] + np.cumsum(session_change)])
+
+    def compute(self, days=None, top=TOP_N):
+        """days: 최근 며칠만 (None이면 전체)"""
+        if not self._loaded.is_set():
+            # 첫 전체 읽기는 lock 밖에서 기다림 (다른 요청/invalidate를 막지 않음)
+            self.prime()
+            self._loaded.wait()
+        with self._lock:
+            self.refresh()
+            since = None
+            if days is not None:
+                since = _local_seconds(datetime.datetime.now()) - days * 86400  # event_time과 같은 로컬 시각 기준
+            key = (None if since is None else int(since // 60), top)
+            if key in self._results:
+                return self._results[key]
+
+            d = self._derive()
+            # 기간 조건이 없으면 배열을 복사하지 않고 그대로 사용
+            mask = None if since is None else self.ts >= since
+            result = {
+                "events": len(self.sid) if mask is None else int(mask.sum()),
+                "days": days,
+                "focus_by_hour": self._focus_by_hour(d, mask),
+                "longest_streaks": self._longest_streaks(d, mask, top),
+                "costly_domains": self._costly_domains(d, mask, top),
+                "goal_drift": self._goal_drift(d, mask, top)
+            }
+            self._results[key] = result
+            return result
+
+    def _focus_by_hour(self, d, mask):
+        pick = _picker(mask)
+        hour = pick(d["hour"])
+        total = np.bincount(hour, weights=pick(d["dwell"]), minlength=24)
+        focus = np.bincount(hour, weights=pick(d["dwell_focused"]), minlength=24)
+        events = np.bincount(hour, minlength=24)
+        return [{
+            "hour": h,
+            "events": int(events[h]),
+            "focused_s": round(float(focus[h]), 1),
+            "total_s": round(float(total[h]), 1),
+            "ratio": float(focus[h] / total[h]) if total[h] else None
+        } for h in range(24)]
+
+    def _longest_streaks(self, d, mask, top):
+        """가장 길게 이어진 집중 구간 (구간 시작 시각이 기간 안에 있는 것만)"""
+        run_id, starts = d["run_id"], d["run_start"]
+        runs = len(starts)
+        duration = np.bincount(run_id, weights=d["dwell"], minlength=runs)
+        candidate = self.focused[starts] if mask is None else self.focused[starts] & mask[starts]
+        idx = np.flatnonzero(candidate)
+        if len(idx) > top:
+            idx = idx[np.argpartition(-duration[idx], top)[:top]]
+        idx = idx[np.argsort(-duration[idx])]
+        ends = np.append(starts[1:], len(run_id))
+        return [{
+            "session_id": int(self.sid[starts[r]]),
+            "start": str(_EPOCH + datetime.timedelta(seconds=float(self.ts[starts[r]]))),
+            "duration_s": round(float(duration[r]), 1),
+            "events": int(ends[r] - starts[r])
+        } for r in idx]
+
+    def _costly_domains(self, d, mask, top):
+        """비집중 상태로 가장 오래 머문 도메인"""
+        pick = _picker(mask)
+        domain = pick(self.domain)
+        n = len(self.domains)
+        lost = np.bincount(domain, weights=pick(d["dwell_lost"]), minlength=n)
+        idx = np.flatnonzero(lost > 0)
+        if len(idx) > top:
+            idx = idx[np.argpartition(-lost[idx], top)[:top]]
+        idx = idx[np.argsort(-lost[idx])]
+        total = np.bincount(domain, weights=pick(d["dwell"]), minlength=n)
+        visits = np.bincount(domain, minlength=n)
+        return [{
+            "domain": self.domains[i],
+            "distracted_s": round(float(lost[i]), 1),
+            "total_s": round(float(total[i]), 1),
+            "events": int(visits[i])
+        } for i in idx]
+
+    def _goal_drift(self, d, mask, top):
+        """목표별 세션 평균 점수 추이 (세션 순서에 대한 1차 회귀 기울기)"""
+        pick = _picker(mask)
+        sessions, idx = d["sessions"], pick(d["session_idx"])
+        counts = np.bincount(idx, weights=pick(d["score_valid"]), minlength=len(sessions))
+        sums = np.bincount(idx, weights=pick(d["score0"]), minlength=len(sessions))
+        present = np.flatnonzero(counts)
+
+        by_goal = {}
+        for i in present:  # 세션 수만큼만 반복 (이벤트 수와 무관)
+            goal = self._sessions.get(int(sessions[i]))
+            by_goal.setdefault(goal, []).append(sums[i] / counts[i])
+
+        drift = []
+        for goal, means in by_goal.items():
+            if goal is None or len(means) < 2:
+                continue
+            means = np.array(means)
+            slope = np.polyfit(np.arange(len(means)), means, 1)[0]
+            drift.append({
+                "goal": goal,
+                "sessions": len(means),
+                "first_mean": round(float(means[0]), 4),
+                "last_mean": round(float(means[-1]), 4),
+                "slope": round(float(slope), 5)
+            })
+        drift.sort(key=lambda g: g["sessions"], reverse=True)
+        return drift[:top]
+
+
+def _picker(mask):
+    """mask가 없으면 배열 그대로, 있으면 mask로 고른 배열"""
+    if mask is None:
+        return lambda arr: arr
+    return lambda arr: arr[mask]
@@ -0,0 +1,211 @@
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+
+# ==============================================================================
+# SQLite 쓰기 전용 스레드
+# - 모든 INSERT/UPDATE는 이 스레드의 연결 하나에서만 실행 (다른 스레드와 커서를 공유하지 않음)
+# - WAL 모드 + synchronous=NORMAL: 커밋마다 fsync 하지 않음
+# - 짧은 시간(BATCH_WINDOW) 안에 들어온 작업을 한 트랜잭션으로 묶어 커밋 (group commit)
+# - flush(): 그 전에 넣은 작업이 모두 커밋될 때까지 대기 (durable=True면 디스크 동기화까지)
+# - maintain(): VACUUM처럼 트랜잭션 밖에서 실행해야 하는 작업 (앞의 작업을 커밋한 뒤 단독 실행)
+# ==============================================================================
+
+BATCH_WINDOW = 0.02   # 첫 작업 이후 같은 트랜잭션으로 묶을 작업을 기다리는 시간 (초)
+BATCH_MAX = 256       # 한 트랜잭션에 넣는 최대 작업 수
+
+_STOP = object()
+_RAW = object()   # 트랜잭션 없이 실행하는 작업 표시
+
+
+class DBWriter:
+    def __init__(self, path='data.db', batch_window=BATCH_WINDOW, batch_max=BATCH_MAX):
+        self.path = path
+        self.batch_window = batch_window
+        self.batch_max = batch_max
+        self._queue = queue.Queue()
+        self._closed = False
+        self._ready = threading.Event()
+        self._error = None
+
+        self.commits = 0
+        self.written = 0
+
+        self._thread = threading.Thread(target=self._run, name="db-writer", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+
+    def submit(self, fn):
+        """fn(conn)을 쓰기 스레드에서 실행, 커밋된 뒤 결과가 채워지는 Future 반환"""
+        if self._closed:
+            raise RuntimeError("DBWriter is closed")
+        future = Future()
+        self._queue.put((fn, future, None))
+        return future
+
+    def execute(self, sql, params=()):
+        """SQL 한 문장 실행 (Future 결과는 lastrowid)"""
+        return self.submit(lambda conn: conn.execute(sql, params).lastrowid)
+
+    def maintain(self, fn):
+        """fn(conn)을 트랜잭션 밖에서 단독 실행 (VACUUM, 체크포인트 등), 결과 Future 반환"""
+        if self._closed:
+            raise RuntimeError("DBWriter is closed")
+        future = Future()
+        self._queue.put((fn, future, _RAW))
+        return future
+
+    def flush(self, durable=False, timeout=None):
+        """지금까지 넣은 작업이 모두 커밋될 때까지 대기 (durable=True면 WAL 체크포인트로 디스크 동기화)"""
+        if self._closed:
+            return
+        future = Future()
+        self._queue.put((None, future, durable))
+        future.result(timeout)
+
+    def close(self, timeout=10):
+        """남은 작업을 모두 커밋하고 스레드 종료"""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(_STOP)
+        self._thread.join(timeout)
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, isolation_level=None)  # 트랜잭션은 직접 BEGIN/COMMIT
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _collect(self, first):
+        """첫 작업 이후 BATCH_WINDOW 동안(또는 BATCH_MAX개까지) 들어온 작업을 모음"""
+        batch = [first]
+        if _ends_batch(first):
+            return batch
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_max:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            batch.append(item)
+            if _ends_batch(item):
+                # 종료/flush/유지보수 요청은 바로 처리
+                break
+        return batch
+
+    def _run(self):
+        try:
+            conn = self._connect()
+        except sqlite3.Error as e:
+            self._error = e
+            self._ready.set()
+            return
+        self._ready.set()
+
+        stop = False
+        while not stop:
+            batch = self._collect(self._queue.get())
+            stop = batch[-1] is _STOP
+            if stop:
+                batch.pop()
+            try:
+                self._process(conn, batch)
+            except Exception as e:
+                # 예상하지 못한 오류로 스레드가 죽으면 이후 flush()/result()가 영원히 기다리므로
+                # 이번 배치의 남은 Future만 실패로 끝내고 계속 진행
+                print(f"[DBWriter] 작업 처리 중 오류: {e!r}")
+                if conn.in_transaction:
+                    try:
+                        conn.execute("ROLLBACK")
+                    except sqlite3.Error:
+                        pass
+                for _, future, _ in batch:
+                    _resolve(future, False, e)
+
+        conn.close()
+
+    def _process(self, conn, batch):
+        jobs = [item for item in batch if item[0] is not None and item[2] is not _RAW]
+        barriers = [item for item in batch if item[0] is None]
+        raws = [item for item in batch if item[2] is _RAW]
+        results = self._commit(conn, jobs)
+
+        for (_, future, _), (ok, value) in zip(jobs, results):
+            _resolve(future, ok, value)
+
+        if any(durable for _, _, durable in barriers):
+            try:
+                conn.execute("PRAGMA wal_checkpoint(FULL)")
+            except sqlite3.Error as e:
+                print(f"[DBWriter] 체크포인트 실패: {e}")
+        for _, future, _ in barriers:
+            _resolve(future, True, None)
+
+        for fn, future, _ in raws:
+            try:
+                value = (True, fn(conn))
+            except Exception as e:
+                value = (False, e)
+            _resolve(future, *value)
+
+    def _commit(self, conn, jobs):
+        """작업들을 한 트랜잭션으로 실행, 작업별 (성공 여부, 결과/예외) 반환"""
+        if not jobs:
+            return []
+        results = []
+        try:
+            conn.execute("BEGIN")
+            for fn, _, _ in jobs:
+                # 작업 하나가 실패해도 나머지는 커밋되도록 SAVEPOINT로 감쌈
+                conn.execute("SAVEPOINT job")
+                try:
+                    results.append((True, fn(conn)))
+                    conn.execute("RELEASE job")
+                except Exception as e:
+                    conn.execute("ROLLBACK TO job")
+                    conn.execute("RELEASE job")
+                    results.append((False, e))
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            print(f"[DBWriter] 커밋 실패: {e}")
+            try:
+                conn.execute("ROLLBACK")
+            except sqlite3.Error:
+                pass
+            return [(False, e)] * len(jobs)
+
+        self.commits += 1
+        self.written += sum(1 for ok, _ in results if ok)
+        return results
+
+    def stats(self):
+        return {
+            "pending": self._queue.qsize(),
+            "commits": self.commits,
+            "written": self.written
+        }
+
+
+def _resolve(future, ok, value):
+    """Future에 결과 전달 (이미 끝났거나 호출한 쪽이 cancel한 Future는 건너뜀)"""
+    if future.done():
+        return
+    try:
+        if ok:
+            future.set_result(value)
+        else:
+            future.set_exception(value)
+    except InvalidStateError:
+        pass
+
+
+def _ends_batch(item):
+    # 종료, flush 배리어, 유지보수 작업은 뒤에 오는 작업과 같은 트랜잭션으로 묶지 않음
+    return item is _STOP or item[0] is None or item[2] is _RAW
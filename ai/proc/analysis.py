@@ -1,12 +1,22 @@
 import multiprocessing
+from multiprocessing import shared_memory
+import queue
 import time
 import torch
 import numpy as np
 import google.generativeai as genai
 import json
+import logging
+import os
 from sentence_transformers import SentenceTransformer, util
-from urllib.parse import urlparse
 from pathwork import resource_path
+from telemetry import setup_worker_logging
+from ai.proc.embcache import EmbeddingCache, content_key, model_fingerprint
+from ai.proc.goalstore import GoalStore
+from ai.proc.urlmatch import UrlLists, UrlMatcher, normalize_url
+from ai.proc.verdict import list_verdict
+
+log = logging.getLogger('focus.worker')
 
 # ==============================================================================
 # 1. 설정 및 Mock 데이터 (API 키 없이 실행 가능하도록 설정)
@@ -16,130 +26,455 @@ with open('settings.json', 'r') as f:
     data = json.load(f)
 GOOGLE_API_KEY = data['APIKEY']
 
-if USE_REAL_API:
+# 오프라인 실행(벤치마크 등)용 환경 변수
+# FOCUS_FAKE_LLM=1: 목표 확장에 Gemini 대신 로컬 규칙(fake_expand_goal) 사용 -> 네트워크 없이 실행
+# FOCUS_EMBED_MODEL=<경로>: 임베딩 모델을 다른 로컬 모델(작은 모델 등)로 교체
+FAKE_LLM = os.environ.get('FOCUS_FAKE_LLM') == '1'
+
+if USE_REAL_API and not FAKE_LLM:
     genai.configure(api_key=GOOGLE_API_KEY)
 
-WHITELIST = data['WHITE']
-BLACKLIST = data['BLACK']
+# 화이트/블랙리스트 (settings.json이 바뀌면 자동으로 다시 컴파일됨)
+url_lists = UrlLists('settings.json')
+
+FOCUS_THRESHOLD = 0.2394  # 이 점수 이상이면 집중(관련) 페이지로 판정
+
+# 마이크로 배치 설정
+BATCH_MAX_SIZE = 16  # 한 번의 encode 호출로 묶을 최대 문서 수
+BATCH_WAIT_MS = 5    # 버스트 감지 시 추가 작업을 기다리는 시간 (ms)
+
+# 긴 문서 청크 스코어링 설정
+# 첫 1000자로 집중 판정이 나지 않은 긴 문서만 나머지 본문을 청크로 나눠 추가 비교
+CHUNK_SCORING = False  # True일 경우 사용
+CHUNK_TOKENS = 256     # 청크당 토큰 예산 (첫 구간 1000자와 비슷한 길이)
+CHUNK_MAX = 8          # 문서당 추가로 볼 최대 청크 수 (최악 지연 상한)
+CHUNK_GROUP = 4        # 페이지마다 한 번에 인코딩할 청크 수 (그룹마다 조기 종료 검사)
+CHUNK_BUDGET = 1.0     # 배치 하나의 청크 스코어링 시간 상한 (초, 넘으면 남은 페이지는 그때까지의 최고 점수로 판정)
+
+EMBED_MODEL_PATH = os.environ.get('FOCUS_EMBED_MODEL') or resource_path('./ai/emb')
+
+# 임베딩 모델 추론 정밀도 (CPU 전용, GPU에서는 항상 fp32)
+# 'fp32': 기본 / 'int8': Linear 동적 양자화 / 'bf16': CPU가 bf16을 지원할 때만 적용
+EMBED_PRECISION = 'fp32'
+
+# 문서 임베딩 영구 캐시 설정
+EMB_CACHE_DIR = 'cache/emb'
+EMB_CACHE_CAPACITY = 20000  # 최대 저장 벡터 수 (768차원 기준 약 60MB)
+
+# 목표 확장 결과 저장소
+GOAL_STORE_DIR = 'cache/goals'
+
+def embed_device():
+    """워커가 임베딩 모델을 올리는 장치"""
+    if torch.backends.mps.is_available():
+        return 'mps'
+    return 'cuda' if torch.cuda.is_available() else 'cpu'
+
+def _cpu_supports_bf16():
+    try:
+        return torch.backends.mkldnn.is_available() and torch.ops.mkldnn._is_mkldnn_bf16_supported()
+    except Exception:
+        return False
+
+def effective_precision(device=None, precision=EMBED_PRECISION):
+    """이 장치에서 load_embed_model이 실제로 적용할 정밀도 (설정값이 적용되지 않으면 'fp32')"""
+    device = device or embed_device()
+    if device != 'cpu' or precision not in ('int8', 'bf16'):
+        return 'fp32'
+    if precision == 'bf16' and not _cpu_supports_bf16():
+        return 'fp32'
+    return precision
+
+def embed_model_id(precision=None):
+    """
+    캐시 키로 쓰는 모델 ID (정밀도가 바뀌면 캐시도 분리됨)
+    precision: 실제 적용된 정밀도 (None이면 현재 장치/설정에서 적용될 정밀도)
+    """
+    if precision is None:
+        precision = effective_precision()
+    if precision == 'fp32':
+        return model_fingerprint(EMBED_MODEL_PATH)
+    return model_fingerprint(EMBED_MODEL_PATH, precision)
+
+def open_goal_store(precision=None):
+    return GoalStore(GOAL_STORE_DIR, embed_model_id(precision))
+
+def load_embed_model(device, precision=EMBED_PRECISION, model_path=EMBED_MODEL_PATH):
+    """임베딩 모델 로드 후 (모델, 실제 적용된 정밀도) 반환"""
+    model = SentenceTransformer(model_path, device=device)
+    applied = effective_precision(device, precision)
+    if applied == 'int8':
+        # Linear 가중치를 int8로 양자화, 활성값은 추론 시점에 동적으로 양자화
+        torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+    elif applied == 'bf16':
+        model = model.to(torch.bfloat16)
+    elif device == 'cpu' and precision == 'bf16':
+        print("[Worker] 이 CPU는 bf16을 지원하지 않습니다. fp32로 실행합니다.")
+    elif precision not in ('fp32', 'int8', 'bf16'):
+        print(f"[Worker] 알 수 없는 정밀도 '{precision}'. fp32로 실행합니다.")
+    return model, applied
+
+def preprocess(text):
+    """공백 정리 후 1000자로 자르기"""
+    return " ".join(text.split())[:1000] if text else ""
+
+def body_char_budget():
+    """분석에 실제로 쓰이는 본문 최대 길이 (공백 정리 후, 확장 프로그램 lean 전송 시 텍스트 상한)"""
+    budget = 1000
+    if CHUNK_SCORING:
+        # _split_chunks가 보는 최대 길이만큼 더 받음
+        budget += CHUNK_TOKENS * CHUNK_MAX * 8
+    return budget
+
+def encode_queries(model, queries):
+    """쿼리(앵커) 리스트를 벡터로 변환"""
+    formatted_queries = [preprocess(q) for q in queries]
+    # 쿼리용 프롬프트가 없는 모델(FOCUS_EMBED_MODEL로 바꾼 경우)은 프롬프트 없이 인코딩
+    prompt_name = 'Retrieval-query' if 'Retrieval-query' in (getattr(model, 'prompts', None) or {}) else None
+    return model.encode(formatted_queries, prompt_name=prompt_name)
+
+# fake_expand_goal이 만드는 앵커 형식 (Gemini 프롬프트와 같은 개념/기술/실무 3분류 x 8개)
+_FAKE_ANCHORS = [
+    "Introduction to {goal} and its core concepts.",
+    "Definitions and terminology used in {goal}.",
+    "History and background of {goal}.",
+    "Key principles behind {goal}.",
+    "Overview of the main topics in {goal}.",
+    "Why {goal} matters and where it is applied.",
+    "Common misconceptions about {goal}.",
+    "Foundational theory of {goal}.",
+    "Detailed explanation of methods used in {goal}.",
+    "Formulas and algorithms related to {goal}.",
+    "Advanced techniques for {goal}.",
+    "Step-by-step derivation of results in {goal}.",
+    "Comparison of approaches to {goal}.",
+    "Research papers and lectures on {goal}.",
+    "Worked examples and exercises for {goal}.",
+    "Technical reference documentation for {goal}.",
+    "Tools and software commonly used for {goal}.",
+    "Practical tutorial on getting started with {goal}.",
+    "Troubleshooting errors encountered during {goal}.",
+    "Best practices and tips for {goal}.",
+    "Project examples that apply {goal}.",
+    "Libraries and frameworks that support {goal}.",
+    "Course notes and study guide for {goal}.",
+    "Frequently asked questions about {goal}."
+]
+
+def fake_expand_goal(goal):
+    """Gemini 없이 만드는 목표 확장 결과 (앵커 개수/형식만 실제와 비슷하게 맞춤)"""
+    return [goal] + [anchor.format(goal=goal) for anchor in _FAKE_ANCHORS]
+
+def format_doc(title, meta, body):
+    """문서 임베딩 입력 형식 (전처리된 필드 사용)"""
+    return f"title: {title} | text: {meta}{body}"
 
 # ==============================================================================
 # 2. Worker Process Class (별도 프로세스에서 실행됨)
 # ==============================================================================
 
+# 워커 제어 메시지 ({"cmd": ...} 형태로 task_queue에 전달)
+CMD_SET_GOAL = "SET_GOAL"        # 새 목표 확장/인코딩 후 공유 메모리에 올림 (모델은 재사용)
+CMD_ATTACH_GOAL = "ATTACH_GOAL"  # 다른 워커가 올린 목표 벡터를 공유 메모리에서 연결
+CMD_IDLE = "IDLE"                # 세션 종료: 목표만 비우고 대기
+CMD_STOP = "STOP"                # 프로세스 종료
+
+def is_control(task):
+    return isinstance(task, dict) and 'cmd' in task
+
 class FocusAnalysisProcess(multiprocessing.Process):
-    def __init__(self, user_goal, task_queue, result_queue, status_event):
+    def __init__(self, task_queue, result_queue, ready_event, worker_id=0, torch_threads=None):
         """
-        user_goal: 사용자가 입력한 초기 목표
-        task_queue: 메인 프로세스에서 웹페이지 정보를 보내는 통로
-        result_queue: 분석 결과를 메인 프로세스로 보내는 통로
-        status_event: 초기화(모델 로드/쿼리 확장) 완료 신호
+        task_queue: 메인 프로세스에서 웹페이지 정보/제어 메시지를 보내는 통로
+        result_queue: 분석 결과/제어 응답을 메인 프로세스로 보내는 통로
+        ready_event: 모델 로드 완료 신호 (프로세스당 1회)
+        worker_id: 풀 안에서의 워커 번호 (캐시 폴더 분리용)
+        torch_threads: 워커당 torch 스레드 수 (여러 워커가 코어를 나눠 쓸 때 지정)
         """
         super().__init__()
-        self.user_goal = user_goal
         self.task_queue = task_queue
         self.result_queue = result_queue
-        self.status_event = status_event
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        if torch.backends.mps.is_available(): self.device = 'mps'
+        self.ready_event = ready_event
+        self.worker_id = worker_id
+        self.torch_threads = torch_threads
+        # 임베딩 캐시 적중/미스 카운터 (메인 프로세스에서 조회 가능)
+        self.cache_hits = multiprocessing.Value('q', 0)
+        self.cache_misses = multiprocessing.Value('q', 0)
+        # 콜드 스타트(모델 로드) / 웜 스왑(목표 교체) 소요 시간 (초)
+        self.load_seconds = multiprocessing.Value('d', 0.0)
+        self.swap_seconds = multiprocessing.Value('d', 0.0)
+        self.emb_cache = None
+        self._timings = {"encode": 0.0, "similarity": 0.0}  # 현재 배치의 단계별 소요 시간 (초)
+        self.expanded_queries = None
+        self.cached_query_embeddings = None
+        self._goal_shm = None
+        self.precision = None  # 모델 로드 후 실제 적용된 정밀도 (캐시 키에 사용)
+        self.device = embed_device()
 
     def run(self):
         """프로세스 시작 진입점"""
-        print(f"[Worker] 🚀 프로세스 시작 (PID: {self.pid})")
+        setup_worker_logging()
+        print(f"[Worker{self.worker_id}] 🚀 프로세스 시작 (PID: {self.pid})")
+        if self.torch_threads:
+            torch.set_num_threads(self.torch_threads)
         
         # ---------------------------------------------------------
-        # Step A. 모델 로드 및 초기화 (Heavy Task - 1회만 수행)
+        # Step A. 모델 로드 및 초기화 (Heavy Task - 프로세스당 1회만 수행)
         # ---------------------------------------------------------
-        print("[Worker] 1. 모델 로딩 중...")
+        print(f"[Worker{self.worker_id}] 1. 모델 로딩 중...")
+        load_t = time.time()
         # 실제 환경에서는 모델 로드
         if USE_REAL_API:
-            self.embed_model = SentenceTransformer(resource_path('./ai/emb'), device=self.device)
-            self.genai_model = genai.GenerativeModel('gemini-2.5-flash')
+            self.embed_model, self.precision = load_embed_model(self.device)
+            print(f"[Worker{self.worker_id}]    -> 추론 정밀도: {self.precision}")
+            self.genai_model = None if FAKE_LLM else genai.GenerativeModel('gemini-2.5-flash')
+            self.emb_cache = self._open_emb_cache()
         else:
             print("[Worker] (Mock 모드) 모델 로드 시뮬레이션")
             time.sleep(1) # 로딩 시간 흉내
+        self.load_seconds.value = time.time() - load_t
 
-        # ---------------------------------------------------------
-        # Step B. 쿼리 확장 및 사전 임베딩 (Pre-computation - 1회만 수행)
-        # ---------------------------------------------------------
-        print(f"[Worker] 2. 목표 확장 수행: '{self.user_goal}'")
-        expanded_queries = self._expand_goal(self.user_goal)
-        print(f"[Worker]    -> 확장된 쿼리 목록: {expanded_queries}")
-
-        print("[Worker] 3. 쿼리 벡터 사전 계산 (Pre-encoding)...")
-        # 쿼리 벡터를 미리 계산해서 메모리에 상주시킴 (속도 핵심)
-        self.cached_query_embeddings = self._pre_encode_queries(expanded_queries)
-        
-        # 메인 프로세스에게 "준비 완료" 신호 보냄
-        print("[Worker] ✅ 준비 완료! 대기 중...")
-        self.status_event.set()
+        # 메인 프로세스에게 "모델 준비 완료" 신호 보냄 (목표는 SET_GOAL/ATTACH_GOAL로 받음)
+        print(f"[Worker{self.worker_id}] ✅ 모델 준비 완료 ({self.load_seconds.value:.2f}s). 대기 중...")
+        self.ready_event.set()
 
         # ---------------------------------------------------------
-        # Step C. 분석 루프 (반복 수행)
+        # Step B. 분석 루프 (반복 수행, 마이크로 배치 단위)
         # ---------------------------------------------------------
         while True:
             try:
-                # 큐에서 작업 가져오기 (메인 프로세스가 줄 때까지 대기)
-                task = self.task_queue.get()
-                
-                # 종료 신호 확인
-                if task == "STOP":
-                    print("[Worker] 종료 신호 수신. 프로세스를 종료합니다.")
-                    break
-
+                # 큐에 쌓인 작업을 모아서 한 번에 처리
+                batch, control = self._collect_batch()
             except Exception as e:
                 print(f"[Worker] 에러 발생1: {e}")
-                self.result_queue.put({"error": str(e)})   
+                continue
 
-            try:
-                # 웹 페이지 분석 수행
-                page_data = task
-                start_t = time.time()
-            except Exception as e:
-                print(f"[Worker] 에러 발생2-1: {e}")
-                self.result_queue.put({"error": str(e)})  
-
-            if(self._is_white(page_data['url'])):
-                result = {
-                    "is_focused": True,
-                    "score": 1,
-                    "matched_query": "WHITELIST",
-                    "elapsed": 0
-                }
-                self.result_queue.put(result)
+            if batch:
+                self._process_batch(batch)
+
+            if control is None:
                 continue
-            if(self._is_black(page_data['url'])):
-                result = {
-                    "is_focused": False,
-                    "score": 0,
-                    "matched_query": "BLACKLIST",
-                    "elapsed": 0
-                }
-                self.result_queue.put(result)
+
+            # 제어 메시지는 앞선 페이지를 모두 처리한 뒤에 적용
+            if control['cmd'] == CMD_SET_GOAL:
+                reply = self._set_goal(control['goal'], control.get('refresh', False))
+
+            elif control['cmd'] == CMD_ATTACH_GOAL:
+                reply = self._attach_goal(control)
+
+            elif control['cmd'] == CMD_IDLE:
+                print(f"[Worker{self.worker_id}] 세션 종료. 목표를 비우고 대기합니다.")
+                self._release_goal()
+                if self.emb_cache is not None:
+                    self.emb_cache.flush()
                 continue
 
-            try:
-                score, maxidx = self._calculate_similarity(page_data)
-                elapsed = time.time() - start_t
+            elif control['cmd'] == CMD_STOP:
+                print(f"[Worker{self.worker_id}] 종료 신호 수신. 프로세스를 종료합니다.")
+                self._release_goal()
+                if self.emb_cache is not None:
+                    self.emb_cache.flush()
+                break
 
+            else:
+                reply = {"error": f"알 수 없는 명령: {control['cmd']}"}
+
+            reply['req_id'] = control.get('req_id')
+            self.result_queue.put(reply)
+
+    def _set_goal(self, goal, refresh):
+        """
+        쿼리 확장 및 사전 임베딩 (Pre-computation - 목표당 1회만 수행)
+        모델은 그대로 두고 쿼리 벡터만 교체, 벡터는 다른 워커가 연결할 수 있도록 공유 메모리에 올림
+        """
+        swap_t = time.time()
+        try:
+            expanded_queries, query_embeddings = self._prepare_goal(goal, refresh)
+            query_embeddings = np.asarray(query_embeddings, dtype=np.float32)
+            shm = shared_memory.SharedMemory(create=True, size=query_embeddings.nbytes)
+            view = np.ndarray(query_embeddings.shape, dtype=np.float32, buffer=shm.buf)
+            view[:] = query_embeddings
+            self._install_goal(shm, expanded_queries, view)
+        except Exception as e:
+            print(f"[Worker{self.worker_id}] 목표 설정 실패: {e}")
+            self._release_goal()
+            return {"error": f"목표 설정 실패: {e}"}
+        self.swap_seconds.value = time.time() - swap_t
+
+        print(f"[Worker{self.worker_id}] ✅ 목표 준비 완료 ({self.swap_seconds.value:.3f}s). 대기 중...")
+        return {
+            "shm": shm.name,
+            "shape": list(view.shape),
+            "anchors": expanded_queries,
+            "swap_s": self.swap_seconds.value
+        }
+
+    def _attach_goal(self, msg):
+        """다른 워커가 공유 메모리에 올린 쿼리 벡터를 복사 없이 연결"""
+        try:
+            shm = shared_memory.SharedMemory(name=msg['shm'])
+            view = np.ndarray(tuple(msg['shape']), dtype=np.float32, buffer=shm.buf)
+            self._install_goal(shm, msg['anchors'], view)
+        except Exception as e:
+            print(f"[Worker{self.worker_id}] 목표 연결 실패: {e}")
+            self._release_goal()
+            return {"error": f"목표 연결 실패: {e}"}
+        return {"ok": True}
+
+    def _install_goal(self, shm, anchors, view):
+        old_shm = self._goal_shm
+        self.expanded_queries = list(anchors)
+        self.cached_query_embeddings = view
+        self._goal_shm = shm
+        if old_shm is not None:
+            self._close_shm(old_shm)
+
+    def _release_goal(self):
+        self.expanded_queries = None
+        self.cached_query_embeddings = None
+        if self._goal_shm is not None:
+            self._close_shm(self._goal_shm)
+            self._goal_shm = None
+
+    def _close_shm(self, shm):
+        # 공유 메모리 이름 삭제(unlink)는 메인 프로세스가 담당, 워커는 연결만 닫음
+        try:
+            shm.close()
+        except BufferError:
+            pass
+
+    def _collect_batch(self):
+        """
+        task_queue에서 작업을 최대 BATCH_MAX_SIZE개까지 모아서 (batch, control)로 반환
+        첫 작업은 블로킹 대기, 이후에는 큐에 이미 쌓인 작업만 즉시 가져옴
+        두 번째 작업이 있을 때(버스트)만 BATCH_WAIT_MS 동안 추가 작업을 기다림
+        -> 단일 페이지는 추가 지연 없이 바로 처리됨
+        제어 메시지를 만나면 배치를 끊고 함께 반환
+        """
+        task = self.task_queue.get()
+        if is_control(task):
+            return [], task
+
+        batch = [task]
+        deadline = None
+        while len(batch) < BATCH_MAX_SIZE:
+            try:
+                if deadline is None:
+                    task = self.task_queue.get_nowait()
+                else:
+                    remaining = deadline - time.time()
+                    if remaining <= 0:
+                        break
+                    task = self.task_queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+
+            if is_control(task):
+                return batch, task
+            batch.append(task)
+            if deadline is None:
+                deadline = time.time() + BATCH_WAIT_MS / 1000
+
+        return batch, None
+
+    def _process_batch(self, batch):
+        """배치 분석 후 결과를 result_queue에 전송 (판정이 끝난 페이지부터 바로 보냄)"""
+        batch_t = time.time()
+        self._timings = {"encode": 0.0, "similarity": 0.0}
+        pending = []
+
+        for i, page_data in enumerate(batch):
+            try:
+                listed = url_lists.classify(page_data['url'])
+                if listed:
+                    self._send(page_data, list_verdict(listed))
+                elif self.cached_query_embeddings is None:
+                    self._send(page_data, {"error": "목표가 설정되지 않았습니다."})
+                else:
+                    pending.append(i)
             except Exception as e:
-                print(f"[Worker] 에러 발생2-2: {e}")
-                self.result_queue.put({"error": str(e)})      
-            
-            try:              
-                # 결과 전송
-                result = {
-                    "is_focused": score >= 0.2394,
-                    "score": score,
-                    "matched_query": expanded_queries[maxidx] if score >= 0.2394 else "Distractive content",
-                    "elapsed": elapsed
-                }
-                self.result_queue.put(result)
-            except Exception as e:
-                print(f"[Worker] 에러 발생3: {e}")
-                self.result_queue.put({"error": str(e)})
+                print(f"[Worker] 에러 발생2-1: {e}")
+                self._send(page_data, {"error": str(e)})
+
+        if not pending:
+            return
+
+        start_t = time.time()
+        try:
+            scored = self._calculate_similarity_batch([batch[i] for i in pending])
+        except Exception as e:
+            print(f"[Worker] 에러 발생2-2: {e}")
+            for i in pending:
+                self._send(batch[i], {"error": str(e)})
+            return
+        elapsed = time.time() - start_t
+
+        # 배치 전체의 인코딩/비교 시간 (배치 안의 페이지는 같은 값을 받음)
+        base_timings = dict(self._timings)
+        undecided = []
+        for i, (score, maxidx) in zip(pending, scored):
+            # 메인 프로세스가 큐에 넣은 시각부터 이 배치를 꺼낼 때까지
+            timings = dict(base_timings, queue_wait=max(0.0, batch_t - batch[i].get('sent_at', batch_t)))
+            if CHUNK_SCORING and score < FOCUS_THRESHOLD:
+                # 첫 구간에서 판정이 안 난 긴 문서는 나머지 본문도 확인 (아래에서 배치 단위로)
+                undecided.append({"page": batch[i], "score": score, "idx": maxidx, "timings": timings})
+            else:
+                self._send(batch[i], self._make_result(score, maxidx, elapsed, timings, len(pending)))
+
+        if undecided:
+            self._score_chunks_batch(undecided, elapsed, len(pending))
+
+    def _send(self, page_data, result):
+        try:
+            # 결과 전송 (요청 ID를 붙여서 호출자에게 정확히 전달되도록 함)
+            result['req_id'] = page_data.get('req_id')
+            self.result_queue.put(result)
+        except Exception as e:
+            print(f"[Worker] 에러 발생3: {e}")
+
+    def _make_result(self, score, maxidx, elapsed, timings=None, batch_size=1):
+        is_focused = score >= FOCUS_THRESHOLD
+        return {
+            "is_focused": is_focused,
+            "score": score,
+            "matched_query": self.expanded_queries[maxidx] if is_focused else "Distractive content",
+            "elapsed": elapsed,
+            "timings": timings or {},   # 단계별 소요 시간 (초): queue_wait, encode, similarity, chunks
+            "batch_size": batch_size
+        }
 
     # --- 내부 헬퍼 메서드 ---
 
+    def _prepare_goal(self, goal, refresh=False):
+        """저장된 목표 확장 결과가 있으면 그대로 사용, 없으면 확장 + 사전 임베딩 후 저장"""
+        try:
+            store = open_goal_store(self.precision)
+        except Exception as e:
+            print(f"[Worker] 목표 저장소 사용 불가: {e}")
+            store = None
+
+        if store is not None and not refresh:
+            entry = store.get(goal)
+            if entry is not None:
+                print(f"[Worker] 2. 저장된 목표 확장 결과 사용: '{goal}' ({len(entry[0])}개)")
+                return entry
+
+        print(f"[Worker] 2. 목표 확장 수행: '{goal}'")
+        expanded_queries = self._expand_goal(goal)
+        print(f"[Worker]    -> 확장된 쿼리 목록: {expanded_queries}")
+
+        print("[Worker] 3. 쿼리 벡터 사전 계산 (Pre-encoding)...")
+        # 쿼리 벡터를 미리 계산해서 메모리에 상주시킴 (속도 핵심)
+        query_embeddings = self._pre_encode_queries(expanded_queries)
+
+        # 확장에 실패한 경우([goal]만 반환)와 로컬 규칙으로 만든 경우는 저장하지 않음
+        if store is not None and len(expanded_queries) > 1 and not FAKE_LLM:
+            try:
+                store.put(goal, expanded_queries, query_embeddings)
+            except Exception as e:
+                print(f"[Worker] 목표 저장 실패: {e}")
+        return expanded_queries, query_embeddings
+
     def _expand_goal(self, goal):
         """
         사용자 목표를 받아 3~4개의 구체적인 하위 쿼리 리스트로 반환
@@ -218,6 +553,8 @@ class FocusAnalysisProcess(multiprocessing.Process):
 
         Output Format: JSON Array of strings ONLY. No markdown. In english.
         """
+        if FAKE_LLM:
+            return fake_expand_goal(goal)
         try:
             response = self.genai_model.generate_content(prompt)
             clean_text = response.text.replace("```json", "").replace("```", "").strip()
@@ -232,69 +569,169 @@ class FocusAnalysisProcess(multiprocessing.Process):
             return [goal]
 
     def _preprocess(self, text):
-        return " ".join(text.split())[:1000] if text else ""
+        return preprocess(text)
     
     def _pre_encode_queries(self, queries):
         """쿼리 리스트를 벡터로 변환 (1회 수행)"""
-        # Prefix 추가
-        formatted_queries = [f"{self._preprocess(q)}" for q in queries]
-        return self.embed_model.encode(formatted_queries, prompt_name='Retrieval-query')
+        return encode_queries(self.embed_model, queries)
 
 
     def _calculate_similarity(self, page_data):
         """웹페이지 벡터화 및 미리 계산된 쿼리 벡터와 비교"""
-        title = self._preprocess(page_data.get('title', ''))
-        meta = self._preprocess(page_data.get('meta', ''))
-        body = self._preprocess(page_data.get('body', ''))
-        
-        doc_text = f"{meta}{body}"
-        print("[EMBED]")
-        print(f"TITLE:\t{title}\nMETA:\t{meta}\nBODY:\t{body[:300]}")
-        # 1. 문서만 인코딩 (쿼리는 이미 self.cached_query_embeddings에 있음)
-        doc_emb = self.embed_model.encode(doc_text, prompt=f"title: {title} | text: ")
-        
-        # 2. 행렬 곱 (Query Batch x Document)
-        # doc_emb가 (768,) 이면 (1, 768)로 변경 필요할 수 있음
-        scores = self.embed_model.similarity(self.cached_query_embeddings, doc_emb).numpy().flatten()
-        
-        # 3. Max Pooling
-        max_idx = np.argmax(scores)
-        best_score = float(scores[max_idx])
-        return best_score, max_idx
-    
-    from urllib.parse import urlparse
+        return self._calculate_similarity_batch([page_data])[0]
 
-    def _is_white(self, url):
-        return check_list(url, WHITELIST)
+    def _calculate_similarity_batch(self, pages):
+        """
+        여러 웹페이지를 한 번의 encode 호출로 벡터화하고 쿼리 벡터와 한 번에 비교
+        임베딩 캐시에 있는 문서는 encode를 건너뛰고 행렬 곱만 수행
+        """
+        keys = []
+        texts = []
+        for page_data in pages:
+            title = self._preprocess(page_data.get('title', ''))
+            meta = self._preprocess(page_data.get('meta', ''))
+            body = self._preprocess(page_data.get('body', ''))
+            keys.append(content_key(title, meta, body))
+            # 문서별로 title이 다르므로 prompt를 직접 앞에 붙여서 하나의 리스트로 인코딩
+            texts.append(format_doc(title, meta, body))
+
+        # 1. 캐시에 없는 문서만 인코딩 (쿼리는 이미 self.cached_query_embeddings에 있음)
+        doc_embs = self._embed(keys, texts)
+
+        # 2. 행렬 곱 (Query Batch x Document Batch)
+        sim_t = time.perf_counter()
+        scores = self.embed_model.similarity(self.cached_query_embeddings, np.stack(doc_embs)).numpy()
+
+        # 3. 문서별 Max Pooling
+        max_idxs = np.argmax(scores, axis=0)
+        self._timings["similarity"] += time.perf_counter() - sim_t
+        return [(float(scores[idx, col]), int(idx)) for col, idx in enumerate(max_idxs)]
+
+    def _embed(self, keys, texts):
+        """캐시에 있는 벡터는 그대로 쓰고, 없는 텍스트만 한 번의 encode 호출로 인코딩"""
+        embs = [None] * len(texts)
+        miss_idx = []
+        for i, text in enumerate(texts):
+            if self.emb_cache is not None:
+                embs[i] = self.emb_cache.get(keys[i])
+                if embs[i] is not None:
+                    continue
+            log.debug("[EMBED] %s", text[:300])
+            miss_idx.append(i)
+
+        if miss_idx:
+            encode_t = time.perf_counter()
+            encoded = self.embed_model.encode([texts[i] for i in miss_idx])
+            self._timings["encode"] += time.perf_counter() - encode_t
+            for i, emb in zip(miss_idx, encoded):
+                embs[i] = emb
+                if self.emb_cache is not None:
+                    self.emb_cache.put(keys[i], emb)
+
+        if self.emb_cache is not None:
+            self.cache_hits.value = self.emb_cache.hits
+            self.cache_misses.value = self.emb_cache.misses
+        return embs
+
+    def _score_chunks_batch(self, pages, elapsed, batch_size):
+        """
+        첫 1000자 이후 본문을 토큰 예산 단위 청크로 나눠, 판정이 안 난 모든 페이지의 다음 청크 그룹(CHUNK_GROUP개씩)을
+        한 번의 encode로 인코딩하고 앵커 x 청크 점수를 페이지별로 Max Pooling
+        임계값을 넘는 청크가 나오거나 청크가 끝난 페이지는 바로 결과 전송
+        CHUNK_BUDGET초가 지나면 남은 페이지는 그때까지의 최고 점수로 판정
+        pages: [{"page", "score", "idx", "timings"}] (첫 구간 결과)
+        """
+        chunk_t = time.time()
+        deadline = chunk_t + CHUNK_BUDGET
 
+        def finish(p):
+            p["timings"]['chunks'] = time.time() - chunk_t
+            self._send(p["page"], self._make_result(p["score"], p["idx"], elapsed + p["timings"]['chunks'],
+                                                    p["timings"], batch_size))
+            p["sent"] = True
 
-    def _is_black(self, url):
-        return check_list(url, BLACKLIST)
+        try:
+            for p in pages:
+                p["title"] = self._preprocess(p["page"].get('title', ''))
+                rest = " ".join((p["page"].get('body') or '').split())[1000:]
+                p["chunks"] = self._split_chunks(rest)
+                p["next"] = 0
+
+            active = pages
+            while active and time.time() < deadline:
+                keys, texts, owners = [], [], []
+                for p in active:
+                    group = p["chunks"][p["next"]:p["next"] + CHUNK_GROUP]
+                    p["next"] += len(group)
+                    keys += [content_key(p["title"], '#chunk', c) for c in group]
+                    texts += [format_doc(p["title"], '', c) for c in group]
+                    owners += [p] * len(group)
+
+                if texts:
+                    embs = self._embed(keys, texts)
+                    scores = self.embed_model.similarity(self.cached_query_embeddings, np.stack(embs)).numpy()
+                    rows = np.argmax(scores, axis=0)
+                    best = scores[rows, np.arange(len(texts))]
+                    for col, p in enumerate(owners):
+                        if best[col] > p["score"]:
+                            p["score"], p["idx"] = float(best[col]), int(rows[col])
+
+                # 조기 종료: 이미 집중 판정이거나 볼 청크가 없는 페이지는 바로 전송
+                remaining = []
+                for p in active:
+                    if p["score"] >= FOCUS_THRESHOLD or p["next"] >= len(p["chunks"]):
+                        finish(p)
+                    else:
+                        remaining.append(p)
+                active = remaining
+        except Exception as e:
+            print(f"[Worker] 청크 스코어링 실패 (첫 구간 결과 사용): {e}")
 
-def normalize_url(url):
-    if not url.startswith(('http://', 'https://')):
-        url = 'http://' + url  # 파싱을 위해 임시 스키마 추가
-    
-    parsed = urlparse(url)
-    # netloc(도메인) + path(경로)를 합치고, 끝의 '/'는 제거하여 표준화
-    clean_url = (parsed.netloc + parsed.path).rstrip('/')
-    return parsed.netloc, clean_url
+        # 시간 예산 초과 또는 실패: 남은 페이지는 지금까지의 최고 점수로
+        for p in pages:
+            if not p.get("sent"):
+                finish(p)
 
-def check_list(input_url, list_data):
+    def _split_chunks(self, text):
+        """텍스트를 CHUNK_TOKENS 토큰 단위로 최대 CHUNK_MAX개까지 나눔"""
+        if not text:
+            return []
+        # 토크나이저 비용도 상한을 두기 위해 필요한 만큼만 자름 (토큰당 최대 8자로 가정)
+        text = text[:CHUNK_TOKENS * CHUNK_MAX * 8]
 
-    input_domain, input_full_clean = normalize_url(input_url)
+        tokenizer = getattr(self.embed_model, 'tokenizer', None)
+        try:
+            offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)['offset_mapping']
+        except Exception:
+            # offset을 지원하지 않는 토크나이저는 글자 수로 근사 (토큰당 약 4자)
+            size = CHUNK_TOKENS * 4
+            return [text[i:i + size] for i in range(0, len(text), size)][:CHUNK_MAX]
+
+        chunks = []
+        for start in range(0, len(offsets), CHUNK_TOKENS):
+            end = min(start + CHUNK_TOKENS, len(offsets)) - 1
+            chunks.append(text[offsets[start][0]:offsets[end][1]])
+            if len(chunks) >= CHUNK_MAX:
+                break
+        return chunks
+
+    def _open_emb_cache(self):
+        """임베딩 캐시 열기 (실패해도 캐시 없이 동작)"""
+        try:
+            # 워커마다 별도 폴더 사용 (여러 프로세스가 같은 파일에 쓰지 않도록)
+            cache_dir = os.path.join(EMB_CACHE_DIR, f"w{self.worker_id}")
+            return EmbeddingCache(cache_dir, embed_model_id(self.precision), EMB_CACHE_CAPACITY)
+        except Exception as e:
+            print(f"[Worker] 임베딩 캐시 사용 불가: {e}")
+            return None
 
-    for item in list_data:
-        target_url = item['url']
-        collective= item['collect']
-        
-        target_domain, target_full_clean = normalize_url(target_url)
+    def _is_white(self, url):
+        return url_lists.is_white(url)
 
-        if collective:
-            if input_domain == target_domain:
-                return True
-        else:
-            if input_full_clean == target_full_clean:
-                return True
-                
-    return False
+
+    def _is_black(self, url):
+        return url_lists.is_black(url)
+
+def check_list(input_url, list_data):
+    """목록 하나에 대해 즉석 검사 (반복 검사는 url_lists 사용)"""
+    return UrlMatcher(list_data).match(normalize_url(input_url))
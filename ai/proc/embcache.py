@@ -0,0 +1,188 @@
+import os
+import json
+import hashlib
+import numpy as np
+
+# ==============================================================================
+# 문서 임베딩 영구 캐시 (세션/재시작 간 재사용)
+# - 키: 전처리된 title/meta/body 텍스트의 해시 (16 bytes)
+# - 값: memory-mapped 벡터 파일의 슬롯
+# - 용량 초과 시 가장 오래 사용되지 않은 슬롯부터 교체 (LRU)
+# ==============================================================================
+
+KEY_SIZE = 16
+
+
+def model_fingerprint(model_path, *extra):
+    """모델 설정 파일 내용으로 모델 ID 생성 (모델이 바뀌면 캐시가 자동으로 무효화됨)"""
+    h = hashlib.sha1()
+    h.update(os.path.basename(os.path.normpath(model_path)).encode('utf-8'))
+    for name in ('config.json', 'modules.json', 'config_sentence_transformers.json'):
+        try:
+            with open(os.path.join(model_path, name), 'rb') as f:
+                h.update(f.read())
+        except OSError:
+            h.update(name.encode('utf-8'))
+    for e in extra:
+        h.update(str(e).encode('utf-8'))
+    return h.hexdigest()[:16]
+
+
+def content_key(title, meta, body):
+    """전처리된 문서 필드로 캐시 키 생성"""
+    raw = '\x1f'.join((title or '', meta or '', body or '')).encode('utf-8')
+    return hashlib.blake2b(raw, digest_size=KEY_SIZE).digest()
+
+
+class EmbeddingCache:
+    def __init__(self, cache_dir, model_id, capacity=20000, flush_every=64):
+        """
+        cache_dir: 캐시 파일을 저장할 폴더
+        model_id: 임베딩 모델 ID (다르면 기존 캐시를 버림)
+        capacity: 최대 저장 벡터 수
+        flush_every: 이 횟수만큼 저장할 때마다 디스크 동기화
+        """
+        self.cache_dir = cache_dir
+        self.model_id = model_id
+        self.capacity = capacity
+        self.flush_every = flush_every
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        self._index = {}   # key(bytes) -> slot
+        self._free = []    # 비어 있는 슬롯
+        self._clock = 0    # LRU 시계
+        self._puts = 0
+        self.dim = None
+        self._keys = self._vecs = self._ticks = None
+
+        os.makedirs(cache_dir, exist_ok=True)
+        self._load()
+
+    # --- 파일 관리 ---
+
+    def _path(self, name):
+        return os.path.join(self.cache_dir, name)
+
+    def _load(self):
+        """기존 캐시 파일을 열고 인덱스를 복구 (메타 정보가 다르면 무시)"""
+        try:
+            with open(self._path('meta.json'), 'r') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            return
+
+        if meta.get('model_id') != self.model_id or meta.get('capacity') != self.capacity:
+            print("[EmbCache] 모델/용량 변경 감지. 캐시를 초기화합니다.")
+            self.clear()
+            return
+
+        try:
+            self._open(meta['dim'], create=False)
+        except (OSError, ValueError) as e:
+            print(f"[EmbCache] 캐시 파일 손상: {e}")
+            self.clear()
+            return
+
+        # ticks > 0 인 슬롯만 유효
+        used = np.nonzero(self._ticks > 0)[0]
+        for slot in used:
+            self._index[self._keys[slot].tobytes()] = int(slot)
+        self._free = [int(s) for s in np.nonzero(self._ticks == 0)[0][::-1]]
+        self._clock = int(self._ticks.max()) if len(used) else 0
+        print(f"[EmbCache] {len(self._index)}개 벡터 복구")
+
+    def _open(self, dim, create):
+        mode = 'w+' if create else 'r+'
+        self._keys = np.memmap(self._path('keys.bin'), dtype=np.uint8, mode=mode, shape=(self.capacity, KEY_SIZE))
+        self._vecs = np.memmap(self._path('vecs.bin'), dtype=np.float32, mode=mode, shape=(self.capacity, dim))
+        self._ticks = np.memmap(self._path('ticks.bin'), dtype=np.int64, mode=mode, shape=(self.capacity,))
+        self.dim = dim
+
+    def _create(self, dim):
+        self._open(dim, create=True)
+        self._free = list(range(self.capacity - 1, -1, -1))
+        tmp = self._path('meta.json.tmp')
+        with open(tmp, 'w') as f:
+            json.dump({'model_id': self.model_id, 'dim': dim, 'capacity': self.capacity}, f)
+        os.replace(tmp, self._path('meta.json'))
+
+    def clear(self):
+        """캐시 파일 전체 삭제"""
+        self._keys = self._vecs = self._ticks = None
+        self._index = {}
+        self._free = []
+        self._clock = 0
+        self.dim = None
+        for name in ('meta.json', 'keys.bin', 'vecs.bin', 'ticks.bin'):
+            try:
+                os.remove(self._path(name))
+            except OSError:
+                pass
+
+    def flush(self):
+        if self._vecs is not None:
+            self._vecs.flush()
+            self._keys.flush()
+            self._ticks.flush()
+
+    # --- 조회/저장 ---
+
+    def get(self, key):
+        """캐시된 벡터 반환 (없으면 None)"""
+        slot = self._index.get(key)
+        if slot is None or self._keys[slot].tobytes() != key:
+            if slot is not None:
+                del self._index[key]
+            self.misses += 1
+            return None
+
+        self._clock += 1
+        self._ticks[slot] = self._clock
+        self.hits += 1
+        return np.array(self._vecs[slot])
+
+    def put(self, key, vec):
+        vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+        if self.dim is None:
+            self._create(vec.shape[0])
+        if vec.shape[0] != self.dim:
+            return
+
+        slot = self._index.get(key)
+        if slot is None:
+            if self._free:
+                slot = self._free.pop()
+            else:
+                # 가장 오래 사용되지 않은 슬롯 교체
+                slot = int(np.argmin(self._ticks))
+                self._index.pop(self._keys[slot].tobytes(), None)
+                self.evictions += 1
+
+        # 키를 먼저 지우고 벡터 -> 키 순서로 기록 (중간에 죽어도 잘못된 벡터가 조회되지 않음)
+        self._keys[slot] = 0
+        self._vecs[slot] = vec
+        self._keys[slot] = np.frombuffer(key, dtype=np.uint8)
+        self._clock += 1
+        self._ticks[slot] = self._clock
+        self._index[key] = slot
+
+        self._puts += 1
+        if self._puts % self.flush_every == 0:
+            self.flush()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "size": len(self._index),
+            "capacity": self.capacity,
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+    def __len__(self):
+        return len(self._index)
@@ -0,0 +1,81 @@
+import os
+import time
+import hashlib
+import numpy as np
+
+# ==============================================================================
+# 목표 확장 결과 영구 저장소
+# - 키: (목표 텍스트, 임베딩 모델 ID)
+# - 값: 확장된 앵커 목록 + 앵커 임베딩 행렬 (.npz 바이너리 1개)
+# 같은 목표로 다시 시작하면 Gemini 호출과 앵커 인코딩을 모두 건너뜀
+# ==============================================================================
+
+class GoalStore:
+    def __init__(self, store_dir, model_id):
+        self.store_dir = store_dir
+        self.model_id = model_id
+        os.makedirs(store_dir, exist_ok=True)
+
+    def _path(self, goal):
+        raw = f"{self.model_id}\x00{goal.strip()}".encode('utf-8')
+        return os.path.join(self.store_dir, hashlib.sha1(raw).hexdigest() + '.npz')
+
+    def get(self, goal):
+        """저장된 (앵커 목록, 임베딩 행렬) 반환 (없으면 None)"""
+        try:
+            with np.load(self._path(goal), allow_pickle=False) as f:
+                if str(f['goal']) != goal.strip() or str(f['model_id']) != self.model_id:
+                    return None
+                return [str(a) for a in f['anchors']], np.array(f['emb'])
+        except (OSError, KeyError, ValueError):
+            return None
+
+    def put(self, goal, anchors, embeddings):
+        path = self._path(goal)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            np.savez(f,
+                     goal=np.array(goal.strip()),
+                     model_id=np.array(self.model_id),
+                     anchors=np.array(anchors, dtype=str),
+                     emb=np.asarray(embeddings, dtype=np.float32),
+                     created=np.array(time.time()))
+        os.replace(tmp, path)
+
+    def evict(self, goal):
+        """목표 하나 삭제 (다음 시작 시 다시 확장됨)"""
+        try:
+            os.remove(self._path(goal))
+            return True
+        except OSError:
+            return False
+
+    def clear(self):
+        count = 0
+        for name in os.listdir(self.store_dir):
+            if name.endswith('.npz'):
+                try:
+                    os.remove(os.path.join(self.store_dir, name))
+                    count += 1
+                except OSError:
+                    pass
+        return count
+
+    def list(self):
+        """저장된 목표 목록"""
+        goals = []
+        for name in os.listdir(self.store_dir):
+            if not name.endswith('.npz'):
+                continue
+            try:
+                with np.load(os.path.join(self.store_dir, name), allow_pickle=False) as f:
+                    if str(f['model_id']) != self.model_id:
+                        continue
+                    goals.append({
+                        "goal": str(f['goal']),
+                        "anchors": len(f['anchors']),
+                        "created": float(f['created'])
+                    })
+            except (OSError, KeyError, ValueError):
+                continue
+        return goals
@@ -1,89 +1,437 @@
 import multiprocessing
+from multiprocessing import shared_memory, resource_tracker
 import atexit
-from ai.proc.analysis import FocusAnalysisProcess 
+import itertools
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from ai.proc.analysis import FocusAnalysisProcess, CMD_SET_GOAL, CMD_ATTACH_GOAL, CMD_IDLE, CMD_STOP
+from ai.proc.embcache import content_key
 
-class FocusManager:
-    def __init__(self):
+ANALYSIS_WORKERS = 1     # 분석 워커 프로세스 수 (워커마다 모델을 1벌씩 메모리에 올림)
+MODEL_LOAD_TIMEOUT = 60  # 모델 로드(콜드 스타트) 대기 시간 (초)
+GOAL_TIMEOUT = 30        # 목표 확장/교체 대기 시간 (초)
+ATTACH_TIMEOUT = 10      # 다른 워커가 공유 목표 벡터를 연결하는 대기 시간 (초)
+ANALYZE_TIMEOUT = 5      # 페이지 분석 결과 대기 시간 (초)
+AFFINITY_SLACK = 2       # 내용 해시로 정한 워커가 가장 한가한 워커보다 이만큼까지 더 바빠도 그 워커로 보냄
+STALL_FACTOR = 4         # 처리 중인 요청이 있는데 ANALYZE_TIMEOUT의 이 배수 동안 결과가 하나도 없으면 워커를 재시작
+
+class _WorkerSlot:
+    """워커 프로세스 1개와 통신 채널, 상태 정보"""
+    def __init__(self, idx):
+        self.idx = idx
         self.process = None
         self.task_queue = None
         self.result_queue = None
-        self.status_event = None
+        self.ready_event = None
+        self.reader_stop = None
+        self.goal_attached = False
+        self.inflight = 0
+        self.failures = 0
+        self.restarts = 0
+        self.reviving = False
+        self.last_ok = None
+        self.backlog = 0         # 보냈지만 워커가 아직 답하지 않은 요청 수 (시간 초과로 포기한 요청 포함)
+        self.last_result = None  # 마지막으로 결과를 받은 시각 (time.monotonic)
+        self.busy_since = None   # backlog가 0에서 1이 된 시각
+
+    def is_alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def is_ready(self):
+        return self.is_alive() and self.ready_event.is_set()
+
+    def status(self):
+        return {
+            "worker": self.idx,
+            "pid": self.process.pid if self.process is not None else None,
+            "alive": self.is_alive(),
+            "ready": self.is_ready(),
+            "goal_attached": self.goal_attached,
+            "inflight": self.inflight,
+            "failures": self.failures,
+            "restarts": self.restarts,
+            "last_ok": self.last_ok,
+            "backlog": self.backlog,
+            "stalled_s": round(self.stalled_for(), 1)
+        }
+
+    def stalled_for(self):
+        """답하지 않은 요청이 있는데 결과가 하나도 오지 않은 시간 (초, 밀린 요청이 없으면 0)"""
+        if self.backlog <= 0:
+            return 0.0
+        since = max(self.last_result or 0.0, self.busy_since or 0.0)
+        return time.monotonic() - since
+
+class FocusManager:
+    def __init__(self, num_workers=ANALYSIS_WORKERS):
+        self.workers = [_WorkerSlot(i) for i in range(max(1, num_workers))]
+        self.active_goal = None
+        self._goal = None  # 현재 목표의 공유 메모리 정보 {"shm", "shape", "anchors"}
         self.lock = multiprocessing.Lock() # 스레드 안전성을 위한 Lock
-        
-    def start_monitoring(self, user_goal):
-        """모니터링 프로세스 시작 (이미 실행 중이면 무시)"""
+
+        # 요청 ID -> (Future, 워커) (결과 수신 스레드가 해당 요청에 결과를 전달)
+        self._pending = {}
+        self._pending_lock = threading.Lock()
+        self._req_ids = itertools.count(1)
+        self._rr = itertools.count()
+        # 시간 초과로 포기한 요청 ID -> 늦게 도착한 응답을 정리하는 함수 (공유 메모리 삭제 등)
+        self._late = {}
+
+    # --- 워커 생명주기 ---
+
+    def _torch_threads(self):
+        """워커가 여러 개면 코어를 나눠 쓰도록 torch 스레드 수 제한"""
+        if len(self.workers) == 1:
+            return None
+        return max(1, (os.cpu_count() or 1) // len(self.workers))
+
+    def _start_worker(self, slot):
+        """워커 프로세스 시작 (모델은 여기서 한 번만 로드됨)"""
+        if os.name != 'nt':
+            # 워커들이 같은 resource tracker를 쓰도록 먼저 띄워 둠
+            # (워커마다 따로 뜨면 워커 하나가 죽을 때 공유 목표 벡터가 삭제됨)
+            resource_tracker.ensure_running()
+        slot.task_queue = multiprocessing.Queue()
+        slot.result_queue = multiprocessing.Queue()
+        slot.ready_event = multiprocessing.Event()
+        slot.process = FocusAnalysisProcess(
+            slot.task_queue, slot.result_queue, slot.ready_event, slot.idx, self._torch_threads()
+        )
+        slot.process.start()
+        slot.goal_attached = False
+        slot.failures = 0
+        slot.backlog = 0
+        slot.last_result = time.monotonic()
+
+        # 결과 수신 스레드 (워커마다 하나)
+        slot.reader_stop = threading.Event()
+        threading.Thread(
+            target=self._read_results,
+            args=(slot, slot.process, slot.result_queue, slot.reader_stop),
+            daemon=True
+        ).start()
+
+    def _stop_worker(self, slot):
+        """워커 프로세스 종료"""
+        if slot.reader_stop is not None:
+            slot.reader_stop.set()
+            slot.reader_stop = None
+        self._fail_pending("분석 프로세스가 종료되었습니다.", slot)
+
+        if slot.process:
+            if slot.process.is_alive():
+                # 종료 신호 전송 후 잠시 대기
+                slot.task_queue.put({"cmd": CMD_STOP})
+                slot.process.join(timeout=3)
+
+                # 그래도 안 죽으면 강제 종료
+                if slot.process.is_alive():
+                    slot.process.terminate()
+
+        # 리소스 정리
+        slot.process = None
+        slot.task_queue = None
+        slot.result_queue = None
+        slot.goal_attached = False
+
+    def _ensure_workers(self):
+        """죽었거나 없는 워커를 모두 시작 (lock 안에서 호출). 하나라도 새로 시작했으면 True"""
+        cold = False
+        for slot in self.workers:
+            if not slot.is_alive():
+                if slot.process is not None:
+                    self._stop_worker(slot)
+                    slot.restarts += 1
+                self._start_worker(slot)
+                cold = True
+        return cold
+
+    def _revive(self, slot):
+        """죽었거나 응답이 없는 워커를 재시작하고 현재 목표를 다시 연결 (백그라운드 스레드)"""
+        try:
+            with self.lock:
+                self._stop_worker(slot)
+                slot.restarts += 1
+                self._start_worker(slot)
+            if slot.ready_event.wait(timeout=MODEL_LOAD_TIMEOUT) and self._goal is not None:
+                self._attach(slot, self._goal)
+        finally:
+            slot.reviving = False
+
+    def _heal(self, slot):
+        if slot.reviving:
+            return
+        slot.reviving = True
+        print(f"[Manager] 워커{slot.idx} 재시작")
+        threading.Thread(target=self._revive, args=(slot,), daemon=True).start()
+
+    # --- 요청/응답 ---
+
+    def _submit(self, slot, msg):
+        """요청 ID를 붙여 워커에 전달하고 (요청 ID, Future) 반환"""
+        req_id = next(self._req_ids)
+        future = Future()
+        with self._pending_lock:
+            self._pending[req_id] = (future, slot)
+            slot.inflight += 1
+            if slot.backlog <= 0:
+                slot.busy_since = time.monotonic()
+            slot.backlog += 1
+        try:
+            # sent_at: 워커가 큐 대기 시간을 계산하는 기준 (프로세스 간 비교이므로 time.time)
+            slot.task_queue.put({**msg, 'req_id': req_id, 'sent_at': time.time()})
+        except Exception:
+            self._done(req_id)
+            raise
+        return req_id, future
+
+    def _done(self, req_id):
+        with self._pending_lock:
+            entry = self._pending.pop(req_id, None)
+            if entry is not None:
+                entry[1].inflight -= 1
+
+    def _read_results(self, slot, process, result_queue, stop):
+        """result_queue의 결과를 요청 ID로 찾아 해당 Future에 전달"""
+        while not stop.is_set():
+            try:
+                result = result_queue.get(timeout=0.5)
+            except queue.Empty:
+                if not process.is_alive():
+                    self._fail_pending("분석 프로세스가 종료되었습니다.", slot)
+                    return
+                continue
+            except (EOFError, OSError):
+                return
+
+            req_id = result.pop('req_id', None)
+            with self._pending_lock:
+                slot.last_result = time.monotonic()
+                slot.backlog = max(0, slot.backlog - 1)
+                entry = self._pending.get(req_id)
+                late = self._late.pop(req_id, None) if entry is None else None
+            if entry is not None and not entry[0].done():
+                entry[0].set_result(result)
+            elif late is not None:
+                # 시간 초과로 버려진 요청: 응답이 남긴 자원만 정리
+                late[0](result)
+
+    def _fail_pending(self, message, slot=None):
+        with self._pending_lock:
+            failed = [(req_id, entry) for req_id, entry in self._pending.items()
+                      if slot is None or entry[1] is slot]
+            for req_id, entry in failed:
+                del self._pending[req_id]
+                entry[1].inflight -= 1
+            # 워커가 죽으면 늦은 응답도 오지 않음
+            for req_id in [r for r, (_, s) in self._late.items() if slot is None or s is slot]:
+                del self._late[req_id]
+        for _, (future, _) in failed:
+            if not future.done():
+                future.set_result({"error": message})
+
+    def _call(self, slot, msg, timeout, on_late=None):
+        """
+        제어 메시지를 보내고 응답을 기다림 (시간 초과 시 None)
+        on_late: 시간 초과 후에 응답이 도착하면 on_late(응답) 호출
+        """
+        req_id, future = self._submit(slot, msg)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            if on_late is not None:
+                with self._pending_lock:
+                    self._late[req_id] = (on_late, slot)
+            return None
+        finally:
+            self._done(req_id)
+
+    def _attach(self, slot, goal):
+        reply = self._call(slot, {"cmd": CMD_ATTACH_GOAL, **goal}, ATTACH_TIMEOUT)
+        slot.goal_attached = bool(reply and reply.get('ok'))
+        return slot.goal_attached
+
+    def _pick_worker(self, key=None):
+        """
+        목표가 연결된 워커 중 처리 중인 요청이 가장 적은 워커 선택 (동률이면 라운드 로빈)
+        key: 페이지 내용 해시. 정해진 워커가 크게 밀려 있지 않으면 그 워커로 보냄
+             (임베딩 캐시가 워커별 폴더(cache/emb/wN)에 나뉘어 있어 같은 페이지는 같은 워커로 가야 적중)
+        """
+        n = len(self.workers)
+        start = next(self._rr) % n
+        best = None
+        for i in range(n):
+            slot = self.workers[(start + i) % n]
+            if not slot.is_alive():
+                # 죽은 워커는 백그라운드에서 재시작
+                if slot.process is not None:
+                    self._heal(slot)
+                continue
+            if not slot.goal_attached or not slot.ready_event.is_set():
+                continue
+            if best is None or slot.inflight < best.inflight:
+                best = slot
+        if key is not None and best is not None and n > 1:
+            home = self.workers[int.from_bytes(key[:4], 'little') % n]
+            if (home.goal_attached and home.ready_event.is_set() and home.is_alive()
+                    and home.inflight <= best.inflight + AFFINITY_SLACK):
+                return home
+        return best
+
+    # --- 공개 API ---
+
+    def warm_up(self):
+        """서버 시작 시 워커를 미리 띄워 모델을 로드해 둠 (블로킹하지 않음)"""
+        with self.lock:
+            self._ensure_workers()
+
+    def start_monitoring(self, user_goal, refresh_goal=False):
+        """모니터링 시작: 워커가 없으면 띄우고, 목표만 교체 (이미 실행 중이면 무시)
+        refresh_goal: True면 저장된 목표 확장 결과를 무시하고 새로 확장"""
         with self.lock:
-            if self.process is not None and self.process.is_alive():
+            if self.active_goal is not None and any(s.is_alive() for s in self.workers):
                 return {"status": "already_running", "message": "이미 분석 중입니다."}
 
-            # 통신 채널 생성
-            self.task_queue = multiprocessing.Queue()
-            self.result_queue = multiprocessing.Queue()
-            self.status_event = multiprocessing.Event()
+            start_t = time.time()
+            cold = self._ensure_workers()
 
-            # 워커 프로세스 생성 및 시작
-            # (이전 답변의 FocusAnalysisProcess 클래스 사용)
-            self.process = FocusAnalysisProcess(
-                user_goal, self.task_queue, self.result_queue, self.status_event
-            )
-            self.process.start()
+            # 모델 로드 완료 대기 (웜 상태면 즉시 통과)
+            deadline = start_t + MODEL_LOAD_TIMEOUT
+            ready = [s for s in self.workers if s.ready_event.wait(timeout=max(0, deadline - time.time()))]
+            if not ready:
+                for slot in self.workers:
+                    self._stop_worker(slot)
+                return {"status": "error", "message": "모델 로드 시간 초과"}
 
-            # 초기화 완료 대기 (블로킹 방지를 위해 타임아웃 설정 권장)
-            # 실제로는 비동기로 처리하거나, 짧게 대기
-            is_ready = self.status_event.wait(timeout=30) 
-            
-            if not is_ready:
-                self.stop_monitoring()
-                return {"status": "error", "message": "초기화 시간 초과"}
+            # 1. 첫 워커가 목표 확장 + 인코딩 후 공유 메모리에 올림
+            leader = ready[0]
+            reply = self._call(leader, {"cmd": CMD_SET_GOAL, "goal": user_goal, "refresh": refresh_goal}, GOAL_TIMEOUT,
+                               on_late=self._discard_goal_reply)
+            if reply is None or reply.get('error'):
+                leader.task_queue.put({"cmd": CMD_IDLE})
+                message = reply['error'] if reply else "초기화 시간 초과"
+                return {"status": "error", "message": message}
+            leader.goal_attached = True
+            self._release_goal()
+            self._goal = {"shm": reply['shm'], "shape": reply['shape'], "anchors": reply['anchors']}
 
-            return {"status": "started", "message": "집중 분석이 시작되었습니다."}
+            # 2. 나머지 워커는 같은 공유 메모리를 연결 (재계산 없음)
+            for slot in ready[1:]:
+                if not self._attach(slot, self._goal):
+                    print(f"[Manager] 워커{slot.idx} 목표 연결 실패")
+
+            self.active_goal = user_goal
+            return {
+                "status": "started",
+                "message": "집중 분석이 시작되었습니다.",
+                "cold_start": cold,
+                "workers": sum(1 for s in self.workers if s.goal_attached),
+                "startup_s": round(time.time() - start_t, 3),
+                "model_load_s": round(max(s.process.load_seconds.value for s in ready), 3),
+                "goal_swap_s": round(reply['swap_s'], 3)
+            }
 
     def analyze_page(self, page_data):
         """웹 페이지 데이터 분석 요청"""
-        if not self.process or not self.process.is_alive():
+        key = content_key(page_data.get('title'), page_data.get('meta'), page_data.get('body'))
+        slot = self._pick_worker(key) if self.active_goal is not None else None
+        if slot is None:
             return {"status": "error", "message": "프로세스가 실행 중이 아닙니다."}
 
+        req_id = None
         try:
-            # 1. 작업 큐에 넣기
-            self.task_queue.put(page_data)
-            
-            # 2. 결과 큐에서 대기 (Timeout 필수: 프로세스가 죽었을 경우 대비)
-            result = self.result_queue.get(timeout=5) 
+            # 1. 요청 ID를 붙여 작업 큐에 넣기
+            req_id, future = self._submit(slot, page_data)
+
+            # 2. 내 요청의 결과만 대기 (Timeout 필수: 프로세스가 죽었을 경우 대비)
+            result = future.result(timeout=ANALYZE_TIMEOUT)
             if(result.get('error')):
                 return {"status": "error", "message": result['error']}
+            slot.failures = 0
+            slot.last_ok = time.time()
             return {"status": "success", "data": result}
-            
-        except multiprocessing.queues.Empty:
+
+        except FutureTimeout:
+            slot.failures += 1
+            # 느리기만 한 워커(큰 배치, 긴 문서, 밀린 큐)는 그대로 두고, 죽었거나 결과가 완전히 멈춘 경우만 재시작
+            if not slot.is_alive() or slot.stalled_for() > ANALYZE_TIMEOUT * STALL_FACTOR:
+                self._heal(slot)
             return {"status": "timeout", "message": "분석 응답 시간이 초과되었습니다."}
         except Exception as e:
             return {"status": "error", "message": str(e)}
+        finally:
+            if req_id is not None:
+                self._done(req_id)
+
+    def cache_stats(self):
+        """워커들의 임베딩 캐시 적중/미스 횟수 합계 조회"""
+        hits = misses = 0
+        for slot in self.workers:
+            process = slot.process
+            if process is not None:
+                hits += process.cache_hits.value
+                misses += process.cache_misses.value
+        total = hits + misses
+        return {"hits": hits, "misses": misses, "hit_rate": hits / total if total else 0.0}
+
+    def pool_status(self):
+        return {
+            "active_goal": self.active_goal,
+            "workers": [slot.status() for slot in self.workers]
+        }
+
+    def _discard_goal_reply(self, reply):
+        """시간 초과 후 늦게 온 SET_GOAL 응답: 아무도 쓰지 않을 공유 메모리를 삭제"""
+        if reply.get('shm'):
+            print(f"[Manager] 늦게 도착한 목표 벡터 삭제: {reply['shm']}")
+            _unlink_shm(reply['shm'])
+
+    def _release_goal(self):
+        """이전 목표의 공유 메모리 이름 삭제 (워커들은 이미 연결된 메모리를 계속 쓸 수 있음)"""
+        if self._goal is None:
+            return
+        _unlink_shm(self._goal['shm'])
+        self._goal = None
 
     def stop_monitoring(self):
-        """모니터링 프로세스 종료"""
+        """모니터링 종료: 워커는 죽이지 않고 목표만 비운 채 대기시킴 (다음 세션에서 재사용)"""
         with self.lock:
-            if self.process:
-                if self.process.is_alive():
-                    self.process.terminate()
-                    # 종료 신호 전송
-                    #self.task_queue.put("STOP")
-                    #self.process.join(timeout=3) # 3초 대기
-                    
-                    # 그래도 안 죽으면 강제 종료
-                    if self.process.is_alive():
-                        self.process.terminate()
-                
-                # 리소스 정리
-                self.process = None
-                self.task_queue = None
-                self.result_queue = None
-                return {"status": "stopped", "message": "분석이 종료되었습니다."}
-            return {"status": "not_running", "message": "실행 중인 프로세스가 없습니다."}
+            if self.active_goal is None:
+                return {"status": "not_running", "message": "실행 중인 프로세스가 없습니다."}
+
+            self.active_goal = None
+            for slot in self.workers:
+                slot.goal_attached = False
+                if slot.is_alive():
+                    slot.task_queue.put({"cmd": CMD_IDLE})
+            self._release_goal()
+            return {"status": "stopped", "message": "분석이 종료되었습니다."}
+
+    def shutdown(self):
+        """서버 종료 시 워커 프로세스까지 정리"""
+        with self.lock:
+            for slot in self.workers:
+                self._stop_worker(slot)
+            self.active_goal = None
+            self._release_goal()
+
+def _unlink_shm(name):
+    """공유 메모리 이름 삭제 (이미 없으면 무시)"""
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        shm.unlink()
+    except (FileNotFoundError, OSError):
+        pass
 
 # 전역 매니저 인스턴스 생성
 focus_manager = FocusManager()
 
 # 서버가 죽을 때 자식 프로세스도 같이 죽도록 등록
 def cleanup():
-    focus_manager.stop_monitoring()
+    focus_manager.shutdown()
 
-atexit.register(cleanup)
\ No newline at end of file
+atexit.register(cleanup)
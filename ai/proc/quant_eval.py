@@ -0,0 +1,138 @@
+# 📄 ai/proc/quant_eval.py
+# 저정밀도(int8/bf16) 추론이 집중 판정을 얼마나 바꾸는지 fp32와 비교하는 도구
+#
+# 사용법 (앱 폴더에서 실행, settings.json 필요):
+#   python -m ai.proc.quant_eval pages.jsonl --precision int8 --out quant_int8.json
+#
+# pages.jsonl 한 줄 형식:
+#   {"goal": "...", "anchors": ["..."](선택), "url": "...", "title": "...", "meta": "...", "body": "...", "label": true}
+# anchors가 없으면 목표 저장소(cache/goals)에 저장된 확장 결과를, 그것도 없으면
+# FOCUS_FAKE_LLM=1일 때 로컬 규칙(fake_expand_goal)으로 만든 앵커를, 아니면 [goal]만 사용
+# 합성 페이지로 실행: python -m bench.run_bench --export-labeled pages.jsonl
+import argparse
+import io
+import json
+import time
+import numpy as np
+import torch
+from ai.proc.goalstore import GoalStore
+from ai.proc.analysis import (
+    EMBED_MODEL_PATH, FOCUS_THRESHOLD, GOAL_STORE_DIR, FAKE_LLM, embed_model_id, fake_expand_goal,
+    load_embed_model, encode_queries, preprocess, format_doc
+)
+
+def load_pages(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def resolve_anchors(pages):
+    """목표별 앵커 목록 결정 (파일 > 목표 저장소 > 로컬 규칙(FAKE_LLM) > 목표 원문)"""
+    store = GoalStore(GOAL_STORE_DIR, embed_model_id('fp32'))
+    anchors = {}
+    for page in pages:
+        goal = page['goal']
+        if goal in anchors:
+            continue
+        if page.get('anchors'):
+            anchors[goal] = list(page['anchors'])
+        else:
+            entry = store.get(goal)
+            if entry is not None:
+                anchors[goal] = entry[0]
+            else:
+                anchors[goal] = fake_expand_goal(goal) if FAKE_LLM else [goal]
+    return anchors
+
+def state_size(model):
+    """직렬화된 가중치 크기 (bytes) - 양자화된 packed 가중치까지 포함"""
+    buf = io.BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell()
+
+def score_pages(model, pages, anchors, batch_size):
+    """페이지별 (최고 점수, 앵커 번호)와 문서 인코딩 시간 반환 (워커와 같은 입력 형식 사용)"""
+    query_embs = {goal: encode_queries(model, qs) for goal, qs in anchors.items()}
+    docs = [format_doc(preprocess(p.get('title', '')), preprocess(p.get('meta', '')), preprocess(p.get('body', '')))
+            for p in pages]
+
+    start_t = time.perf_counter()
+    doc_embs = model.encode(docs, batch_size=batch_size)
+    encode_s = time.perf_counter() - start_t
+
+    scores = np.zeros(len(pages))
+    idxs = np.zeros(len(pages), dtype=int)
+    for i, page in enumerate(pages):
+        sims = model.similarity(query_embs[page['goal']], doc_embs[i:i+1]).numpy().flatten()
+        idxs[i] = int(np.argmax(sims))
+        scores[i] = float(sims[idxs[i]])
+    return scores, idxs, encode_s
+
+def evaluate(pages, precision, threshold, batch_size, runs):
+    anchors = resolve_anchors(pages)
+    labels = np.array([bool(p['label']) if 'label' in p else None for p in pages], dtype=object)
+    has_label = np.array([l is not None for l in labels])
+
+    report = {"model": EMBED_MODEL_PATH, "pages": len(pages), "goals": len(anchors), "threshold": threshold, "models": {}}
+    baseline = None
+    for name in ('fp32', precision):
+        model, applied = load_embed_model('cpu', name)
+        # 첫 실행은 워밍업으로 보고 이후 실행 시간의 최솟값 사용
+        score_pages(model, pages[:batch_size], anchors, batch_size)
+        best_s = None
+        for _ in range(max(1, runs)):
+            scores, idxs, encode_s = score_pages(model, pages, anchors, batch_size)
+            best_s = encode_s if best_s is None else min(best_s, encode_s)
+
+        decisions = scores >= threshold
+        entry = {
+            "applied_precision": applied,
+            "state_bytes": state_size(model),
+            "encode_s": round(best_s, 4),
+            "pages_per_s": round(len(pages) / best_s, 2) if best_s else None,
+            "focused": int(decisions.sum())
+        }
+        if has_label.any():
+            entry["label_accuracy"] = round(float((decisions[has_label] == labels[has_label].astype(bool)).mean()), 4)
+
+        if baseline is None:
+            baseline = (scores, idxs, decisions, entry)
+        else:
+            b_scores, b_idxs, b_decisions, b_entry = baseline
+            flips = np.nonzero(decisions != b_decisions)[0]
+            entry.update({
+                "speedup": round(b_entry["encode_s"] / best_s, 3) if best_s else None,
+                "memory_saving": round(1 - entry["state_bytes"] / b_entry["state_bytes"], 4),
+                "decision_agreement": round(1 - len(flips) / len(pages), 4),
+                "anchor_agreement": round(float((idxs == b_idxs).mean()), 4),
+                "score_mae": round(float(np.abs(scores - b_scores).mean()), 5),
+                "score_max_diff": round(float(np.abs(scores - b_scores).max()), 5),
+                "flips": [{
+                    "url": pages[i].get('url'),
+                    "fp32_score": round(float(b_scores[i]), 4),
+                    "score": round(float(scores[i]), 4),
+                    "label": pages[i].get('label')
+                } for i in flips]
+            })
+        report["models"][name] = entry
+        del model
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="저정밀도 추론 vs fp32 집중 판정 비교")
+    parser.add_argument('pages', help="라벨이 달린 페이지 JSONL 파일")
+    parser.add_argument('--precision', default='int8', choices=['int8', 'bf16'])
+    parser.add_argument('--threshold', type=float, default=FOCUS_THRESHOLD)
+    parser.add_argument('--batch-size', type=int, default=16)
+    parser.add_argument('--runs', type=int, default=3)
+    parser.add_argument('--out', help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    report = evaluate(load_pages(args.pages), args.precision, args.threshold, args.batch_size, args.runs)
+    text = json.dumps(report, indent=4, ensure_ascii=False)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text)
+    print(text)
+
+if __name__ == "__main__":
+    main()
@@ -1,34 +1,75 @@
-from bs4 import BeautifulSoup, Comment
+from html.parser import HTMLParser
 import json
+import re
+from telemetry import STAGE_SECONDS
+
+# 한 번에 파서에 넣는 HTML 크기 (</head> 또는 <body>를 만나면 더 넣지 않음)
+HEAD_FEED_SIZE = 16 * 1024
+META_NAMES = ('description', 'keywords')
+# <head> 이후에 나오는 description/keywords 메타 태그 (드물지만 있으면 끝까지 파싱)
+_LATE_META_RE = re.compile(r'<meta\b[^>]*\bname\s*=\s*["\']?(?:description|keywords)\b', re.IGNORECASE)
+
+class _HeadMetaParser(HTMLParser):
+    """<meta name="description|keywords"> 만 찾는 스트리밍 파서 (문서 트리를 만들지 않음)"""
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.found = {}
+        self.head_done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'meta':
+            self._meta(attrs)
+        elif tag == 'body':
+            self.head_done = True
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self.head_done = True
+
+    def _meta(self, attrs):
+        # 중복 속성은 첫 번째 값 사용 (lxml과 동일)
+        values = {}
+        for key, value in attrs:
+            values.setdefault(key, value)
+        name = values.get('name')
+        if name in META_NAMES and name not in self.found:
+            content = values.get('content', ' ')
+            self.found[name] = content if content is not None else ''
 
 def extract_universal_content(html_doc: str) -> str:
     """
-    다양한 웹페이지의 구조화된 데이터를 포함하여 콘텐츠를 추출합니다.
+    다양한 웹페이지의 <head>에서 description/keywords 메타 정보를 추출합니다.
+    HTML을 조각 단위로 파서에 넣고 </head>, <body>를 만나거나 두 값을 모두 찾으면 멈추므로
+    본문이 아무리 커도 문서 전체 트리를 만들지 않습니다.
     """
-    soup = BeautifulSoup(html_doc, 'lxml')
+    parser = _HeadMetaParser()
+    html_doc = html_doc or ''
+    pos = 0
+    while pos < len(html_doc) and not parser.head_done and len(parser.found) < len(META_NAMES):
+        parser.feed(html_doc[pos:pos + HEAD_FEED_SIZE])
+        pos += HEAD_FEED_SIZE
+
+    # <head> 밖에 메타 태그가 있는 드문 경우에만 나머지를 마저 파싱
+    if len(parser.found) < len(META_NAMES) and pos < len(html_doc) and _LATE_META_RE.search(html_doc, pos):
+        parser.feed(html_doc[pos:])
+    parser.close()
+
     # 추출한 정보를 저장할 딕셔너리
     page_info = {
-        'description': '',
-        'keywords': '',
+        'description': parser.found.get('description', ''),
+        'keywords': parser.found.get('keywords', ''),
     }
-
-    # 2. <meta name="description"> 정보 추출
-    # find()는 해당 태그가 없으면 None을 반환하므로, if문으로 확인하는 것이 안전합니다.
-    meta_desc = soup.find('meta', attrs={'name': 'description'})
-    if meta_desc:
-        page_info['description'] = meta_desc.get('content', ' ')
-
-    # 3. <meta name="keywords"> 정보 추출
-    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
-    if meta_keywords:
-        page_info['keywords'] = meta_keywords.get('content', ' ')
-        
-
     return page_info
 
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qs
+import time
+import threading
+from collections import OrderedDict
 
-def is_youtube_url(url):
+_VIDEO_ID_RE = re.compile(r'^[A-Za-z0-9_-]{11}$')
+
+def youtube_video_id(url):
+    """유튜브 영상 URL이면 영상 ID, 아니면 None (watch?v=, /shorts/<id>, youtu.be/<id>)"""
 
     # URL 파싱
     parsed_url = urlparse(url)
@@ -42,25 +83,99 @@ def is_youtube_url(url):
     if domain.startswith("m."):
         domain = domain[2:]
     
-    # 유튜브 도메인 리스트 확인
     # youtube.com: 일반적인 PC/모바일 웹
     # youtu.be: 공유용 단축 URL
-    valid_domains = ["youtube.com", "youtu.be"]
-    if(domain in valid_domains and parsed_url.path in ['/watch', '/shorts']):
-        return True
-    else:
-        return False
+    path = parsed_url.path
+    video_id = None
+    if domain == "youtube.com":
+        if path == '/watch':
+            video_id = parse_qs(parsed_url.query).get('v', [None])[0]
+        elif path.startswith('/shorts/'):
+            video_id = path.split('/')[2]
+    elif domain == "youtu.be":
+        video_id = path.strip('/').split('/')[0]
+
+    if video_id and _VIDEO_ID_RE.match(video_id):
+        return video_id
+    return None
+
+def is_youtube_url(url):
+    return youtube_video_id(url) is not None
+
+_PLAYER_RESPONSE_RE = re.compile(r'ytInitialPlayerResponse\s*=\s*\{')
+
+def extract_youtube_meta(html_doc, video_id):
+    """
+    확장 프로그램이 보낸 HTML에 들어 있는 ytInitialPlayerResponse에서 영상 정보 추출
+    SPA 이동 후에는 HTML에 이전 영상 정보가 남아 있으므로 영상 ID가 다르면 None
+    """
+    if not html_doc:
+        return None
+    match = _PLAYER_RESPONSE_RE.search(html_doc)
+    if not match:
+        return None
+
+    try:
+        player, _ = json.JSONDecoder().raw_decode(html_doc, match.end() - 1)
+    except ValueError:
+        return None
+
+    details = player.get('videoDetails') or {}
+    if details.get('videoId') != video_id:
+        return None
+
+    return {
+        "title": details.get('title') or ' ',
+        "tags": details.get('keywords') or [],
+        "description": (details.get('shortDescription') or ' ')[:1000]
+    }
+
+class VideoMetaCache:
+    """영상 ID -> 영상 정보 (TTL + 최대 개수 제한, 여러 waitress 스레드에서 공유)"""
+    def __init__(self, ttl=6 * 3600, capacity=1024):
+        self.ttl = ttl
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, video_id):
+        with self._lock:
+            item = self._items.get(video_id)
+            if item is None or item[0] < time.monotonic():
+                if item is not None:
+                    del self._items[video_id]
+                self.misses += 1
+                return None
+            self._items.move_to_end(video_id)
+            self.hits += 1
+            return item[1]
+
+    def put(self, video_id, info):
+        with self._lock:
+            self._items[video_id] = (time.monotonic() + self.ttl, info)
+            self._items.move_to_end(video_id)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._items),
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+video_cache = VideoMetaCache()
 
 import yt_dlp
 
-def get_video_info(url):
-    """유튜브 비디오 정보를 텍스트로 추출하는 함수"""
-    
-    # 1. URL 유효성 검사
-    if not is_youtube_url(url):
-        return False
+def fetch_video_info(url):
+    """yt-dlp로 유튜브 비디오 정보를 가져오는 함수 (네트워크 요청, HTML에서 못 찾았을 때만 사용)"""
 
-    # 2. yt-dlp 설정 (다운로드는 하지 않고 정보만 추출)
+    # yt-dlp 설정 (다운로드는 하지 않고 정보만 추출)
     ydl_opts = {
         'quiet': True,           # 불필요한 로그 출력 끄기
         'extract_flat': False,   # 전체 정보 가져오기
@@ -73,11 +188,11 @@ def get_video_info(url):
             # 정보 추출 (download=False 필수)
             info = ydl.extract_info(url, download=False)
             
-            # 3. 필요한 정보만 딕셔너리로 정리
+            # 필요한 정보만 딕셔너리로 정리
             video_data = {
-                "title": info.get('title', ' '),
-                "tags": info.get('tags', []),
-                "description": info.get('description', ' ')[:1000] 
+                "title": info.get('title') or ' ',
+                "tags": info.get('tags') or [],
+                "description": (info.get('description') or ' ')[:1000]
             }
             
             return video_data
@@ -85,13 +200,54 @@ def get_video_info(url):
     except Exception as e:
         return False
 
+def get_video_info(url, html_doc=None):
+    """유튜브 비디오 정보를 텍스트로 추출하는 함수 (캐시 -> 페이지 HTML -> yt-dlp 순서)"""
+    
+    # 1. URL 유효성 검사
+    video_id = youtube_video_id(url)
+    if not video_id:
+        return False
+
+    # 2. 최근에 본 영상이면 캐시 사용
+    video_data = video_cache.get(video_id)
+    if video_data:
+        return video_data
+
+    # 3. 이미 받은 HTML에서 추출, 실패하면 yt-dlp로 가져오기
+    video_data = extract_youtube_meta(html_doc, video_id)
+    if not video_data:
+        with STAGE_SECONDS.time(stage='yt_dlp'):
+            video_data = fetch_video_info(url)
+    if video_data:
+        video_cache.put(video_id, video_data)
+    return video_data
+
 
 
+def page_meta(response):
+    """
+    description/keywords 메타 정보
+    lean 형식은 확장 프로그램이 <head>에서 뽑아 보낸 값을 그대로 사용, 그 외에는 HTML에서 추출
+    """
+    if response.get('format') == 'lean':
+        meta = response.get('meta') or {}
+        return {
+            'description': meta.get('description') or '',
+            'keywords': meta.get('keywords') or '',
+        }
+    return extract_universal_content(response.get('html'))
+
 def process_html(response):
+    """
+    확장 프로그램 요청 본문 -> 분석용 {url, title, meta, body}
+    full 형식: {url, title, text, html}
+    lean 형식: {format: 'lean', url, title, text(상한까지), meta: {description, keywords}, player(유튜브 영상만)}
+    """
     extractedDict = dict()
     extractedDict['url'] = response['url']
     
-    vMeta = get_video_info(response['url'])
+    # lean 형식에서는 ytInitialPlayerResponse 스크립트만 player로 전달됨
+    vMeta = get_video_info(response['url'], response.get('html') or response.get('player'))
 
     if vMeta:
         extractedDict['title'] = vMeta['title']
@@ -101,7 +257,7 @@ def process_html(response):
     else:
         extractedDict['title'] = response['title']
         extractedDict['body'] = response['text']
-        unc = extract_universal_content(response['html'])
+        unc = page_meta(response)
         extractedDict['meta'] = unc['description'] + unc['keywords']
 
     return extractedDict
@@ -0,0 +1,105 @@
+import os
+import json
+import time
+from urllib.parse import urlparse
+
+# ==============================================================================
+# 화이트/블랙리스트 URL 매처
+# - 목록 항목은 만들 때 한 번만 정규화
+# - collect(도메인 전체) 항목: 도메인 해시 조회
+# - 그 외 항목: 정규화된 도메인+경로 해시 조회
+# - settings.json이 바뀌면 새 매처를 만들어 한 번에 교체 (조회 중인 스레드는 이전 매처를 그대로 사용)
+# ==============================================================================
+
+def normalize_url(url):
+    if not url.startswith(('http://', 'https://')):
+        url = 'http://' + url  # 파싱을 위해 임시 스키마 추가
+
+    parsed = urlparse(url)
+    # netloc(도메인) + path(경로)를 합치고, 끝의 '/'는 제거하여 표준화
+    clean_url = (parsed.netloc + parsed.path).rstrip('/')
+    return parsed.netloc, clean_url
+
+
+class UrlMatcher:
+    """목록 1개를 미리 정규화해 둔 조회용 인덱스"""
+    def __init__(self, entries):
+        self.domains = set()
+        self.paths = set()
+        for item in entries or []:
+            domain, full = normalize_url(item['url'])
+            if item.get('collect'):
+                self.domains.add(domain)
+            else:
+                self.paths.add(full)
+
+    def match(self, normalized):
+        """normalized: normalize_url()의 반환값 (domain, clean_url)"""
+        domain, full = normalized
+        return domain in self.domains or full in self.paths
+
+    def __len__(self):
+        return len(self.domains) + len(self.paths)
+
+
+class UrlLists:
+    def __init__(self, path='settings.json', check_interval=1.0):
+        """
+        path: WHITE/BLACK 목록이 들어 있는 설정 파일
+        check_interval: 파일 변경 여부를 확인하는 최소 간격 (초)
+        """
+        self.path = path
+        self.check_interval = check_interval
+        self._next_check = 0
+        self._stamp = None
+        # (화이트 매처, 블랙 매처)를 튜플 하나로 묶어 교체 -> 읽는 쪽은 lock 불필요
+        self._matchers = (UrlMatcher([]), UrlMatcher([]))
+        self.reload()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def reload(self, config=None):
+        """설정 파일(또는 전달된 설정 dict)로 매처를 다시 만듦. 실패하면 이전 매처 유지"""
+        try:
+            stamp = self._file_stamp()
+            if config is None:
+                with open(self.path, 'r') as f:
+                    config = json.load(f)
+            matchers = (UrlMatcher(config.get('WHITE')), UrlMatcher(config.get('BLACK')))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"[UrlLists] 목록 로드 실패 (이전 목록 유지): {e}")
+            return False
+
+        self._matchers = matchers
+        self._stamp = stamp
+        return True
+
+    def _current(self):
+        """check_interval마다 파일 변경 여부를 확인하고 현재 매처 반환"""
+        now = time.monotonic()
+        if now >= self._next_check:
+            self._next_check = now + self.check_interval
+            try:
+                if self._file_stamp() != self._stamp:
+                    self.reload()
+            except OSError:
+                pass
+        return self._matchers
+
+    def classify(self, url):
+        """'WHITELIST' / 'BLACKLIST' / None (화이트리스트 우선)"""
+        white, black = self._current()
+        normalized = normalize_url(url)
+        if white.match(normalized):
+            return 'WHITELIST'
+        if black.match(normalized):
+            return 'BLACKLIST'
+        return None
+
+    def is_white(self, url):
+        return self._current()[0].match(normalize_url(url))
+
+    def is_black(self, url):
+        return self._current()[1].match(normalize_url(url))
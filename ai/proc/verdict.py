@@ -0,0 +1,171 @@
+import threading
+import hashlib
+from collections import OrderedDict, deque
+from urllib.parse import urlparse
+
+# ==============================================================================
+# 분석 결과(판정) 재사용
+# - list_verdict: 화이트/블랙리스트 판정 결과 형식 (워커/서버 공통)
+# - VerdictCache: 세션 안에서 같은 URL을 다시 방문하면 스크래핑/모델 호출 없이 이전 판정 재사용
+# - NearDupIndex: URL은 달라도 내용이 거의 같은 페이지(SPA 이동 등)면 이전 판정 재사용 (SimHash)
+# ==============================================================================
+
+def list_verdict(kind):
+    """kind: 'WHITELIST' 또는 'BLACKLIST'"""
+    white = kind == 'WHITELIST'
+    return {
+        "is_focused": white,
+        "score": 1 if white else 0,
+        "matched_query": kind,
+        "elapsed": 0
+    }
+
+def url_key(url):
+    """캐시 키: fragment(#...)와 끝의 '/'만 제거 (쿼리는 유지, 예: watch?v=...)"""
+    return (url or '').split('#', 1)[0].rstrip('/')
+
+
+class VerdictCache:
+    def __init__(self, capacity=1024):
+        self.capacity = capacity
+        self._sid = None
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_session(self, sid):
+        # 세션이 바뀌면 (목표가 다를 수 있으므로) 전부 비움
+        if sid != self._sid:
+            self._sid = sid
+            self._items.clear()
+
+    def get(self, sid, url):
+        with self._lock:
+            self._check_session(sid)
+            verdict = self._items.get(url_key(url))
+            if verdict is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(url_key(url))
+            self.hits += 1
+            return verdict
+
+    def put(self, sid, url, verdict):
+        with self._lock:
+            self._check_session(sid)
+            self._items[url_key(url)] = verdict
+            self._items.move_to_end(url_key(url))
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._sid = None
+            self._items.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": len(self._items),
+            "hit_rate": self.hits / total if total else 0.0
+        }
+
+
+def simhash(text, min_tokens=20, shingle=3):
+    """단어 shingle 기반 64비트 SimHash (토큰이 min_tokens보다 적으면 None)"""
+    tokens = text.lower().split()
+    if len(tokens) < min_tokens:
+        return None
+
+    counts = [0] * 64
+    for i in range(len(tokens) - shingle + 1):
+        piece = ' '.join(tokens[i:i + shingle]).encode('utf-8')
+        h = int.from_bytes(hashlib.blake2b(piece, digest_size=8).digest(), 'little')
+        for bit in range(64):
+            if (h >> bit) & 1:
+                counts[bit] += 1
+            else:
+                counts[bit] -= 1
+
+    fp = 0
+    for bit in range(64):
+        if counts[bit] > 0:
+            fp |= 1 << bit
+    return fp
+
+
+class NearDupIndex:
+    def __init__(self, max_distance=6, per_domain=64, max_domains=256, min_tokens=20):
+        """
+        max_distance: 같은 페이지로 보는 최대 해밍 거리 (64비트 중)
+                      6 이하: 단어가 ~1% 바뀐 정도, 10% 이상 다르면 거의 항상 10 초과
+        per_domain: 도메인별로 기억하는 최근 페이지 수
+        max_domains: 기억하는 도메인 수 (오래 안 쓴 도메인부터 삭제)
+        min_tokens: 이보다 짧은 텍스트는 비교하지 않음 (짧은 글은 조금만 달라도 의미가 다름)
+        """
+        self.max_distance = max_distance
+        self.per_domain = per_domain
+        self.max_domains = max_domains
+        self.min_tokens = min_tokens
+        self._sid = None
+        self._domains = OrderedDict()  # 도메인 -> deque[(fingerprint, verdict)]
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _check_session(self, sid):
+        # 세션이 바뀌면 목표가 다를 수 있으므로 전부 비움
+        if sid != self._sid:
+            self._sid = sid
+            self._domains.clear()
+
+    def fingerprint(self, text):
+        return simhash(text, self.min_tokens)
+
+    def find(self, sid, url, fp):
+        """같은 도메인의 최근 페이지 중 fp와 가까운 페이지의 판정 (없으면 None)"""
+        if fp is None:
+            return None
+        domain = urlparse(url or '').netloc
+        with self._lock:
+            self._check_session(sid)
+            recent = self._domains.get(domain)
+            if recent:
+                for other, verdict in reversed(recent):
+                    if bin(fp ^ other).count('1') <= self.max_distance:
+                        self._domains.move_to_end(domain)
+                        self.hits += 1
+                        return verdict
+            self.misses += 1
+            return None
+
+    def add(self, sid, url, fp, verdict):
+        if fp is None:
+            return
+        domain = urlparse(url or '').netloc
+        with self._lock:
+            self._check_session(sid)
+            recent = self._domains.get(domain)
+            if recent is None:
+                recent = self._domains[domain] = deque(maxlen=self.per_domain)
+            recent.append((fp, verdict))
+            self._domains.move_to_end(domain)
+            while len(self._domains) > self.max_domains:
+                self._domains.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._sid = None
+            self._domains.clear()
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "domains": len(self._domains),
+            "hit_rate": self.hits / total if total else 0.0
+        }
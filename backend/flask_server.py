@@ -4,14 +4,24 @@ from flask_cors import CORS
 from waitress import serve  # ✅ 추가
 import os
 import sys
-from ai.proc.scrape import process_html
+from ai.proc.scrape import process_html, video_cache
 from ai.proc.manager import focus_manager
+from ai.proc.analysis import open_goal_store, url_lists, body_char_budget
+from ai.proc.verdict import VerdictCache, NearDupIndex, list_verdict
+from backend.ingest import IngestPipeline, Overloaded, Dropped
+from backend.session import SessionRegistry
+from backend.sse import SSEBroker, TooManySubscribers
+from backend.payload import read_encoded_json, PayloadError, ENCODINGS, MAX_BODY_BYTES
 import ai.db.init
 from ai.db.mani import DBHandle
+from ai.db.stats import StatsEngine
 import atexit
 from pathwork import resource_path
-from queue import Queue
 import json
+import logging
+import time
+import threading
+from telemetry import REGISTRY, STAGE_SECONDS, counter, gauge, histogram, setup_logging
 
 # Flask 앱 생성
 app = Flask(__name__,
@@ -19,15 +29,43 @@ app = Flask(__name__,
             template_folder=resource_path('front/dist'))
 CORS(app)
 
+# 요청 처리 중 로그는 큐에 넣고 별도 스레드가 출력 (FOCUS_LOG_LEVEL=DEBUG면 상세 로그)
+setup_logging()
+log = logging.getLogger('focus.server')
+
 
 dbh = DBHandle()
 CURRENTSESSION = 'currentSession.json'
+sessions = SessionRegistry(CURRENTSESSION)  # 현재 세션 (메모리 기준, 상태가 바뀔 때만 파일에 기록)
+sessions.recover()
 def exitAction():
-    terminate()
+    end_current_session()
+    sse_broker.close()
     dbh.closeConn()
 atexit.register(exitAction)
 
-msg_q = Queue()
+SERVER_THREADS = 16  # waitress 요청 처리 스레드 수
+# 대시보드 스트림은 연결마다 스레드 1개를 계속 점유하므로 절반까지만 허용하고 나머지는 API 요청용으로 남김
+# (탭을 이보다 많이 열면 넘친 탭은 503 + Retry-After를 받고, 대시보드의 재연결 backoff로 자리가 나면 다시 연결됨)
+SSE_MAX_SUBSCRIBERS = SERVER_THREADS // 2
+sse_broker = SSEBroker(max_subscribers=SSE_MAX_SUBSCRIBERS)  # 판정 결과를 모든 대시보드 탭에 전달
+verdict_cache = VerdictCache()  # 세션 내 URL별 판정 캐시 (새 세션이 시작되면 자동으로 비워짐)
+near_dups = NearDupIndex()      # 세션 내 거의 같은 내용의 페이지 판정 재사용 (SPA 이동 등)
+stats_engine = StatsEngine('data.db', dbh.archive)  # 세션 전체 통계 (이벤트를 메모리 배열로 유지, 새 이벤트만 추가로 읽음)
+
+# /save-html 비동기 처리 설정 (False면 요청 안에서 분석까지 끝내고 응답)
+# True로 켜면 /save-html이 판정 대신 202 + job_id를 돌려주므로, 확장 프로그램이 판정을 SSE/작업 조회로 받을 때만 켤 것
+ASYNC_INGEST = False
+INGEST_THREADS = 4          # 스크래핑/분석 작업 스레드 수
+INGEST_QUEUE_SIZE = 64      # 대기 작업 최대 개수
+INGEST_OVERLOAD = 'drop_oldest'  # 큐가 가득 찼을 때: 'drop_oldest'(지난 페이지 버림) / 'reject'(429 응답)
+INGEST_MAX_AGE = 30.0       # 이보다 오래 기다린 페이지는 분석하지 않고 버림 (초)
+
+# 서버 시작 시 이보다 오래된 세션을 보관 파일로 옮기고 DB 압축 (일, None이면 하지 않음)
+ARCHIVE_AFTER_DAYS = 90
+
+# 확장 프로그램에 권하는 전송 형식 ('lean': 메타 + 본문 일부만 / 'full': 전체 HTML)
+CAPTURE_FORMAT = 'lean'
 
 @app.route('/')
 def index():
@@ -46,32 +84,84 @@ def catch_all(path):
 def run_flask_server():
     """Waitress 기반 Flask 서버 실행"""
     print("[INFO] Starting Waitress WSGI server on http://127.0.0.1:5000 ...")
-    # ✅ Waitress는 기본 8스레드로 멀티요청 처리 가능
-    serve(app, host="127.0.0.1", port=5000, threads=8)
+    # 분석 워커를 미리 띄워 모델 로드를 세션 시작 전에 끝내 둠
+    focus_manager.warm_up()
+    # 목표 설정(모델 로드 대기 포함)은 오래 걸릴 수 있으므로 서버를 먼저 띄움
+    threading.Thread(target=restore_session, name="session-restore", daemon=True).start()
+    threading.Thread(target=archive_old_sessions, name="db-archive", daemon=True).start()
+    stats_engine.prime()  # 통계 배열을 미리 읽어 첫 /api/stats 요청이 기다리지 않게 함
+    # ✅ Waitress 멀티스레드 요청 처리 (SSE 스트림 상한도 이 값에 맞춰 정해짐)
+    serve(app, host="127.0.0.1", port=5000, threads=SERVER_THREADS)
 
 
 
 
+def restore_session():
+    """비정상 종료 전에 진행 중이던 세션이 있으면 목표를 다시 걸어 이어서 분석"""
+    state = sessions.current()
+    if state is None:
+        return
+    goal = state.goal or dbh.get_session_goal(state.sid)
+    if not goal:
+        print(f"[Session] 세션 {state.sid}의 목표를 찾을 수 없어 종료합니다.")
+        sessions.end()
+        return
+    print(f"[Session] 세션 {state.sid} 복구 (active={state.active})")
+    result = focus_manager.start_monitoring(goal)
+    current = sessions.current()
+    if current is None or current.sid != state.sid:
+        # 복구하는 동안 세션이 종료됨: 방금 건 목표를 내림
+        focus_manager.stop_monitoring()
+        return
+    if result.get('status') not in ('started', 'already_running'):
+        # 목표 없이 세션만 살아 있으면 모든 페이지 분석이 실패하므로 세션을 끝냄
+        print(f"[Session] 세션 {state.sid} 복구 실패, 종료합니다: {result.get('message')}")
+        end_current_session()
+
+def archive_old_sessions():
+    """오래된 세션 보관 + DB 압축 (서버 시작 시 백그라운드에서 한 번)"""
+    if ARCHIVE_AFTER_DAYS is None:
+        return
+    state = sessions.current()
+    try:
+        result = dbh.archive_old_sessions(ARCHIVE_AFTER_DAYS, exclude=state.sid if state else None)
+    except Exception as e:
+        print(f"[Archive] 보관 실패: {e}")
+        return
+    if result["sessions"]:
+        stats_engine.invalidate()  # 이벤트가 event 테이블에서 빠졌으므로 통계 배열을 다시 읽음
+        print(f"[Archive] 세션 {result['sessions']}개 (이벤트 {result['events']}개) 보관, "
+              f"DB {result.get('freed_pages', 0)}페이지 줄어듦")
+
 @app.route("/api/new_session", methods=["POST"])
 def new_session():
-    if(os.path.exists(CURRENTSESSION)):
+    if sessions.current() is not None:
         return jsonify({"status": "failed", "message": "Session ongoing"}), 509
     data=request.get_json()
     goal = data.get('goal')
     if not goal:
         return jsonify({"Error: NO GOAL"}), 400
     
-    curId = dbh.insertSessionMeta(data['duration'], data['goal'])
     try:
-        with open(CURRENTSESSION, 'w') as f:
-            json.dump({'curId' : curId, 'active' : True}, f, ensure_ascii=False, indent=4)
+        state = sessions.start(goal, lambda: dbh.insertSessionMeta(data['duration'], goal))
     except Exception as e:
         return jsonify({"error": f"Error: FILE/{e}"}), 500
+    if state is None:
+        return jsonify({"status": "failed", "message": "Session ongoing"}), 509
     
-    result = focus_manager.start_monitoring(data['goal'])
+    result = focus_manager.start_monitoring(goal, bool(data.get('refresh_goal', False)))
 
     return jsonify({"status": "success", "message": result})
 
+def end_current_session():
+    """현재 세션을 끝내고 워커를 대기 상태로 (끝낸 세션 반환, 없으면 None)"""
+    state = sessions.end()
+    if state is not None:
+        # 끝난 세션의 대기 중인 페이지는 분석하지 않음
+        ingest.purge(lambda job: job[0] == state.sid, "session_ended")
+        focus_manager.stop_monitoring()
+    return state
+
 
 @app.route("/api/end_session", methods=["POST"])
 def end_session():
@@ -79,10 +169,9 @@ def end_session():
     data = request.get_json()
     duration = data.get('duration')
     try:
-        if os.path.exists(CURRENTSESSION):
-            os.remove(CURRENTSESSION)
-            focus_manager.stop_monitoring()
-            dbh.maniSessionMeta(duration)
+        state = end_current_session()
+        if state is not None:
+            dbh.maniSessionMeta(duration, state.sid)
             return jsonify({"status": "success", "message" : "Session terminated"})
         else:
             return jsonify({"status": "falied", "message" : "No Active Session"}), 400
@@ -93,9 +182,7 @@ def end_session():
 def terminate():
     print('termination')
     try:
-        if os.path.exists(CURRENTSESSION):
-            os.remove(CURRENTSESSION)
-            focus_manager.stop_monitoring()
+        if end_current_session() is not None:
             return jsonify({"status": "success", "message" : "Session terminated"})
         else:
             return jsonify({"status": "falied", "message" : "No Active Session"}), 400
@@ -106,12 +193,8 @@ def terminate():
 def pause_session():
     print('pause')
     try:
-        with open(CURRENTSESSION, 'r') as f:
-            data = json.load(f)
-        data['active'] = False
-        with open(CURRENTSESSION, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-
+        if sessions.set_active(False) is None:
+            return jsonify({"status": "failed", "message" : "pause failed"})
         return jsonify({"status": "success", "message" : "Session paused"})
     except Exception as e:
         return jsonify({"status": "failed", "message" : "pause failed"})
@@ -120,12 +203,8 @@ def pause_session():
 def continue_session():
     print('continue')
     try:
-        with open(CURRENTSESSION, 'r') as f:
-            data = json.load(f)
-        data['active'] = True
-        with open(CURRENTSESSION, 'w', encoding='utf-8') as f:
-            json.dump(data, f, indent=4, ensure_ascii=False)
-
+        if sessions.set_active(True) is None:
+            return jsonify({"status": "failed", "message" : "continue failed"})
         return jsonify({"status": "success", "message" : "Session continues"})
     except Exception as e:
         return jsonify({"status": "failed", "message" : "continue failed"})
@@ -133,88 +212,297 @@ def continue_session():
 
 @app.route('/save-html', methods=['POST'])
 def save_html():
+    start_t = time.perf_counter()
 
-    if not os.path.exists(CURRENTSESSION):
+    # 세션 상태는 메모리에서 바로 읽음 (파일 I/O 없음)
+    state = sessions.current()
+    if state is None:
         abort(503, description="No active session")
-    try:
-        with open(CURRENTSESSION, 'r') as f:
-            data = json.load(f)
-    except Exception as e:
-        abort(503, description="CURSES FILE ERROR")
     
-    if(data['active'] != True):
+    if(state.active != True):
         return jsonify({"status": "error", "message": "No Active Session"}), 503
 
-    sid = data['curId']
-    data = request.get_json()
-    if not data or 'html' not in data:
+    sid = state.sid
+    try:
+        with STAGE_SECONDS.time(stage='decode'):
+            data = read_payload()
+    except PayloadError as e:
+        ERRORS.inc(stage='decode')
+        return jsonify({"status": "error", "message": str(e)}), e.status
+    if not data or not ('html' in data or data.get('format') == 'lean'):
         return jsonify({"status": "error", "message": "HTML content not found"}), 400
 
-    pdata = process_html(data)
-
-    page_url = pdata.get('url')
-    page_title = pdata.get('title')
-    page_meta = pdata.get('meta')
-    page_body = pdata.get('body')
+    page_url = data.get('url')
+
+    # 1. 빠른 경로: 화이트/블랙리스트, 세션 내 재방문 URL은 스크래핑/모델 호출 없이 바로 판정
+    listed = url_lists.classify(page_url)
+    if listed:
+        return jsonify(record_verdict(sid, page_url, list_verdict(listed), "list", start_t))
+
+    verdict = verdict_cache.get(sid, page_url)
+    if verdict is not None:
+        return jsonify(record_verdict(sid, page_url, verdict, "cache", start_t))
+
+    # 2. 느린 경로: 스크래핑 후 워커에 분석 요청
+    if ASYNC_INGEST:
+        # 큐에 넣고 바로 응답, 판정 결과는 SSE/DB로 전달
+        try:
+            job_id = ingest.submit((sid, data, start_t))
+        except Overloaded:
+            ERRORS.inc(stage='overload')
+            resp = jsonify({"status": "error", "message": "Server busy"})
+            resp.headers['Retry-After'] = '1'
+            return resp, 429
+        return jsonify({"status": "accepted", "job_id": job_id, "stage": "queued"}), 202
+
+    result = analyze_and_record(sid, data, start_t)
+    if result['status'] != 'success':
+        return jsonify(result), 400
+    return jsonify(result)
+
+def read_payload():
+    """요청 본문 JSON (Content-Encoding: gzip/deflate면 스트림으로 풀면서 읽음)"""
+    encoding = request.headers.get('Content-Encoding', '').strip().lower()
+    if encoding in ('', 'identity'):
+        return request.get_json()
+    return read_encoded_json(request.stream, encoding)
+
+@app.route('/api/capture-format', methods=['GET'])
+def capture_format():
+    """확장 프로그램과 전송 형식 협상 (lean 형식의 본문 길이 상한은 서버 분석 설정에 맞춤)"""
+    return jsonify({
+        "format": CAPTURE_FORMAT,
+        "formats": ["full", "lean"],
+        "text_limit": body_char_budget(),
+        "encodings": list(ENCODINGS),
+        "max_bytes": MAX_BODY_BYTES
+    })
+
+def analyze_and_record(sid, data, start_t, check=None):
+    """
+    스크래핑 -> 모델 분석 -> 판정 기록 (동기 처리와 비동기 작업 스레드에서 공통 사용)
+    check: 판정을 기록하기 직전에 호출 check(sid) (비동기 작업에서 세션이 바뀌었는지 확인)
+    """
+    page_url = data.get('url')
+    with STAGE_SECONDS.time(stage='scrape'):
+        pdata = process_html(data)
 
     page_data = {
-        'url' : page_url,
-        'title' : page_title,
-        'meta' : page_meta,
-        'body' : page_body
+        'url' : pdata.get('url'),
+        'title' : pdata.get('title'),
+        'meta' : pdata.get('meta'),
+        'body' : pdata.get('body')
     }
-    result = focus_manager.analyze_page(page_data)
+
+    # 같은 도메인에서 최근에 판정한 페이지와 내용이 거의 같으면 모델 호출 없이 그 판정 사용
+    with STAGE_SECONDS.time(stage='dedup'):
+        fp = near_dups.fingerprint(page_text(page_data))
+        verdict = near_dups.find(sid, page_url, fp)
+    if verdict is not None:
+        verdict_cache.put(sid, page_url, verdict)
+        if check:
+            check(sid)
+        return record_verdict(sid, page_url, verdict, "dedup", start_t)
+
+    with STAGE_SECONDS.time(stage='analyze'):
+        result = focus_manager.analyze_page(page_data)
     if(result['status'] == 'success'):
-        eventType = False
-        if(result['data']['is_focused']):
-            eventType = True
-        score = result['data']['score']
-        topic = result['data']['matched_query']
-        elapsed = result['data']['elapsed']
-        if(result['data']['matched_query'] == 'Error'): 
-            eventType = True
-
-        emoji = "🔴" if score < 0.2 else "🟡" if score < 0.3 else "🟢"
-        print(f"{emoji}: \t{score}\t{topic[:20]}\t{elapsed}s")
-        sseData = {
-            "is_focused": eventType, 
-            "score": float(score), 
-            "topic": topic
-        }
-        print('send stream')
-        msg_q.put(json.dumps(sseData))
-        dbh.insertEvent(sid, eventType, page_url, score, topic)
-        return jsonify({"status": "success", "message": "HTML received"})
-    
-    return jsonify({"status": "error", "message": "analysis failed."}), 400
+        # 워커 안에서 잰 단계별 시간 (큐 대기, 인코딩, 유사도 계산, 청크)
+        for stage, seconds in result['data'].get('timings', {}).items():
+            STAGE_SECONDS.observe(seconds, stage=stage)
+        verdict_cache.put(sid, page_url, result['data'])
+        near_dups.add(sid, page_url, fp, result['data'])
+        if check:
+            check(sid)
+        return record_verdict(sid, page_url, result['data'], "model", start_t)
+
+    if check:
+        check(sid)  # 분석 중에 세션이 끝나 워커가 목표를 내린 경우는 실패가 아니라 버린 작업
+    ERRORS.inc(stage='analyze')
+    return {"status": "error", "message": "analysis failed."}
+
+def page_text(page_data):
+    """중복 비교용 텍스트: 모델이 실제로 보는 범위(제목/메타/본문 앞부분)만 사용"""
+    budget = body_char_budget()
+    title = " ".join((page_data.get('title') or '').split())[:1000]
+    meta = " ".join((page_data.get('meta') or '').split())[:1000]
+    body = " ".join((page_data.get('body') or '').split())[:budget]
+    return f"{title} {meta} {body}"
+
+def record_verdict(sid, page_url, verdict, stage, start_t):
+    """판정 결과를 SSE로 전송하고 DB에 기록 (stage: 판정을 내린 단계 list/cache/dedup/model)"""
+    eventType = False
+    if(verdict['is_focused']):
+        eventType = True
+    score = verdict['score']
+    topic = verdict['matched_query']
+    elapsed = verdict['elapsed']
+    if(verdict['matched_query'] == 'Error'): 
+        eventType = True
+
+    response_s = time.perf_counter() - start_t
+    response_ms = response_s * 1000
+    VERDICT_SECONDS.observe(response_s, path=stage)
+    PAGES.inc(path=stage)
+    emoji = "🔴" if score < 0.2 else "🟡" if score < 0.3 else "🟢"
+    log.info("%s %.4f %s %.3fs [%s] %.1fms", emoji, score, topic[:20], elapsed, stage, response_ms)
+    sseData = {
+        "is_focused": eventType, 
+        "score": float(score), 
+        "topic": topic
+    }
+    if stage == "dedup":
+        sseData["dedup"] = True
+    log.debug("send stream")
+    sse_broker.publish(sseData)
+    commit_t = time.perf_counter()
+    future = dbh.insertEvent(sid, eventType, page_url, score, topic, dedup=stage == "dedup")
+    # 쓰기 스레드가 커밋할 때까지 걸린 시간 (group commit 대기 포함)
+    future.add_done_callback(lambda _: STAGE_SECONDS.observe(time.perf_counter() - commit_t, stage='db_commit'))
+    return {
+        "status": "success",
+        "message": "HTML received",
+        "stage": stage,
+        "elapsed_ms": round(response_ms, 2)
+    }
 
-@app.route('/api/webpage-analysis/stream')
-def stream():
-    print('stream connection')
-    def event_stream():
-        # [핵심] 무한 루프를 돌면서 큐를 감시합니다.
-        data = {
-            "is_focused": True,
-            "score": 1.0,
-            "topic": "Connection Established"
-        }
-        yield f"data: {json.dumps(data)}\n\n"
-        while True:
-            # 1. queue.get()은 메시지가 들어올 때까지 여기서 '코드 실행을 멈추고 대기'합니다.
-            #    (CPU를 쓰지 않고 효율적으로 기다립니다)
-            msg = msg_q.get()
-            print('got stream')
-            # 2. 메시지가 도착하면 yield로 프론트엔드에 발사!
-            yield f"data: {msg}\n\n"
-            
-    return Response(stream_with_context(event_stream()), mimetype='text/event-stream')
+def check_session(sid):
+    """큐에 넣은 뒤 세션이 끝났거나 일시정지됐으면 작업을 버림"""
+    state = sessions.current()
+    if state is None or state.sid != sid:
+        raise Dropped("session_ended")
+    if not state.active:
+        raise Dropped("paused")
+
+def ingest_job(job):
+    sid, data, start_t = job
+    check_session(sid)
+    return analyze_and_record(sid, data, start_t, check_session)
+
+# 비동기 모드 작업 스레드는 (sid, 요청 본문, 시작 시각)을 받아 위와 같은 처리를 수행
+ingest = IngestPipeline(ingest_job,
+                        maxsize=INGEST_QUEUE_SIZE, threads=INGEST_THREADS,
+                        overload=INGEST_OVERLOAD, max_age=INGEST_MAX_AGE)
+
+# --- /metrics (Prometheus 텍스트 형식) ---
+VERDICT_SECONDS = histogram('focus_verdict_seconds', 'Time from /save-html arrival to verdict', ['path'])
+PAGES = counter('focus_pages_total', 'Pages judged, by the stage that produced the verdict', ['path'])
+ERRORS = counter('focus_errors_total', 'Failed or rejected page requests', ['stage'])
+
+def _cache_counts(field):
+    return {
+        "verdict": verdict_cache.stats()[field],
+        "near_dup": near_dups.stats()[field],
+        "video": video_cache.stats()[field],
+        "embedding": focus_manager.cache_stats()[field]
+    }
 
+def _worker_values(field):
+    return {str(w['worker']): int(w[field]) for w in focus_manager.pool_status()['workers']}
+
+counter('focus_cache_hits_total', 'Cache hits', ['cache'], fn=lambda: _cache_counts('hits'))
+counter('focus_cache_misses_total', 'Cache misses', ['cache'], fn=lambda: _cache_counts('misses'))
+gauge('focus_ingest_queue_depth', 'Pages waiting in the async ingest queue', fn=lambda: ingest.depth())
+counter('focus_ingest_jobs_total', 'Async ingest jobs by outcome', ['outcome'],
+        fn=lambda: {k: v for k, v in ingest.stats().items() if k in ('processed', 'failed', 'dropped', 'rejected')})
+gauge('focus_worker_inflight', 'Analysis requests waiting on each worker', ['worker'], fn=lambda: _worker_values('inflight'))
+gauge('focus_worker_alive', 'Whether each analysis worker process is alive', ['worker'], fn=lambda: _worker_values('alive'))
+gauge('focus_db_write_pending', 'Jobs waiting for the DB writer thread', fn=lambda: dbh.writer.stats()['pending'])
+counter('focus_db_commits_total', 'Transactions committed by the DB writer', fn=lambda: dbh.writer.stats()['commits'])
+gauge('focus_db_read_connections', 'Read pool connections', ['state'],
+      fn=lambda: {"opened": dbh.readers.stats()['opened'], "idle": dbh.readers.stats()['idle']})
+gauge('focus_sse_subscribers', 'Connected dashboard streams', fn=lambda: sse_broker.stats()['subscribers'])
+gauge('focus_session_active', '1 while a session is running and not paused',
+      fn=lambda: int(getattr(sessions.current(), 'active', False)))
+
+@app.route('/api/ingest/stats', methods=['GET'])
+def ingest_stats():
+    return jsonify({"async": ASYNC_INGEST, **ingest.stats()})
+
+@app.route('/api/ingest/<job_id>', methods=['GET'])
+def ingest_status(job_id):
+    info = ingest.status(job_id)
+    if info is None:
+        return jsonify({"status": "error", "message": "Unknown job"}), 404
+    return jsonify({"job_id": job_id, **info})
 
+@app.route('/api/webpage-analysis/stream')
+def stream():
+    log.info("stream connection")
+    # 재연결 시 브라우저가 보내는 Last-Event-ID (직접 다시 연결하는 경우 ?lastEventId=)
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    data = {
+        "is_focused": True,
+        "score": 1.0,
+        "topic": "Connection Established"
+    }
+    try:
+        # 탭마다 자기 커서로 같은 이벤트를 모두 받음 (이전처럼 하나의 큐를 나눠 갖지 않음)
+        event_stream = sse_broker.subscribe(last_event_id, hello=data)
+    except TooManySubscribers:
+        resp = jsonify({"status": "error", "message": "Too many stream connections"})
+        resp.headers['Retry-After'] = '3'
+        return resp, 503
+
+    resp = Response(stream_with_context(event_stream), mimetype='text/event-stream')
+    resp.headers['Cache-Control'] = 'no-cache'
+    return resp
+
+@app.route('/api/stream_stats', methods=['GET'])
+def stream_stats():
+    return jsonify(sse_broker.stats())
+
+
+PAGE_LIMIT = 100       # 페이지 API 기본 행 수
+PAGE_LIMIT_MAX = 1000  # 페이지 API 최대 행 수
+
+def stream_json_array(rows, first=None):
+    """
+    행 iterator를 JSON 배열로 조금씩 내보냄 (전체 결과를 메모리에 만들지 않음)
+    first: 엔드포인트에서 미리 꺼낸 첫 행 (None이면 빈 배열)
+    """
+    try:
+        yield '['
+        if first is not None:
+            yield json.dumps(first, ensure_ascii=False)
+            for row in rows:
+                yield ',' + json.dumps(row, ensure_ascii=False)
+        yield ']'
+    finally:
+        rows.close()
+
+def stream_json_page(rows, limit, cursor_of):
+    """
+    limit + 1행을 조회한 iterator를 {"items": [...], "next_cursor": ...}로 내보냄
+    limit + 1번째 행이 있으면 다음 페이지가 있으므로 limit번째 행으로 커서를 만듦
+    """
+    try:
+        yield '{"items":['
+        last = None
+        for i, row in enumerate(rows):
+            if i == limit:
+                yield '],"next_cursor":' + json.dumps(cursor_of(last)) + '}'
+                return
+            yield (',' if i else '') + json.dumps(row, ensure_ascii=False)
+            last = row
+        yield '],"next_cursor":null}'
+    finally:
+        rows.close()
+
+def page_limit():
+    try:
+        limit = int(request.args.get('limit', PAGE_LIMIT))
+    except ValueError:
+        limit = PAGE_LIMIT
+    return max(1, min(limit, PAGE_LIMIT_MAX))
 
 @app.route('/api/get_session_list', methods=['GET'])
 def get_session_list():
     try:
-        return jsonify(dbh.get_sessions())
+        # 첫 행을 여기서 꺼내야 조회/연결 대여 오류가 200 응답 전에 500으로 돌아감
+        rows = dbh.iter_sessions()
+        first = next(rows, None)
+        return Response(stream_json_array(rows, first), mimetype='application/json')
     except Exception as e:
         print('bad', e)
         return jsonify({"ERROR": f"GET_SESSION_LIST/ {e}"}), 500
@@ -225,11 +513,118 @@ def get_event_list():
     try:
         data = request.get_json()
         sid = data.get('session_id')
-        return(dbh.get_sid_session(sid))
+        rows = dbh.iter_events(sid)
+        first = next(rows, None)
+        return Response(stream_json_array(rows, first), mimetype='application/json')
     except Exception as e:
         print('bad', e)
         return jsonify({"ERROR": f"GET_EVENT_LIST/ {e}"}), 500
+
+@app.route('/api/sessions', methods=['GET'])
+def sessions_page():
+    """세션 목록 페이지 (최신순). ?limit=&cursor=<이전 응답의 next_cursor>"""
+    try:
+        cursor = request.args.get('cursor')
+        before = int(cursor) if cursor else None
+    except ValueError:
+        return jsonify({"status": "error", "message": "bad cursor"}), 400
+    limit = page_limit()
+    rows = dbh.iter_sessions(before, limit + 1)
+    return Response(stream_json_page(rows, limit, lambda r: str(r['session_id'])), mimetype='application/json')
+
+@app.route('/api/events', methods=['GET'])
+def events_page():
+    """세션 이벤트 페이지 (시간순). ?session_id=&limit=&cursor=<event_time|event_id>"""
+    sid = request.args.get('session_id', type=int)
+    if sid is None:
+        return jsonify({"status": "error", "message": "session_id required"}), 400
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        event_time, _, event_id = cursor.rpartition('|')
+        if not event_time or not event_id.isdigit():
+            return jsonify({"status": "error", "message": "bad cursor"}), 400
+        after = (event_time, int(event_id))
+    limit = page_limit()
+    rows = dbh.iter_events(sid, after, limit + 1)
+    return Response(stream_json_page(rows, limit, lambda r: f"{r['event_time']}|{r['event_id']}"), mimetype='application/json')
     
+@app.route('/api/session_summary', methods=['GET'])
+def session_summary():
+    """세션 요약 (집중/비집중 시간, 점수 분포, 분 단위 추이, 상위 주제/도메인). ?session_id="""
+    sid = request.args.get('session_id', type=int)
+    if sid is None:
+        return jsonify({"status": "error", "message": "session_id required"}), 400
+    try:
+        summary = dbh.get_session_summary(sid)
+    except Exception as e:
+        print('bad', e)
+        return jsonify({"ERROR": f"SESSION_SUMMARY/ {e}"}), 500
+    if summary is None:
+        return jsonify({"status": "error", "message": "No events"}), 404
+    return jsonify({"session_id": sid, **summary})
+
+@app.route('/api/stats', methods=['GET'])
+def cross_session_stats():
+    """세션 전체 통계 (시간대별 집중도, 최장 집중 구간, 집중을 가장 많이 뺏은 도메인, 목표별 점수 추이). ?days=&top="""
+    days = request.args.get('days', type=float)
+    top = min(max(request.args.get('top', 10, type=int), 1), 100)
+    start_t = time.perf_counter()
+    try:
+        result = stats_engine.compute(days, top)
+    except Exception as e:
+        print('bad', e)
+        return jsonify({"ERROR": f"STATS/ {e}"}), 500
+    return jsonify({**result, "elapsed_ms": round((time.perf_counter() - start_t) * 1000, 1)})
+
+@app.route('/metrics', methods=['GET'])
+def metrics():
+    return Response(REGISTRY.render(), mimetype='text/plain; version=0.0.4; charset=utf-8')
+
+@app.route('/api/cache_stats', methods=['GET'])
+def cache_stats():
+    return jsonify({
+        "embedding": focus_manager.cache_stats(),
+        "verdict": verdict_cache.stats(),
+        "near_dup": near_dups.stats(),
+        "video": video_cache.stats()
+    })
+
+@app.route('/api/pool_status', methods=['GET'])
+def pool_status():
+    return jsonify(focus_manager.pool_status())
+
+@app.route('/api/db_status', methods=['GET'])
+def db_status():
+    return jsonify({
+        "writer": dbh.writer.stats(),
+        "readers": dbh.readers.stats()
+    })
+
+@app.route('/api/goal_cache', methods=['GET'])
+def goal_cache_list():
+    try:
+        return jsonify(open_goal_store().list())
+    except Exception as e:
+        print('bad', e)
+        return jsonify({"ERROR": f"GOAL_CACHE/ {e}"}), 500
+
+@app.route('/api/goal_cache/evict', methods=['POST'])
+def goal_cache_evict():
+    """{"goal": "..."} 이면 해당 목표만, {"all": true} 이면 전체 삭제"""
+    try:
+        data = request.get_json() or {}
+        store = open_goal_store()
+        if data.get('all'):
+            return jsonify({"status": "success", "evicted": store.clear()})
+        goal = data.get('goal')
+        if not goal:
+            return jsonify({"status": "error", "message": "NO GOAL"}), 400
+        return jsonify({"status": "success", "evicted": int(store.evict(goal))})
+    except Exception as e:
+        print('bad', e)
+        return jsonify({"ERROR": f"GOAL_CACHE/ {e}"}), 500
+
 @app.route('/api/get_config', methods=['GET'])
 def get_config():
     try:
@@ -249,8 +644,12 @@ def set_config():
             "WHITE" : data.get("WHITE"),
             "BLACK" : data.get("BLACK")
         }
-        with open('settings.json', 'w', encoding='utf-8') as f:
+        # 워커가 쓰는 도중의 파일을 읽지 않도록 임시 파일에 쓰고 교체
+        with open('settings.json.tmp', 'w', encoding='utf-8') as f:
             json.dump(config, f, ensure_ascii=False, indent=4)
+        os.replace('settings.json.tmp', 'settings.json')
+        # 화이트/블랙리스트 즉시 반영 (워커 프로세스는 파일 변경을 감지해 자동 반영)
+        url_lists.reload(config)
         return({"status": "success", "message": "Config Saved"})
     except Exception as e:
         print('bad', e)
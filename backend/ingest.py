@@ -0,0 +1,157 @@
+import itertools
+import logging
+import os
+import threading
+import time
+from collections import deque, OrderedDict
+from telemetry import STAGE_SECONDS
+
+log = logging.getLogger('focus.ingest')
+
+# ==============================================================================
+# /save-html 비동기 처리 파이프라인
+# - 요청 스레드는 작업을 큐에 넣고 바로 응답 (202 + job_id)
+# - 별도 스레드들이 스크래핑 -> 분석 -> SSE/DB 기록을 수행
+# - 큐가 가득 차면 정책에 따라 가장 오래된 작업을 버리거나(drop_oldest) 새 작업을 거절(reject -> 429)
+# ==============================================================================
+
+class Overloaded(Exception):
+    pass
+
+
+class Dropped(Exception):
+    """handler가 작업을 처리하지 않고 버릴 때 (인자: 이유, 예: 'session_ended')"""
+
+
+class IngestPipeline:
+    def __init__(self, handler, maxsize=64, threads=4, overload='drop_oldest', max_age=30.0, keep_jobs=1024):
+        """
+        handler: 작업 1개를 처리하는 함수 handler(payload) -> 결과 dict
+                 (status가 'success'가 아니면 실패로 집계, 버릴 작업이면 Dropped)
+        maxsize: 대기 큐 최대 길이
+        threads: 처리 스레드 수
+        overload: 큐가 가득 찼을 때 정책 ('drop_oldest' 또는 'reject')
+        max_age: 이 시간(초)보다 오래 기다린 작업은 처리하지 않고 버림
+        keep_jobs: 상태 조회용으로 보관하는 최근 작업 수
+        """
+        self.handler = handler
+        self.maxsize = maxsize
+        self.threads = threads
+        self.overload = overload
+        self.max_age = max_age
+        self.keep_jobs = keep_jobs
+
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._jobs = OrderedDict()
+        self._ids = itertools.count(1)
+        self._prefix = f"{os.getpid():x}{int(time.time()):x}"
+        self._started = False
+
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def start(self):
+        with self._cond:
+            if self._started:
+                return
+            self._started = True
+        for i in range(self.threads):
+            threading.Thread(target=self._run, name=f"ingest-{i}", daemon=True).start()
+
+    def submit(self, payload):
+        """작업을 큐에 넣고 job_id 반환 (reject 정책에서 큐가 가득 차면 Overloaded)"""
+        self.start()
+        with self._cond:
+            if len(self._queue) >= self.maxsize:
+                if self.overload == 'reject':
+                    self.rejected += 1
+                    raise Overloaded()
+                # 가장 오래된(이미 지나간 페이지) 작업을 버림
+                old_id, _, _ = self._queue.popleft()
+                self._set(old_id, status="dropped", reason="overload")
+                self.dropped += 1
+
+            job_id = f"{self._prefix}-{next(self._ids)}"
+            self._queue.append((job_id, time.monotonic(), payload))
+            self._set(job_id, status="queued")
+            self._cond.notify()
+            return job_id
+
+    def _set(self, job_id, **info):
+        # self._cond 안에서 호출
+        self._jobs[job_id] = info
+        self._jobs.move_to_end(job_id)
+        while len(self._jobs) > self.keep_jobs:
+            self._jobs.popitem(last=False)
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not self._queue:
+                    self._cond.wait()
+                job_id, enqueued, payload = self._queue.popleft()
+                waited = time.monotonic() - enqueued
+                STAGE_SECONDS.observe(waited, stage='ingest_wait')
+                if waited > self.max_age:
+                    self._set(job_id, status="dropped", reason="stale")
+                    self.dropped += 1
+                    continue
+                self._set(job_id, status="running")
+
+            try:
+                result = self.handler(payload)
+                with self._cond:
+                    if result.get("status") != "success":
+                        # 예외 없이 실패 결과를 돌려준 경우 (분석 시간 초과, 목표 미설정 등)
+                        self._set(job_id, status="error", message=result.get("message"), wait_ms=round(waited * 1000, 2))
+                        self.failed += 1
+                    else:
+                        self._set(job_id, status="done", result=result, wait_ms=round(waited * 1000, 2))
+                        self.processed += 1
+            except Dropped as e:
+                with self._cond:
+                    self._set(job_id, status="dropped", reason=str(e))
+                    self.dropped += 1
+            except Exception as e:
+                log.warning("작업 실패 %s: %s", job_id, e)
+                with self._cond:
+                    self._set(job_id, status="error", message=str(e))
+                    self.failed += 1
+
+    def purge(self, predicate, reason):
+        """대기 중인 작업 중 predicate(payload)가 참인 것을 버림, 버린 수 반환"""
+        with self._cond:
+            kept = deque()
+            purged = 0
+            for job in self._queue:
+                if predicate(job[2]):
+                    self._set(job[0], status="dropped", reason=reason)
+                    purged += 1
+                else:
+                    kept.append(job)
+            self._queue = kept
+            self.dropped += purged
+            return purged
+
+    def status(self, job_id):
+        with self._cond:
+            info = self._jobs.get(job_id)
+            return dict(info) if info is not None else None
+
+    def depth(self):
+        return len(self._queue)
+
+    def stats(self):
+        with self._cond:
+            return {
+                "depth": len(self._queue),
+                "maxsize": self.maxsize,
+                "overload": self.overload,
+                "processed": self.processed,
+                "failed": self.failed,
+                "dropped": self.dropped,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,69 @@
+import json
+import zlib
+
+# ==============================================================================
+# /save-html 요청 본문 읽기
+# - Content-Encoding: gzip / deflate 본문을 조각 단위로 풀면서 크기 상한 검사
+#   (deflate는 zlib 헤더가 있는 형식과 헤더 없는 raw DEFLATE 형식을 모두 받음)
+#   (압축 폭탄이 와도 상한 이상은 메모리에 올리지 않음)
+# ==============================================================================
+
+MAX_BODY_BYTES = 32 * 1024 * 1024  # 압축을 푼 본문 최대 크기
+READ_CHUNK = 64 * 1024
+ENCODINGS = ('gzip', 'deflate')
+
+class PayloadError(Exception):
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def _wbits(encoding, head):
+    """본문 앞부분으로 zlib 창 크기 인자 결정"""
+    if encoding == 'deflate' and not _has_zlib_header(head):
+        # 일부 클라이언트는 deflate를 zlib 헤더 없는 raw DEFLATE로 보냄
+        return -zlib.MAX_WBITS
+    # MAX_WBITS | 32: gzip / zlib(deflate) 헤더 자동 판별
+    return zlib.MAX_WBITS | 32
+
+def _has_zlib_header(head):
+    # CMF(압축 방식 8 = deflate, 창 크기 <= 32KB) + FLG, 두 바이트를 합친 값이 31의 배수
+    if len(head) < 2:
+        return False
+    cmf, flg = head[0], head[1]
+    return cmf & 0x0F == 8 and cmf >> 4 <= 7 and (cmf * 256 + flg) % 31 == 0
+
+
+def read_encoded_json(stream, encoding, limit=MAX_BODY_BYTES):
+    """압축된 요청 본문(stream)을 풀어 JSON으로 반환"""
+    encoding = (encoding or '').strip().lower()
+    if encoding == 'x-gzip':
+        encoding = 'gzip'
+    if encoding not in ENCODINGS:
+        raise PayloadError(f"Unsupported Content-Encoding: {encoding}", 415)
+
+    chunk = stream.read(READ_CHUNK)
+    decomp = zlib.decompressobj(_wbits(encoding, chunk))
+    buf = bytearray()
+    try:
+        while not decomp.eof:
+            if not chunk:
+                break
+            # 상한 + 1 바이트까지만 풀어 보고 넘치면 중단
+            buf += decomp.decompress(chunk, limit + 1 - len(buf))
+            if len(buf) > limit:
+                raise PayloadError("Payload too large", 413)
+            chunk = stream.read(READ_CHUNK)
+        buf += decomp.flush()
+    except zlib.error as e:
+        raise PayloadError(f"Invalid {encoding} body: {e}")
+
+    if not decomp.eof:
+        raise PayloadError("Truncated compressed body")
+    if len(buf) > limit:
+        raise PayloadError("Payload too large", 413)
+
+    try:
+        return json.loads(bytes(buf))
+    except ValueError:
+        raise PayloadError("Invalid JSON body")
@@ -0,0 +1,92 @@
+import json
+import os
+import threading
+import time
+from collections import namedtuple
+
+# ==============================================================================
+# 현재 세션 상태 (메모리가 기준, 파일은 재시작 복구용)
+# - 상태는 바뀌지 않는 SessionState 튜플 하나 -> 읽는 쪽은 참조만 가져가면 되므로 lock 불필요
+# - 시작/일시정지/재개/종료 때만 lock을 잡고 새 튜플로 교체, 파일은 임시 파일에 쓴 뒤 교체
+# - 서버가 비정상 종료되면 다음 시작 때 파일에서 세션을 되살림
+# ==============================================================================
+
+SessionState = namedtuple('SessionState', ['sid', 'active', 'goal', 'started'])
+
+
+class SessionRegistry:
+    def __init__(self, path='currentSession.json'):
+        self.path = path
+        self._state = None
+        self._lock = threading.Lock()  # 상태 변경(쓰기)끼리만 직렬화
+
+    def current(self):
+        """현재 세션 (없으면 None)"""
+        return self._state
+
+    def recover(self):
+        """파일에 남아 있는 세션 복구 (이전 형식 {curId, active}도 읽음)"""
+        with self._lock:
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self._state = SessionState(
+                    sid=data['curId'],
+                    active=bool(data.get('active', True)),
+                    goal=data.get('goal'),
+                    started=data.get('started')
+                )
+            except FileNotFoundError:
+                self._state = None
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                print(f"[Session] 세션 파일 복구 실패: {e}")
+                self._state = None
+            return self._state
+
+    def start(self, goal, create_sid):
+        """
+        새 세션 시작. 이미 세션이 있으면 None
+        create_sid: 세션 id를 만드는 함수 (DB 기록), lock 안에서 한 번만 호출
+        """
+        with self._lock:
+            if self._state is not None:
+                return None
+            state = SessionState(sid=create_sid(), active=True, goal=goal, started=time.time())
+            self._persist(state)
+            self._state = state
+            return state
+
+    def set_active(self, active):
+        """일시정지/재개. 세션이 없으면 None"""
+        with self._lock:
+            if self._state is None:
+                return None
+            if self._state.active != active:
+                state = self._state._replace(active=active)
+                self._persist(state)
+                self._state = state
+            return self._state
+
+    def end(self):
+        """세션 종료 후 끝난 세션 반환 (세션이 없으면 None)"""
+        with self._lock:
+            state = self._state
+            if state is None:
+                return None
+            self._state = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+            return state
+
+    def _persist(self, state):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({
+                'curId': state.sid,
+                'active': state.active,
+                'goal': state.goal,
+                'started': state.started
+            }, f, ensure_ascii=False, indent=4)
+        os.replace(tmp, self.path)
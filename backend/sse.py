@@ -0,0 +1,189 @@
+import json
+import threading
+import time
+from collections import deque
+from itertools import islice
+
+# ==============================================================================
+# SSE(Server-Sent Events) 브로커
+# - 발행된 이벤트는 공유 링 버퍼 하나에 (id, data)로 저장 -> 발행 비용은 구독자 수와 무관 (O(1))
+# - 구독자는 각자 커서(마지막으로 보낸 id)만 가지고 링 버퍼를 따라 읽음
+#   (= 구독자마다 최근 capacity개짜리 버퍼가 있는 것과 같음, 이벤트를 빼앗아 가지 않음)
+# - 재연결 시 Last-Event-ID 이후 이벤트를 다시 보내 줌
+#   (그 사이 이벤트가 이미 링 버퍼에서 밀려났으면 'gap' 이벤트로 알린 뒤 남은 것부터 보냄)
+# - 보내는 도중 커서가 링 버퍼 밖으로 밀려난(너무 느린) 구독자는 'evicted'를 보내고 연결을 끊음
+#   -> 클라이언트가 재연결해 따라잡음
+# - 구독자마다 서버 스레드 1개를 점유하므로 동시 구독자 수에 상한을 둠 (서버 스레드 수에 맞춰 설정)
+# - 일정 시간 이벤트가 없으면 heartbeat 주석을 보내 끊어진 연결을 정리
+# ==============================================================================
+
+class TooManySubscribers(Exception):
+    pass
+
+
+class SSEBroker:
+    def __init__(self, capacity=256, heartbeat=15.0, max_subscribers=4):
+        """
+        capacity: 다시 보내 줄 수 있는 최근 이벤트 수 (구독자별 버퍼 크기)
+        heartbeat: 이벤트가 없을 때 연결 확인용 주석을 보내는 간격 (초)
+        max_subscribers: 동시 구독자 수 상한 (구독자마다 서버 스레드 1개를 점유하므로
+                         서버 스레드 수보다 작게, API 요청을 처리할 스레드를 남겨 둘 것)
+        """
+        self.capacity = capacity
+        self.heartbeat = heartbeat
+        self.max_subscribers = max_subscribers
+
+        self._events = deque(maxlen=capacity)
+        self._last_id = 0
+        # 서버가 다시 시작되면 id가 처음부터 다시 매겨지므로 이전 실행의 id는 무시
+        self._epoch = format(int(time.time()), 'x')
+        self._cond = threading.Condition()
+        self._subscribers = 0
+        self._closed = False
+
+        self.published = 0
+        self.evicted = 0
+        self.replayed = 0
+        self.gaps = 0
+
+    def publish(self, data):
+        """data(dict 또는 JSON 문자열)를 모든 구독자에게 발행하고 이벤트 id 반환"""
+        if not isinstance(data, str):
+            data = json.dumps(data)
+        with self._cond:
+            self._last_id += 1
+            self._events.append((self._last_id, data))
+            self.published += 1
+            self._cond.notify_all()
+            return self._event_id(self._last_id)
+
+    def _event_id(self, seq):
+        return f"{self._epoch}-{seq}"
+
+    def _parse_id(self, last_event_id):
+        """Last-Event-ID -> 이번 실행의 순번 (다른 실행의 id거나 형식이 틀리면 None)"""
+        if not last_event_id:
+            return None
+        epoch, _, seq = last_event_id.partition('-')
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        return min(int(seq), self._last_id)
+
+    def subscribe(self, last_event_id=None, hello=None):
+        """
+        구독자 1명의 SSE 본문 iterator 반환 (구독자 수가 상한이면 TooManySubscribers)
+        hello: 연결 직후 보낼 메시지 (id 없이 전송)
+        구독 슬롯은 여기서 바로 잡고, 스트림이 끝나거나 close()될 때 반납
+        (동시에 들어온 요청들이 모두 검사를 통과해 상한을 넘지 않도록)
+        """
+        with self._cond:
+            if self._subscribers >= self.max_subscribers:
+                raise TooManySubscribers()
+            self._subscribers += 1
+            cursor = self._parse_id(last_event_id)
+            if cursor is None:
+                cursor = self._last_id  # 새 연결은 지금부터 발행되는 이벤트만
+        return _Subscription(self, cursor, hello)
+
+    def _release(self):
+        with self._cond:
+            self._subscribers -= 1
+
+    def _pending(self, cursor):
+        """cursor 이후 이벤트 목록, 그 사이 이벤트가 링 버퍼에서 밀려났으면 None (self._cond 안에서 호출)"""
+        if cursor >= self._last_id:
+            return []
+        oldest = self._events[0][0]
+        if cursor + 1 < oldest:
+            return None
+        return list(islice(self._events, cursor + 1 - oldest, None))
+
+    def _stream(self, cursor, hello):
+        yield "retry: 3000\n\n"
+        if hello is not None:
+            yield f"data: {json.dumps(hello)}\n\n"
+
+        # 재연결(또는 첫 읽기 전에 이벤트가 밀려난 경우): 링 버퍼에 남아 있는 만큼만 다시 보냄
+        gap = None
+        with self._cond:
+            pending = self._pending(cursor)
+            if pending is None:
+                pending = list(self._events)
+                oldest = pending[0][0]
+                self.gaps += 1
+                gap = {"after": self._event_id(cursor), "oldest": self._event_id(oldest),
+                       "missed": oldest - cursor - 1}
+            self.replayed += len(pending)
+        if gap is not None:
+            # 빠진 구간을 알려 클라이언트가 필요하면 DB에서 다시 읽게 하고, 남아 있는 이벤트부터 이어서 보냄
+            yield f"event: gap\ndata: {json.dumps(gap)}\n\n"
+
+        while not self._closed:
+            if pending:
+                cursor = pending[-1][0]
+                yield "".join(f"id: {self._event_id(seq)}\ndata: {data}\n\n" for seq, data in pending)
+
+            with self._cond:
+                if self._last_id <= cursor and not self._closed:
+                    self._cond.wait(self.heartbeat)
+                pending = self._pending(cursor)
+
+            if pending is None:
+                # 보내는 속도가 발행 속도를 못 따라감 -> 끊고 재연결 때 남은 이벤트부터 받게 함
+                self.evicted += 1
+                print("[SSE] 느린 구독자 연결 종료")
+                yield "event: evicted\ndata: {}\n\n"
+                return
+            if not pending:
+                yield ": ping\n\n"
+
+    def close(self):
+        """모든 구독자 스트림 종료 (서버 종료 시)"""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "subscribers": self._subscribers,
+                "last_id": self._event_id(self._last_id),
+                "buffered": len(self._events),
+                "published": self.published,
+                "max_subscribers": self.max_subscribers,
+                "replayed": self.replayed,
+                "gaps": self.gaps,
+                "evicted": self.evicted
+            }
+
+
+class _Subscription:
+    """
+    구독자 1명의 SSE 본문 (WSGI 응답 iterable)
+    스트림이 끝나거나, 서버가 close()를 부르거나, 한 번도 읽히지 않고 버려져도 구독 슬롯을 한 번만 반납
+    """
+    def __init__(self, broker, cursor, hello):
+        self._broker = broker
+        self._gen = broker._stream(cursor, hello)
+        self._lock = threading.Lock()
+        self._held = True
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._gen)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self):
+        self._gen.close()
+        with self._lock:
+            held, self._held = self._held, False
+        if held:
+            self._broker._release()
+
+    def __del__(self):
+        self.close()
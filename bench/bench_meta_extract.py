@@ -0,0 +1,106 @@
+# 📄 bench/bench_meta_extract.py
+# extract_universal_content (헤드만 스트리밍 파싱) vs 기존 BeautifulSoup(lxml) 전체 파싱 비교
+#
+# 사용법 (앱 폴더에서 실행):
+#   python -m bench.bench_meta_extract <폴더 또는 파일>... [--repeat 5] [--out meta_bench.json]
+# 입력: 저장해 둔 .html 파일, 또는 확장 프로그램 요청 본문을 저장한 .json 파일 ({"html": ...})
+# 두 함수의 결과가 하나라도 다르면 종료 코드 1
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from bs4 import BeautifulSoup
+from ai.proc.scrape import extract_universal_content
+
+def extract_universal_content_soup(html_doc):
+    """기존 구현 (문서 전체를 lxml 트리로 만든 뒤 메타 태그 2개 조회) - 비교 기준"""
+    soup = BeautifulSoup(html_doc, 'lxml')
+    page_info = {
+        'description': '',
+        'keywords': '',
+    }
+    meta_desc = soup.find('meta', attrs={'name': 'description'})
+    if meta_desc:
+        page_info['description'] = meta_desc.get('content', ' ')
+    meta_keywords = soup.find('meta', attrs={'name': 'keywords'})
+    if meta_keywords:
+        page_info['keywords'] = meta_keywords.get('content', ' ')
+    return page_info
+
+def load_corpus(paths):
+    pages = []
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, n) for n in os.listdir(path)
+                           if n.endswith(('.html', '.htm', '.json')))
+        for file in files:
+            with open(file, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            if file.endswith('.json'):
+                text = json.loads(text).get('html', '')
+            pages.append((os.path.basename(file), text))
+    return pages
+
+def measure(func, html_doc, repeat):
+    """(결과, 실행 시간 중앙값 ms, 최대 추가 메모리 bytes)"""
+    times = []
+    for _ in range(repeat):
+        start_t = time.perf_counter()
+        result = func(html_doc)
+        times.append((time.perf_counter() - start_t) * 1000)
+
+    tracemalloc.start()
+    func(html_doc)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, statistics.median(times), peak
+
+def main():
+    parser = argparse.ArgumentParser(description="메타 태그 추출 벤치마크")
+    parser.add_argument('paths', nargs='+')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--out', help="결과를 저장할 JSON 파일")
+    args = parser.parse_args()
+
+    pages = load_corpus(args.paths)
+    rows = []
+    mismatches = []
+    for name, html_doc in pages:
+        new, new_ms, new_mem = measure(extract_universal_content, html_doc, args.repeat)
+        old, old_ms, old_mem = measure(extract_universal_content_soup, html_doc, args.repeat)
+        if new != old:
+            mismatches.append({"page": name, "stream": new, "soup": old})
+        rows.append({
+            "page": name,
+            "bytes": len(html_doc.encode('utf-8')),
+            "soup_ms": round(old_ms, 3),
+            "stream_ms": round(new_ms, 3),
+            "speedup": round(old_ms / new_ms, 1) if new_ms else None,
+            "soup_peak_bytes": old_mem,
+            "stream_peak_bytes": new_mem
+        })
+        print(f"{name[:40]:40s} {rows[-1]['bytes']/1024:9.0f}KB  soup {old_ms:8.2f}ms  stream {new_ms:7.2f}ms"
+              f"  mem {old_mem/1024:8.0f}KB -> {new_mem/1024:6.0f}KB  {'OK' if new == old else 'DIFF'}")
+
+    total_old = sum(r['soup_ms'] for r in rows)
+    total_new = sum(r['stream_ms'] for r in rows)
+    report = {
+        "pages": len(rows),
+        "soup_total_ms": round(total_old, 2),
+        "stream_total_ms": round(total_new, 2),
+        "speedup": round(total_old / total_new, 1) if total_new else None,
+        "mismatches": mismatches,
+        "rows": rows
+    }
+    print(f"\n{len(rows)} pages, soup {total_old:.1f}ms vs stream {total_new:.1f}ms, mismatches: {len(mismatches)}")
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+    sys.exit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
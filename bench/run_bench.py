@@ -0,0 +1,621 @@
+# 📄 bench/run_bench.py
+# /save-html 전체 경로 벤치마크 (Flask 앱을 같은 프로세스에서 test client로 호출)
+#
+# 사용법 (앱 폴더에서 실행):
+#   python -m bench.run_bench [--pages 200] [--recorded <폴더 또는 파일>...] [--concurrency 1,4,8] [--out result.json]
+#   python -m bench.run_bench --compare base.json new.json [--threshold 0.1]
+#   python -m bench.run_bench --smoke --model <작은 모델>   (CI용: 페이지 5개, 동시 1, 실패 응답이 있으면 종료 코드 1)
+#   python -m bench.run_bench --export-labeled pages.jsonl [--pages 200]   (ai/proc/quant_eval.py 입력 만들기)
+#
+# - 네트워크 없이 실행: 목표 확장은 로컬 규칙(FOCUS_FAKE_LLM=1), 임베딩 모델은 --model로 작은 로컬 모델 지정 가능
+# - 임시 작업 폴더(--workdir)에서 실행하므로 앱의 data.db/캐시/settings.json은 건드리지 않음
+# - 입력: 합성 페이지(--pages) + 저장해 둔 페이지(.html, 또는 확장 프로그램 요청 본문 .json)
+# - 결과: 단계별 지연 백분위, 동시 요청 수별 처리량, 세션 시작 시간, 최대 메모리(RSS)
+# - --compare: 두 결과 파일 비교, 기준보다 threshold 이상 나빠진 항목이 있으면 종료 코드 1
+import argparse
+import gzip
+import html
+import json
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+GOAL = "machine learning with python"
+
+# 합성 페이지 문장 (목표와 관련된 문장 / 관련 없는 주제별 문장)
+_ON_TOPIC = [
+    "Gradient descent updates model weights in the direction that reduces the loss.",
+    "scikit-learn provides a consistent fit and predict API for classical models.",
+    "A train and test split helps estimate how well a model generalizes.",
+    "NumPy arrays make vectorized feature engineering fast in Python.",
+    "Overfitting happens when a model memorizes noise in the training data.",
+    "Cross validation averages the score over several folds of the dataset.",
+    "PyTorch builds the computation graph dynamically during the forward pass.",
+    "Regularization such as L2 weight decay keeps parameters small.",
+    "pandas DataFrames are used to clean and explore tabular datasets.",
+    "A confusion matrix summarizes true and false predictions per class.",
+    "Learning rate schedules lower the step size as training progresses.",
+    "Decision trees split the feature space using information gain.",
+    "Neural networks stack linear layers with nonlinear activation functions.",
+    "Feature scaling with StandardScaler centers each column at zero.",
+    "Jupyter notebooks are a common environment for machine learning experiments.",
+    "The ROC curve plots the true positive rate against the false positive rate."
+]
+_OFF_TOPIC = {
+    "sports": [
+        "The striker scored twice in the second half to win the derby.",
+        "Ticket prices for the championship final have doubled this year.",
+        "The coach announced the starting lineup for Saturday's match.",
+        "Fans gathered outside the stadium hours before kickoff.",
+        "The transfer window closes at midnight with several deals pending.",
+        "Injury updates suggest the captain will miss three weeks."
+    ],
+    "cooking": [
+        "Simmer the tomato sauce for twenty minutes with fresh basil.",
+        "Knead the dough until it is smooth and elastic.",
+        "Roast the vegetables at high heat until the edges caramelize.",
+        "This easy weeknight pasta recipe takes only fifteen minutes.",
+        "Season the steak generously with salt before searing.",
+        "Let the cake cool completely before adding the frosting."
+    ],
+    "shopping": [
+        "Free shipping on all orders over fifty dollars this weekend.",
+        "Customers who bought this item also viewed these sneakers.",
+        "Add to cart now and save twenty percent with the coupon.",
+        "The new phone case comes in six colors and two sizes.",
+        "Read reviews from verified buyers before you purchase.",
+        "Limited stock remaining for the holiday gift bundle."
+    ],
+    "celebrity": [
+        "The actor was spotted at the premiere wearing a vintage suit.",
+        "Rumors about the couple's engagement spread on social media.",
+        "The singer announced a world tour starting next spring.",
+        "A behind the scenes video from the music festival went viral.",
+        "The reality show finale drew record ratings last night.",
+        "Fashion critics praised the designer's latest collection."
+    ]
+}
+_ON_DOMAINS = ["docs.example-ml.org", "blog.pydata.test", "learn.torch.test", "stats.university.test"]
+_OFF_DOMAINS = {
+    "sports": ["sportsnews.test", "league.test"],
+    "cooking": ["recipes.test", "kitchen.test"],
+    "shopping": ["shop.test", "deals.test"],
+    "celebrity": ["gossip.test", "entertainment.test"]
+}
+_FILLER_JS = "function t(a,b){return a.map(function(x){return x*b+1})}var cfg={ads:true,track:1,region:'kr'};"
+
+
+# ------------------------------------------------------------------------------
+# 입력 페이지
+# ------------------------------------------------------------------------------
+
+def _page_html(title, description, paragraphs, rng, script_kb):
+    """실제 페이지와 비슷하게 스크립트/내비게이션이 섞인 HTML"""
+    scripts = "".join(f"<script>{_FILLER_JS * 16}</script>" for _ in range(max(1, script_kb)))
+    nav = "".join(f'<li><a href="/section/{rng.randint(1, 99)}">Section {i}</a></li>' for i in range(20))
+    body = "".join(f"<p>{html.escape(p)}</p>" for p in paragraphs)
+    return (
+        "<!DOCTYPE html><html><head><meta charset=\"utf-8\">"
+        f"<title>{html.escape(title)}</title>"
+        f"<meta name=\"description\" content=\"{html.escape(description)}\">"
+        f"<meta name=\"keywords\" content=\"{html.escape(', '.join(title.lower().split()[:5]))}\">"
+        "<link rel=\"stylesheet\" href=\"/static/main.css\">"
+        f"{scripts}</head><body><nav><ul>{nav}</ul></nav>"
+        f"<article><h1>{html.escape(title)}</h1>{body}</article>"
+        "<footer>Copyright, privacy policy, terms of service</footer></body></html>"
+    )
+
+def _fresh_page(rng, idx, focus_frac):
+    if rng.random() < focus_frac:
+        topic, sentences, domain = "ml", _ON_TOPIC, rng.choice(_ON_DOMAINS)
+    else:
+        topic = rng.choice(sorted(_OFF_TOPIC))
+        sentences, domain = _OFF_TOPIC[topic], rng.choice(_OFF_DOMAINS[topic])
+    paragraphs = [" ".join(rng.choice(sentences) for _ in range(rng.randint(3, 6))) for _ in range(rng.randint(6, 30))]
+    return {
+        "url": f"https://{domain}/{topic}/article-{idx}",
+        "title": f"{' '.join(rng.choice(sentences).rstrip('.').split()[:6])} ({idx})",
+        "description": rng.choice(sentences),
+        "paragraphs": paragraphs,
+        "script_kb": rng.randint(5, 60),
+        "topic": topic
+    }
+
+def synthetic_corpus(n, seed=1, focus_frac=0.4, repeat_frac=0.15, near_dup_frac=0.1):
+    """
+    합성 방문 기록 (실제 사용처럼 같은 URL 재방문, 같은 도메인의 거의 같은 페이지 포함)
+    반환: 원본 페이지 정보 목록 (payload()로 요청 본문을 만듦)
+    """
+    rng = random.Random(seed)
+    pages = []
+    for i in range(n):
+        r = rng.random()
+        if pages and r < repeat_frac:
+            pages.append(rng.choice(pages))
+        elif pages and r < repeat_frac + near_dup_frac:
+            base = rng.choice(pages)
+            paragraphs = list(base["paragraphs"])
+            paragraphs[rng.randrange(len(paragraphs))] += " Updated."
+            pages.append(dict(base, url=base["url"].rsplit('/', 1)[0] + f"/article-{i}", paragraphs=paragraphs))
+        else:
+            pages.append(_fresh_page(rng, i, focus_frac))
+    return [dict(p, kind="synthetic") for p in pages]
+
+def export_labeled(path, n, seed):
+    """합성 페이지를 quant_eval 입력(JSONL)으로 저장 (목표 주제면 label=True, 재방문/중복 페이지 제외)"""
+    pages = synthetic_corpus(n, seed, repeat_frac=0, near_dup_frac=0)
+    with open(path, 'w', encoding='utf-8') as f:
+        for page in pages:
+            f.write(json.dumps({
+                "goal": GOAL,
+                "url": page["url"],
+                "title": page["title"],
+                "meta": page["description"],
+                "body": " ".join(page["paragraphs"]),
+                "label": page["topic"] == "ml"
+            }, ensure_ascii=False) + "\n")
+    return len(pages)
+
+def _strip_tags(doc):
+    doc = re.sub(r'(?is)<(script|style|noscript)\b.*?</\1>', ' ', doc)
+    return html.unescape(re.sub(r'(?s)<[^>]+>', ' ', doc))
+
+def recorded_corpus(paths):
+    """저장해 둔 페이지: .json(확장 프로그램 요청 본문 그대로) 또는 .html"""
+    pages = []
+    for path in paths:
+        files = [path]
+        if os.path.isdir(path):
+            files = sorted(os.path.join(path, n) for n in os.listdir(path)
+                           if n.endswith(('.html', '.htm', '.json')))
+        for file in files:
+            name = os.path.basename(file)
+            with open(file, 'r', encoding='utf-8', errors='replace') as f:
+                text = f.read()
+            if file.endswith('.json'):
+                body = json.loads(text)
+                body.setdefault('url', f"https://recorded.local/{name}")
+                pages.append({"kind": "recorded", "raw": body})
+            else:
+                title = re.search(r'(?is)<title[^>]*>(.*?)</title>', text)
+                pages.append({"kind": "recorded", "raw": {
+                    "url": f"https://recorded.local/{name}",
+                    "title": html.unescape(title.group(1).strip()) if title else name,
+                    "text": " ".join(_strip_tags(text).split()),
+                    "html": text
+                }})
+    return pages
+
+def payload(page, capture_format, text_limit, rng, salt=None):
+    """확장 프로그램이 보내는 요청 본문 (full / lean 형식)"""
+    # 반복 실행 간 임베딩 캐시 적중을 피하려고 URL과 제목을 조금 바꿈
+    # (제목은 full 형식의 HTML에서 뽑든 lean 형식이든, 본문 길이 제한과 상관없이 항상 모델 입력에 들어감)
+    mark = "" if salt is None else f" (run {salt})"
+    if page["kind"] == "recorded":
+        body = dict(page["raw"])
+        if mark:
+            body["title"] = f"{body.get('title', '')}{mark}"
+            if body.get("html"):
+                body["html"] = re.sub(r'</title>', lambda _: html.escape(mark) + '</title>', body["html"], count=1, flags=re.I)
+    else:
+        title = page["title"] + mark
+        text = " ".join([title] + page["paragraphs"])
+        body = {
+            "url": page["url"],
+            "title": title,
+            "text": text,
+            "html": _page_html(title, page["description"], page["paragraphs"], rng, page["script_kb"])
+        }
+        body["meta"] = {"description": page["description"], "keywords": ", ".join(page["title"].lower().split()[:5])}
+    if salt is not None:
+        body["url"] = f"{body['url']}{'&' if '?' in body['url'] else '?'}bench={salt}"
+    if capture_format == 'lean':
+        return {
+            "format": "lean",
+            "url": body["url"],
+            "title": body.get("title", ""),
+            "text": body.get("text", "")[:text_limit],
+            "meta": body.get("meta") or {}
+        }
+    body.pop("meta", None)
+    return body
+
+
+# ------------------------------------------------------------------------------
+# 측정
+# ------------------------------------------------------------------------------
+
+def percentiles(values):
+    """ms 단위 요약 (nearest-rank 백분위)"""
+    if not values:
+        return {"count": 0}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {
+        "count": len(ordered),
+        "mean": round(sum(ordered) / len(ordered) * 1000, 3),
+        "p50": round(pick(0.50) * 1000, 3),
+        "p90": round(pick(0.90) * 1000, 3),
+        "p99": round(pick(0.99) * 1000, 3),
+        "max": round(ordered[-1] * 1000, 3)
+    }
+
+class StageTimes:
+    """단계 이름 -> 소요 시간(초) 목록 (리스트 append는 스레드 간에 안전)"""
+    def __init__(self):
+        self.samples = {}
+
+    def reset(self):
+        self.samples = {}
+
+    def add(self, name, seconds):
+        self.samples.setdefault(name, []).append(seconds)
+
+    def wrap(self, name, fn):
+        def timed(*args, **kwargs):
+            start_t = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.add(name, time.perf_counter() - start_t)
+        return timed
+
+    def summary(self):
+        return {name: percentiles(values) for name, values in sorted(self.samples.items())}
+
+def instrument(server, stages):
+    """서버 모듈의 단계 함수들을 시간 측정 함수로 감쌈 (모듈 전역 이름으로 호출되므로 교체하면 적용됨)"""
+    server.read_payload = stages.wrap("decode", server.read_payload)
+    server.process_html = stages.wrap("scrape", server.process_html)
+    server.near_dups.fingerprint = stages.wrap("dedup", server.near_dups.fingerprint)
+
+    analyze_page = stages.wrap("model", server.focus_manager.analyze_page)
+    def analyze_with_worker_time(page_data):
+        result = analyze_page(page_data)
+        if result.get('status') == 'success':
+            # 워커 안에서 실제 인코딩/비교에 걸린 시간 (model - worker = 큐 대기 + 프로세스 간 전달)
+            stages.add("worker", result['data'].get('elapsed', 0.0))
+        return result
+    server.focus_manager.analyze_page = analyze_with_worker_time
+
+    insert_event = server.dbh.insertEvent
+    def timed_insert(*args, **kwargs):
+        start_t = time.perf_counter()
+        future = insert_event(*args, **kwargs)
+        stages.add("db_enqueue", time.perf_counter() - start_t)
+        future.add_done_callback(lambda _: stages.add("db_commit", time.perf_counter() - start_t))
+        return future
+    server.dbh.insertEvent = timed_insert
+
+    record_verdict = server.record_verdict
+    def timed_verdict(sid, page_url, verdict, stage, start_t):
+        # 요청 도착부터 판정이 나올 때까지 (판정 경로별)
+        stages.add(f"verdict:{stage}", time.perf_counter() - start_t)
+        return record_verdict(sid, page_url, verdict, stage, start_t)
+    server.record_verdict = timed_verdict
+
+def peak_rss_bytes(pid=None):
+    """프로세스 최대 메모리 사용량 (Linux: VmHWM, 그 외: psutil이 있으면 사용)"""
+    pid = pid or os.getpid()
+    try:
+        with open(f'/proc/{pid}/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process(pid).memory_info()
+        return getattr(info, 'peak_wset', None) or info.rss
+    except Exception:
+        return None
+
+def _mb(value):
+    return round(value / 2 ** 20, 1) if value else None
+
+def start_session(client, goal):
+    start_t = time.perf_counter()
+    resp = client.post('/api/new_session', json={"goal": goal, "duration": 0})
+    wall = time.perf_counter() - start_t
+    message = (resp.get_json() or {}).get('message')
+    if resp.status_code != 200 or not isinstance(message, dict) or message.get('status') != 'started':
+        raise RuntimeError(f"세션 시작 실패 ({resp.status_code}): {message}")
+    return {"wall_s": round(wall, 3), **{k: v for k, v in message.items() if k not in ('status', 'message')}}
+
+def end_session(client):
+    client.get('/api/terminate')
+
+def wait_jobs(server, job_ids, timeout=120):
+    """비동기 모드: 접수된 작업이 모두 끝날 때까지 대기, 상태별 개수 반환"""
+    deadline = time.monotonic() + timeout
+    pending = list(job_ids)
+    done = {}
+    while pending and time.monotonic() < deadline:
+        still = []
+        for job_id in pending:
+            info = server.ingest.status(job_id)
+            status = info['status'] if info else 'unknown'
+            if status in ('queued', 'running'):
+                still.append(job_id)
+            else:
+                done[status] = done.get(status, 0) + 1
+        pending = still
+        if pending:
+            time.sleep(0.01)
+    if pending:
+        done['timeout'] = len(pending)
+    return done
+
+def run_level(server, pages, concurrency, args, stages, salt):
+    """동시 요청 수 하나에 대한 측정 (새 세션에서 전체 페이지 전송)"""
+    client = server.app.test_client()
+    start_session(client, GOAL)
+    stages.reset()
+    text_limit = server.body_char_budget()
+    rng = random.Random(salt)
+    bodies = []
+    for page in pages:
+        body = json.dumps(payload(page, args.format, text_limit, rng, None if args.warm_cache else salt)).encode('utf-8')
+        headers = {}
+        if args.gzip:
+            body = gzip.compress(body)
+            headers['Content-Encoding'] = 'gzip'
+        bodies.append((body, headers))
+
+    local = threading.local()
+    lock = threading.Lock()
+    latencies = []
+    codes = {}
+    job_ids = []
+
+    def send(item):
+        body, headers = item
+        if not hasattr(local, 'client'):
+            local.client = server.app.test_client()
+        start_t = time.perf_counter()
+        resp = local.client.post('/save-html', data=body, headers=headers, content_type='application/json')
+        elapsed = time.perf_counter() - start_t
+        data = resp.get_json(silent=True) or {}
+        with lock:
+            latencies.append(elapsed)
+            codes[resp.status_code] = codes.get(resp.status_code, 0) + 1
+            if resp.status_code == 202:
+                job_ids.append(data['job_id'])
+
+    start_t = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(send, bodies))
+    jobs = wait_jobs(server, job_ids) if job_ids else {}
+    server.dbh.writer.flush()
+    wall = time.perf_counter() - start_t
+    end_session(client)
+
+    verdict_paths = {name.split(':', 1)[1]: len(values) for name, values in stages.samples.items()
+                     if name.startswith('verdict:')}
+    return {
+        "concurrency": concurrency,
+        "pages": len(pages),
+        "wall_s": round(wall, 3),
+        "throughput_pps": round(len(pages) / wall, 2) if wall else None,
+        "request": percentiles(latencies),
+        "status_codes": {str(k): v for k, v in sorted(codes.items())},
+        "async_jobs": jobs,
+        "verdict_paths": verdict_paths,
+        "stages": stages.summary()
+    }
+
+
+# ------------------------------------------------------------------------------
+# 결과 비교
+# ------------------------------------------------------------------------------
+
+def _metrics(report):
+    """비교할 지표: 이름 -> (값, 'lower' 또는 'higher'가 좋음)"""
+    out = {}
+    for key in ('cold', 'warm'):
+        session = report.get('session_start', {}).get(key)
+        if session:
+            out[f"session_start.{key}.wall_s"] = (session['wall_s'], 'lower')
+    for level in report.get('levels', []):
+        prefix = f"c{level['concurrency']}"
+        out[f"{prefix}.throughput_pps"] = (level['throughput_pps'], 'higher')
+        for q in ('p50', 'p99'):
+            if q in level['request']:
+                out[f"{prefix}.request.{q}"] = (level['request'][q], 'lower')
+            for name, summary in level['stages'].items():
+                if q in summary:
+                    out[f"{prefix}.{name}.{q}"] = (summary[q], 'lower')
+    for name, value in report.get('memory', {}).items():
+        if isinstance(value, (int, float)):
+            out[f"memory.{name}"] = (value, 'lower')
+    return out
+
+def compare(base_path, new_path, threshold):
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = _metrics(json.load(f))
+    with open(new_path, 'r', encoding='utf-8') as f:
+        new = _metrics(json.load(f))
+
+    regressions = []
+    print(f"{'metric':44s} {'base':>12s} {'new':>12s} {'change':>9s}")
+    for name in sorted(set(base) & set(new)):
+        (old, better), (value, _) = base[name], new[name]
+        if old is None or value is None:
+            continue
+        change = (value - old) / old if old else 0.0
+        worse = change > threshold if better == 'lower' else change < -threshold
+        if worse:
+            regressions.append(name)
+        print(f"{name:44s} {old:12.3f} {value:12.3f} {change:+8.1%}{'  <-- worse' if worse else ''}")
+    missing = sorted(set(base) ^ set(new))
+    if missing:
+        print(f"\n한쪽에만 있는 지표 {len(missing)}개 (비교 제외): {', '.join(missing[:10])}{' ...' if len(missing) > 10 else ''}")
+    print(f"\n{len(regressions)}개 지표가 {threshold:.0%} 이상 나빠짐")
+    return 1 if regressions else 0
+
+
+# ------------------------------------------------------------------------------
+# 실행
+# ------------------------------------------------------------------------------
+
+def _git_revision(repo):
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=repo, capture_output=True,
+                              text=True, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+def _prepare_workdir(workdir, repo, real_llm):
+    os.makedirs(workdir, exist_ok=True)
+    settings = os.path.join(workdir, 'settings.json')
+    if os.path.exists(settings):
+        return
+    api_key = ""
+    if real_llm:
+        with open(os.path.join(repo, 'settings.json'), 'r') as f:
+            api_key = json.load(f).get('APIKEY', "")
+    # 화이트/블랙리스트는 비워 둠 (모든 페이지가 스크래핑/모델 경로를 타도록)
+    with open(settings, 'w') as f:
+        json.dump({"APIKEY": api_key, "WHITE": [], "BLACK": []}, f)
+
+def main():
+    parser = argparse.ArgumentParser(description="/save-html 전체 경로 벤치마크")
+    parser.add_argument('--pages', type=int, default=200, help="합성 페이지 수 (0이면 저장된 페이지만)")
+    parser.add_argument('--recorded', nargs='*', default=[], help="저장해 둔 페이지 (.html/.json 파일 또는 폴더)")
+    parser.add_argument('--concurrency', default='1,4,8', help="동시 요청 수 목록 (쉼표 구분)")
+    parser.add_argument('--format', choices=['full', 'lean'], default='full', help="요청 본문 형식")
+    parser.add_argument('--gzip', action='store_true', help="요청 본문을 gzip으로 압축해서 전송")
+    parser.add_argument('--async', dest='async_ingest', action='store_true',
+                        help="비동기 처리(202 응답) 모드로 측정 (기본은 요청 안에서 분석까지 끝내는 모드)")
+    parser.add_argument('--warm-cache', action='store_true', help="실행 간 임베딩 캐시 적중을 허용")
+    parser.add_argument('--model', help="임베딩 모델 경로 (FOCUS_EMBED_MODEL, 기본: ai/emb)")
+    parser.add_argument('--real-llm', action='store_true', help="목표 확장에 실제 Gemini 호출 (settings.json의 APIKEY 사용)")
+    parser.add_argument('--workdir', help="실행 폴더 (기본: 임시 폴더)")
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', help="결과를 저장할 JSON 파일")
+    parser.add_argument('--smoke', action='store_true',
+                        help="빠른 점검 (--pages 5 --concurrency 1, 실패한 요청/작업이 있으면 종료 코드 1)")
+    parser.add_argument('--export-labeled', metavar='PATH', help="합성 페이지를 라벨이 달린 JSONL로 저장하고 종료")
+    parser.add_argument('--compare', nargs=2, metavar=('BASE', 'NEW'), help="두 결과 파일 비교")
+    parser.add_argument('--threshold', type=float, default=0.1, help="비교 시 나빠졌다고 볼 변화율")
+    args = parser.parse_args()
+
+    if args.compare:
+        sys.exit(compare(args.compare[0], args.compare[1], args.threshold))
+    if args.export_labeled:
+        count = export_labeled(args.export_labeled, args.pages, args.seed)
+        print(f"[Bench] 라벨 페이지 {count}개 저장: {args.export_labeled}")
+        return
+    if args.smoke:
+        args.pages, args.concurrency = 5, '1'
+
+    repo = os.getcwd()
+    out = os.path.abspath(args.out) if args.out else None
+    levels = [int(c) for c in args.concurrency.split(',') if c.strip()]
+    pages = (synthetic_corpus(args.pages, args.seed) if args.pages else []) + recorded_corpus(args.recorded)
+    if not pages:
+        parser.error("보낼 페이지가 없습니다 (--pages 또는 --recorded)")
+
+    # 서버 모듈은 import 시점에 설정/모델 경로를 읽으므로 환경 변수와 작업 폴더를 먼저 준비
+    os.environ['FOCUS_FAKE_LLM'] = '0' if args.real_llm else '1'
+    os.environ['FOCUS_EMBED_MODEL'] = os.path.abspath(args.model) if args.model else os.path.join(repo, 'ai', 'emb')
+    workdir = os.path.abspath(args.workdir or tempfile.mkdtemp(prefix='focus-bench-'))
+    _prepare_workdir(workdir, repo, args.real_llm)
+    sys.path.insert(0, repo)
+    os.chdir(workdir)
+    print(f"[Bench] 작업 폴더: {workdir}, 페이지 {len(pages)}개, 동시 요청 {levels}")
+
+    import_t = time.perf_counter()
+    import backend.flask_server as server
+    from ai.proc import analysis, manager
+    import_s = time.perf_counter() - import_t
+    server.ASYNC_INGEST = args.async_ingest
+
+    stages = StageTimes()
+    instrument(server, stages)
+    client = server.app.test_client()
+
+    # 세션 시작: 처음(워커 프로세스 시작 + 모델 로드) / 다음(모델 재사용, 목표만 교체)
+    cold = start_session(client, GOAL)
+    end_session(client)
+    warm = start_session(client, "learn data visualization with python")
+    end_session(client)
+    print(f"[Bench] 세션 시작: 처음 {cold['wall_s']}s, 다음 {warm['wall_s']}s")
+
+    results = []
+    for i, concurrency in enumerate(levels):
+        result = run_level(server, pages, concurrency, args, stages, salt=i)
+        results.append(result)
+        print(f"[Bench] 동시 {concurrency:3d}: {result['throughput_pps']:8.2f} pages/s  "
+              f"요청 p50 {result['request']['p50']:8.2f}ms p99 {result['request']['p99']:8.2f}ms  "
+              f"경로 {result['verdict_paths']}")
+
+    worker_peaks = [peak_rss_bytes(w['pid']) for w in server.focus_manager.pool_status()['workers'] if w['pid']]
+    report = {
+        "meta": {
+            "time": time.strftime('%Y-%m-%d %H:%M:%S'),
+            "revision": _git_revision(repo),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "args": {k: v for k, v in vars(args).items() if k not in ('compare', 'threshold')},
+            "config": {
+                "embed_model": analysis.EMBED_MODEL_PATH,
+                "fake_llm": analysis.FAKE_LLM,
+                "embed_precision": analysis.EMBED_PRECISION,
+                "batch_max_size": analysis.BATCH_MAX_SIZE,
+                "chunk_scoring": analysis.CHUNK_SCORING,
+                "analysis_workers": manager.ANALYSIS_WORKERS,
+                "async_ingest": server.ASYNC_INGEST,
+                "ingest_threads": server.INGEST_THREADS
+            },
+            "corpus": {
+                "synthetic": sum(1 for p in pages if p['kind'] == 'synthetic'),
+                "recorded": sum(1 for p in pages if p['kind'] == 'recorded')
+            }
+        },
+        "import_s": round(import_s, 3),
+        "session_start": {"cold": cold, "warm": warm},
+        "levels": results,
+        "memory": {
+            "server_peak_mb": _mb(peak_rss_bytes()),
+            "worker_peak_mb": _mb(max((p for p in worker_peaks if p), default=None)),
+            "total_peak_mb": _mb((peak_rss_bytes() or 0) + sum(p for p in worker_peaks if p))
+        }
+    }
+    print(f"[Bench] 최대 메모리: 서버 {report['memory']['server_peak_mb']}MB, 워커 {report['memory']['worker_peak_mb']}MB")
+
+    if out:
+        with open(out, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4, ensure_ascii=False)
+        print(f"[Bench] 결과 저장: {out}")
+
+    server.focus_manager.shutdown()
+    if args.smoke:
+        failures = smoke_failures(results)
+        for failure in failures:
+            print(f"[Bench] 실패: {failure}")
+        sys.exit(1 if failures else 0)
+
+def smoke_failures(results):
+    """2xx가 아닌 응답, 끝나지 않은(실패/버림/시간 초과) 비동기 작업 목록"""
+    failures = []
+    for level in results:
+        for code, count in level['status_codes'].items():
+            if not code.startswith('2'):
+                failures.append(f"동시 {level['concurrency']}: HTTP {code} x{count}")
+        for status, count in level['async_jobs'].items():
+            if status != 'done':
+                failures.append(f"동시 {level['concurrency']}: 작업 {status} x{count}")
+    return failures
+
+if __name__ == "__main__":
+    main()
@@ -18,13 +18,44 @@ chrome.tabs.onRemoved.addListener((tabId) => {
   chrome.storage.session.remove(tabId.toString());
 });
 
-function sendDataToServer(htmlContent, vtext, url, title) {
-  const serverUrl = 'http://127.0.0.1:5000/save-html';
-  fetch(serverUrl, {
-    method: 'POST',
-    headers: { 'Content-Type': 'application/json' },
-    body: JSON.stringify({ url, title, text: vtext, html: htmlContent }),
-  })
+const SERVER_URL = 'http://127.0.0.1:5000';
+const FULL_FORMAT = { format: 'full', text_limit: null, encodings: [] };
+let captureFormat = null; // 서버와 협상한 전송 형식 (서비스 워커가 살아 있는 동안 재사용)
+
+// 서버가 권하는 전송 형식 조회 (구버전 서버거나 서버가 꺼져 있으면 기존 full 형식)
+async function getCaptureFormat() {
+  if (captureFormat) return captureFormat;
+  try {
+    const res = await fetch(`${SERVER_URL}/api/capture-format`);
+    if (!res.ok) return FULL_FORMAT;
+    captureFormat = await res.json();
+    return captureFormat;
+  } catch (err) {
+    return FULL_FORMAT;
+  }
+}
+
+// JSON 문자열을 gzip으로 압축
+async function gzipBody(text) {
+  const stream = new Blob([text]).stream().pipeThrough(new CompressionStream('gzip'));
+  return await new Response(stream).arrayBuffer();
+}
+
+async function sendDataToServer(message, url, title) {
+  const serverUrl = `${SERVER_URL}/save-html`;
+  const payload = message.lean
+    ? { format: 'lean', url, title, ...message.lean }
+    : { url, title, text: message.vtext, html: message.content };
+
+  const headers = { 'Content-Type': 'application/json' };
+  let body = JSON.stringify(payload);
+  const fmt = await getCaptureFormat();
+  if (typeof CompressionStream !== 'undefined' && (fmt.encodings || []).includes('gzip')) {
+    body = await gzipBody(body);
+    headers['Content-Encoding'] = 'gzip';
+  }
+
+  fetch(serverUrl, { method: 'POST', headers, body })
   .then(res => res.json())
   .then(data => console.log('Server response:', data))
   .catch(err => console.error('Error sending data:', err));
@@ -32,6 +63,11 @@ function sendDataToServer(htmlContent, vtext, url, title) {
 
 // 3. 메시지 리스너 수정
 chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
+  if (message.type === "GET_CAPTURE_FORMAT") {
+    getCaptureFormat().then(sendResponse);
+    return true;
+  }
+
   if (message.type === "SEND_HTML" && sender.tab) {
     const tabId = sender.tab.id;
 
@@ -41,7 +77,7 @@ chrome.runtime.onMessage.addListener((message, sender, sendResponse) => {
 
       if (statusCode && statusCode >= 200 && statusCode < 300) {
         console.log(`[Process] Valid status (${statusCode}). Sending data...`);
-        sendDataToServer(message.content, message.vtext, sender.tab.url, sender.tab.title);
+        sendDataToServer(message, sender.tab.url, sender.tab.title);
         sendResponse({ status: "success" }); // 응답 보냄
       } else {
         console.log(`[Process] Skipped. Invalid status or null: ${statusCode}`);
@@ -10,25 +10,60 @@ function debounce(func, delay) {
   };
 }
 
-// HTML을 보내고 감시를 중단하는 함수 (변경 없음)
+// HTML을 보내고 감시를 중단하는 함수
 function sendHtmlAndDisconnect() {
   if (hasSent) return;
   hasSent = true;
 
   console.log('Content stable. Sending HTML and disconnecting observer.');
-  const pageHTML = document.documentElement.outerHTML;
-  const visibleTexts = scrapeVisibleText();
-
-  chrome.runtime.sendMessage({
-    type: "SEND_HTML",
-    content: pageHTML,
-    vtext: visibleTexts
-  });
-
   if (observer) {
     observer.disconnect();
     console.log('Observer disconnected.');
   }
+
+  // 서버와 협상한 형식에 따라 전체 HTML 또는 필요한 부분(lean)만 전송
+  chrome.runtime.sendMessage({ type: "GET_CAPTURE_FORMAT" }, (fmt) => {
+    if (fmt && fmt.format === 'lean') {
+      chrome.runtime.sendMessage({
+        type: "SEND_HTML",
+        lean: captureLean(fmt.text_limit)
+      });
+      return;
+    }
+
+    chrome.runtime.sendMessage({
+      type: "SEND_HTML",
+      content: document.documentElement.outerHTML,
+      vtext: scrapeVisibleText()
+    });
+  });
+}
+
+// <head> 메타 태그 content (서버 추출과 같이 첫 번째 태그, content가 없으면 ' ')
+function headMeta(name) {
+  const el = document.querySelector(`meta[name="${name}"]`);
+  if (!el) return '';
+  const content = el.getAttribute('content');
+  return content === null ? ' ' : content;
+}
+
+// 유튜브 영상 페이지: 영상 정보가 든 ytInitialPlayerResponse 스크립트만 전달
+function playerScript() {
+  if (!/(^|\.)youtube\.com$|^youtu\.be$/.test(location.hostname)) return undefined;
+  const script = Array.from(document.scripts).find(s => s.textContent.includes('ytInitialPlayerResponse'));
+  return script ? script.textContent : undefined;
+}
+
+// lean 형식: 메타 + 본문 텍스트 일부 (서버가 실제로 분석하는 길이까지만)
+function captureLean(textLimit) {
+  return {
+    meta: {
+      description: headMeta('description'),
+      keywords: headMeta('keywords')
+    },
+    text: scrapeVisibleText(textLimit),
+    player: playerScript()
+  };
 }
 
 // =================================================================
@@ -108,8 +143,10 @@ function isElementVisible(el) {
     return true;
 }
 
-function scrapeVisibleText() {
+// limit: 공백 정리 후 최대 글자 수 (없으면 전체)
+function scrapeVisibleText(limit) {
     const visibleTexts = [];
+    let length = 0;
     
     // 1. TreeWalker를 사용해 모든 텍스트 노드를 순회합니다.
     const walker = document.createTreeWalker(
@@ -121,19 +158,28 @@ function scrapeVisibleText() {
 
     let node;
     while (node = walker.nextNode()) {
-        const text = node.nodeValue.trim();
+        let text = node.nodeValue.trim();
 
         // 2. 텍스트가 비어있지 않은지 확인
         if (text) {
             // 3. 텍스트 노드의 부모 엘리먼트가 '보이는' 상태인지 확인
             // (SCRIPT, STYLE 태그 안의 텍스트는 parentElement가 해당 태그이므로 isElementVisible에서 걸러짐)
             if (isElementVisible(node.parentElement)) {
-                visibleTexts.push(text);
+                if (limit) {
+                    // 상한까지 모이면 나머지 노드는 검사하지 않음 (레이아웃 계산 비용 절약)
+                    text = text.replace(/\s+/g, ' ');
+                    visibleTexts.push(text);
+                    length += text.length + 2;
+                    if (length >= limit) break;
+                } else {
+                    visibleTexts.push(text);
+                }
             }
         }
     }
 
-    return visibleTexts.join(', ');
+    const joined = visibleTexts.join(', ');
+    return limit ? joined.slice(0, limit) : joined;
 }
 
 
@@ -185,6 +185,7 @@ export default function App() {
     let isCleaningUp = false;
     let currentReconnectAttempts = 0;
     let hasReceivedFirstMessage = false;
+    let lastEventId = ''; // 마지막으로 받은 이벤트 id (재연결 시 놓친 이벤트를 다시 받기 위해 전달)
 
     const MAX_RECONNECT_ATTEMPTS = 5;
     const INITIAL_RECONNECT_DELAY = 1000; // 1초
@@ -215,8 +216,11 @@ export default function App() {
           eventSource = null;
         }
 
-        // 새 EventSource 생성
-        eventSource = new EventSource(sseEndpoint);
+        // 새 EventSource 생성 (직접 재연결하면 Last-Event-ID 헤더가 없으므로 쿼리로 전달)
+        const url = lastEventId
+          ? `${sseEndpoint}${sseEndpoint.includes('?') ? '&' : '?'}lastEventId=${encodeURIComponent(lastEventId)}`
+          : sseEndpoint;
+        eventSource = new EventSource(url);
 
         // 연결 타임아웃 설정 (HTTP 연결 자체의 타임아웃)
         connectionTimeoutId = setTimeout(() => {
@@ -256,6 +260,9 @@ export default function App() {
         eventSource.onmessage = (event) => {
           try {
             console.log('SSE 메시지 수신:', event.data);
+            if (event.lastEventId) {
+              lastEventId = event.lastEventId;
+            }
             
             // 첫 메시지를 받았을 때만 connected 상태로 변경
             if (!hasReceivedFirstMessage) {
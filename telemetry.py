@@ -0,0 +1,196 @@
+import atexit
+import bisect
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+# ==============================================================================
+# 계측 (메트릭 + 로그)
+# - Counter / Gauge / Histogram을 REGISTRY에 등록하고 /metrics에서 Prometheus 텍스트 형식으로 내보냄
+# - fn을 넘기면 값을 들고 있지 않고 내보낼 때마다 fn()으로 읽음 (캐시 통계, 큐 길이 등)
+# - 로그: 메인 프로세스는 QueueHandler -> 별도 스레드(QueueListener)가 출력, 요청 스레드는 출력을 기다리지 않음
+# ==============================================================================
+
+# 초 단위 지연 구간 (1ms ~ 10s)
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LOG_LEVEL = os.environ.get('FOCUS_LOG_LEVEL', 'INFO')
+LOG_FORMAT = '%(asctime)s %(levelname)s [%(name)s] %(message)s'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _label_text(names, values, extra=()):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)] + [f'{n}="{v}"' for n, v in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=(), fn=None):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.fn = fn
+        self._lock = threading.Lock()
+        self._values = {}   # 라벨 값 튜플 -> 값
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, '')) for name in self.labels)
+
+    def _read(self):
+        """(라벨 값 튜플, 값) 목록"""
+        if self.fn is None:
+            with self._lock:
+                return list(self._values.items())
+        values = self.fn()
+        if not isinstance(values, dict):
+            return [((), values)]
+        return [(k if isinstance(k, tuple) else (k,), v) for k, v in values.items()]
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        for key, value in sorted(self._read(), key=lambda kv: kv[0]):
+            lines.append(f'{self.name}{_label_text(self.labels, key)} {_number(value)}')
+        return lines
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            entry = self._values.get(key)
+            if entry is None:
+                entry = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            entry[0][idx] += 1
+            entry[1] += value
+            entry[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """with STAGE_SECONDS.time(stage='scrape'): ..."""
+        start_t = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start_t, **labels)
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+        with self._lock:
+            items = sorted((k, (list(e[0]), e[1], e[2])) for k, e in self._values.items())
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float('inf'),), counts):
+                cumulative += n
+                lines.append(f'{self.name}_bucket{_label_text(self.labels, key, [("le", _number(bound))])} {cumulative}')
+            lines.append(f'{self.name}_sum{_label_text(self.labels, key)} {_number(total)}')
+            lines.append(f'{self.name}_count{_label_text(self.labels, key)} {count}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Prometheus 텍스트 형식 (값을 읽다 실패한 메트릭은 건너뜀)"""
+        lines = []
+        for metric in list(self._metrics):
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logging.getLogger('focus.metrics').warning("메트릭 %s 읽기 실패: %s", metric.name, e)
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+def counter(name, help_text, labels=(), fn=None):
+    return REGISTRY.register(Counter(name, help_text, labels, fn))
+
+def gauge(name, help_text, labels=(), fn=None):
+    return REGISTRY.register(Gauge(name, help_text, labels, fn))
+
+def histogram(name, help_text, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help_text, labels, buckets))
+
+# 단계별 소요 시간 (scrape, yt_dlp, analyze, queue_wait, encode, similarity, db_commit 등)
+STAGE_SECONDS = histogram('focus_stage_seconds', 'Time spent in each stage of page analysis', ['stage'])
+
+
+# ------------------------------------------------------------------------------
+# 로그
+# ------------------------------------------------------------------------------
+
+_listener = None
+
+def setup_logging(level=LOG_LEVEL):
+    """메인 프로세스: 'focus' 로거 출력을 큐에 넣고 별도 스레드에서 stdout으로 출력 (여러 번 호출해도 1회만)"""
+    global _listener
+    if _listener is not None:
+        return
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, '%H:%M:%S'))
+    _listener = QueueListener(log_queue, handler)
+    _listener.start()
+    atexit.register(_listener.stop)
+
+    logger = logging.getLogger('focus')
+    logger.handlers = [QueueHandler(log_queue)]
+    logger.setLevel(level)
+    logger.propagate = False
+
+def setup_worker_logging(level=LOG_LEVEL):
+    """
+    분석 워커 프로세스: 직접 stdout으로 출력
+    (fork로 복사된 메인 프로세스의 큐는 읽는 스레드가 없으므로 핸들러를 교체)
+    """
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter(LOG_FORMAT, '%H:%M:%S'))
+    logger = logging.getLogger('focus')
+    logger.handlers = [handler]
+    logger.setLevel(level)
+    logger.propagate = False